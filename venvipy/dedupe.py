@@ -0,0 +1,383 @@
+# -*- coding: utf-8 -*-
+"""
+This module finds files with identical content in the site-packages of
+venvs and replaces the duplicates by links to a single copy: reflinks
+where the filesystem supports them, hardlinks otherwise.
+"""
+import os
+import sys
+import time
+import errno
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+
+import inventory
+
+
+logger = logging.getLogger(__name__)
+
+# number of files hashed in parallel
+HASH_WORKERS = 8
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# smaller files are not worth a link
+MIN_FILE_SIZE = 1
+
+# how duplicates are replaced
+LINK_AUTO = "auto"
+LINK_HARD = "hardlink"
+LINK_REFLINK = "reflink"
+
+# ioctl cloning a file on Linux (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+# errors telling the filesystem can't clone, hardlinks are used instead
+REFLINK_UNSUPPORTED = {
+    errno.EOPNOTSUPP, errno.EXDEV, errno.EINVAL, errno.ENOTTY
+}
+
+
+
+@dataclass
+class FileEntry:
+    """A regular file as found while scanning, with all its paths."""
+    paths: list
+    dev: int
+    ino: int
+    size: int
+    mode: int
+    uid: int
+    gid: int
+    mtime_ns: int
+    nlink: int
+    blocks: int
+
+    @property
+    def reclaimable(self):
+        """
+        The bytes freed by linking all paths elsewhere. Nothing if
+        the file has links outside the venvs scanned.
+        """
+        return self.blocks if self.nlink <= len(self.paths) else 0
+
+
+@dataclass
+class DuplicateGroup:
+    """Files with the same content, the first one is kept."""
+    size: int
+    digest: str
+    files: list
+
+    @property
+    def duplicates(self):
+        """The number of paths replaced by links to the first file."""
+        return sum(len(entry.paths) for entry in self.files[1:])
+
+    @property
+    def reclaimable(self):
+        """The bytes freed by linking the other files to the first."""
+        return sum(entry.reclaimable for entry in self.files[1:])
+
+
+@dataclass
+class DedupeReport:
+    """The result of a scan, or of linking the duplicates found."""
+    groups: list = field(default_factory=list)
+    scanned: int = 0
+    linked: int = 0
+    reclaimed: int = 0
+    errors: list = field(default_factory=list)
+
+    @property
+    def duplicates(self):
+        """The number of paths that would be replaced by links."""
+        return sum(group.duplicates for group in self.groups)
+
+    @property
+    def reclaimable(self):
+        """The bytes linking all duplicates would free."""
+        return sum(group.reclaimable for group in self.groups)
+
+
+
+#]===========================================================================[#
+#] SCAN [#===================================================================[#
+#]===========================================================================[#
+
+def scan_files(directory):
+    """
+    Yield the path and `os.stat_result` of the regular files below
+    `directory`. Symlinks are not followed.
+    """
+    stack = [directory]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                dir_entries = list(it)
+        except OSError:
+            continue
+
+        for entry in dir_entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                st = entry.stat(follow_symlinks=False)
+                if not st.st_ino or not st.st_nlink:
+                    # scandir leaves the inode and link count out on Windows
+                    st = os.stat(entry.path, follow_symlinks=False)
+            except OSError:
+                continue
+            if st.st_size >= MIN_FILE_SIZE:
+                yield entry.path, st
+
+
+def hash_file(path):
+    """Return the hex digest of a file's content, `None` on errors.
+    """
+    digest = hashlib.blake2b(digest_size=32)
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def find_duplicates(venv_paths, max_workers=HASH_WORKERS):
+    """
+    Return a `DedupeReport` of the files in the site-packages of
+    `venv_paths` having the same content. Files are grouped by device,
+    size, mode and owner first, only files sharing these are hashed.
+    Paths already linked to each other count as one file.
+    """
+    start = time.perf_counter()
+    # a directory reached twice would list its files twice
+    directories = list({
+        os.path.realpath(directory): directory
+        for venv_path in venv_paths
+        for directory in inventory.site_packages_dirs(venv_path)
+    }.values())
+
+    # one entry per inode, then by what must be equal to link
+    inodes = {}
+    scanned = 0
+    for directory in directories:
+        for path, st in scan_files(directory):
+            scanned += 1
+            entry = inodes.get((st.st_dev, st.st_ino))
+            if entry is not None:
+                entry.paths.append(path)
+                continue
+            blocks = getattr(st, "st_blocks", None)
+            inodes[(st.st_dev, st.st_ino)] = FileEntry(
+                paths=[path],
+                dev=st.st_dev,
+                ino=st.st_ino,
+                size=st.st_size,
+                mode=st.st_mode & 0o7777,
+                uid=st.st_uid,
+                gid=st.st_gid,
+                mtime_ns=st.st_mtime_ns,
+                nlink=st.st_nlink,
+                blocks=blocks * 512 if blocks is not None else st.st_size
+            )
+    by_size = {}
+    for entry in inodes.values():
+        by_size.setdefault(
+            (entry.dev, entry.size, entry.mode, entry.uid, entry.gid), []
+        ).append(entry)
+    candidates = [
+        entry for entries in by_size.values() if len(entries) > 1
+        for entry in entries
+    ]
+
+    workers = max(1, min(max_workers, len(candidates)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        digests = list(executor.map(
+            hash_file, (entry.paths[0] for entry in candidates)
+        ))
+
+    by_hash = {}
+    for entry, digest in zip(candidates, digests):
+        if digest is not None:
+            key = (entry.dev, entry.size, entry.mode, entry.uid, entry.gid)
+            by_hash.setdefault((key, digest), []).append(entry)
+
+    report = DedupeReport(scanned=scanned)
+    for (key, digest), entries in by_hash.items():
+        if len(entries) > 1:
+            # keep a file linked from outside, its data stays anyway,
+            # else the one with the most paths, they need no relinking
+            entries.sort(key=lambda e: (
+                e.reclaimable > 0, -len(e.paths), e.paths[0]
+            ))
+            report.groups.append(DuplicateGroup(key[1], digest, entries))
+    report.groups.sort(key=lambda g: g.reclaimable, reverse=True)
+
+    logger.debug(
+        f"Hashed {len(candidates)} of {len(inodes)} file(s) in "
+        f"{len(directories)} site-packages, found {report.duplicates} "
+        f"duplicate(s) in {time.perf_counter() - start:.3f}s"
+    )
+    return report
+
+
+
+#]===========================================================================[#
+#] LINK [#===================================================================[#
+#]===========================================================================[#
+
+def unchanged(path, entry):
+    """Test wether `path` still is the file found by the scan.
+    """
+    try:
+        st = os.stat(path, follow_symlinks=False)
+    except OSError:
+        return False
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns) == (
+        entry.dev, entry.ino, entry.size, entry.mtime_ns
+    )
+
+
+def temp_path(path):
+    """Return an unused path next to `path`.
+    """
+    directory, name = os.path.split(path)
+    number = 0
+    while True:
+        candidate = os.path.join(directory, f".{name}.{os.getpid()}.{number}")
+        if not os.path.lexists(candidate):
+            return candidate
+        number += 1
+
+
+def reflink(source, target):
+    """
+    Make `target` a copy-on-write clone of `source`. Raise `OSError`
+    if the platform or filesystem can't.
+    """
+    if not sys.platform.startswith("linux"):
+        raise OSError(errno.EOPNOTSUPP, "Reflinks are not supported")
+    import fcntl
+
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+def link_file(source, path, entry, method=LINK_AUTO, no_reflink=None):
+    """
+    Replace the file at `path`, one of the paths of `entry`, by a
+    link to `source`, through a temporary file so it is never missing.
+    In auto mode, devices found not to support reflinks are added to
+    the set `no_reflink` and only get hardlinks from then on. Return
+    the method used.
+    """
+    if no_reflink is None:
+        no_reflink = set()
+    tmp = temp_path(path)
+    used = None
+    try:
+        if method == LINK_REFLINK or (
+            method == LINK_AUTO and entry.dev not in no_reflink
+        ):
+            try:
+                reflink(source, tmp)
+                os.chmod(tmp, entry.mode)
+                st = os.stat(tmp)
+                if (st.st_uid, st.st_gid) != (entry.uid, entry.gid):
+                    os.chown(tmp, entry.uid, entry.gid)
+                os.utime(tmp, ns=(entry.mtime_ns, entry.mtime_ns))
+                used = LINK_REFLINK
+            except OSError as e:
+                if os.path.lexists(tmp):
+                    os.remove(tmp)
+                if method == LINK_REFLINK:
+                    raise
+                if e.errno in REFLINK_UNSUPPORTED:
+                    no_reflink.add(entry.dev)
+        if used is None:
+            os.link(source, tmp)
+            used = LINK_HARD
+        os.replace(tmp, path)
+    except OSError:
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        raise
+    return used
+
+
+def link_duplicates(report, method=LINK_AUTO):
+    """
+    Replace the duplicates of a `DedupeReport` by links to the first
+    file of their group. Files changed since the scan are skipped.
+    Return a new report telling what was done.
+    """
+    start = time.perf_counter()
+    result = DedupeReport(scanned=report.scanned)
+    no_reflink = set()
+    for group in report.groups:
+        source = group.files[0]
+        source_path = source.paths[0]
+        if not unchanged(source_path, source):
+            result.errors.append(f"{source_path}: changed since the scan")
+            continue
+        for entry in group.files[1:]:
+            replaced = 0
+            for path in entry.paths:
+                if not unchanged(path, entry):
+                    result.errors.append(f"{path}: changed since the scan")
+                    continue
+                try:
+                    link_file(source_path, path, entry, method, no_reflink)
+                except OSError as e:
+                    result.errors.append(f"{path}: {e}")
+                    continue
+                replaced += 1
+            result.linked += replaced
+            # the data is only freed once no path is left to it
+            if replaced == len(entry.paths):
+                result.reclaimed += entry.reclaimable
+
+    logger.debug(
+        f"Linked {result.linked} duplicate(s), reclaimed "
+        f"{result.reclaimed} bytes in {time.perf_counter() - start:.3f}s"
+    )
+    return result
+
+
+
+#]===========================================================================[#
+#] REPORT [#=================================================================[#
+#]===========================================================================[#
+
+def format_report(report, format_size, limit=50):
+    """
+    Return a dry-run report of the duplicates found, the groups
+    freeing the most space first. `format_size` turns bytes into
+    text.
+    """
+    lines = [
+        f"Scanned {report.scanned} file(s), found {report.duplicates} "
+        f"duplicate(s) in {len(report.groups)} group(s).",
+        f"Linking them would free {format_size(report.reclaimable)}.",
+    ]
+    for group in report.groups[:limit]:
+        lines.append("")
+        lines.append(
+            f"{len(group.files)} x {format_size(group.size)}, "
+            f"frees {format_size(group.reclaimable)}:"
+        )
+        lines.extend(
+            f"    {path}" for entry in group.files for path in entry.paths
+        )
+    if len(report.groups) > limit:
+        lines.append("")
+        lines.append(f"... and {len(report.groups) - limit} more group(s)")
+    return "\n".join(lines)
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+This module builds the dependency graph of a venv from the `Requires-Dist`
+metadata of its distributions, with the environment markers evaluated
+for the venv's interpreter instead of the one running VenviPy.
+"""
+import os
+import sys
+import time
+import platform
+import logging
+from functools import lru_cache
+from dataclasses import dataclass
+
+import inventory
+from requirements import (
+    Requirement,
+    InvalidRequirement,
+    parse_requirement,
+    evaluate_marker
+)
+
+
+logger = logging.getLogger(__name__)
+
+IMPLEMENTATION_NAMES = {"cpython": "CPython", "pypy": "PyPy"}
+
+
+
+@lru_cache(maxsize=1)
+def host_environment():
+    """
+    Return the marker values of the machine, shared by all venvs.
+    """
+    return {
+        "os_name": os.name,
+        "sys_platform": sys.platform,
+        "platform_machine": platform.machine(),
+        "platform_release": platform.release(),
+        "platform_system": platform.system(),
+        "platform_version": platform.version(),
+    }
+
+
+def marker_environment(version_info=(), implementation="cpython"):
+    """
+    Return the marker values of a venv whose interpreter has the
+    version `version_info`, e.g. `(3, 12, 1)`.
+    """
+    version_info = tuple(version_info) or tuple(sys.version_info[:3])
+    full_version = ".".join(str(n) for n in version_info)
+
+    environment = dict(host_environment())
+    environment.update({
+        "implementation_name": implementation,
+        "implementation_version": full_version,
+        "platform_python_implementation": IMPLEMENTATION_NAMES.get(
+            implementation, implementation
+        ),
+        "python_version": ".".join(str(n) for n in version_info[:2]),
+        "python_full_version": full_version,
+        "extra": "",
+    })
+    return environment
+
+
+
+@dataclass
+class Dependency:
+    """An edge of the graph: a requirement and what is installed for it."""
+    requirement: Requirement
+    dist: inventory.Distribution
+
+    @property
+    def key(self):
+        return self.requirement.key
+
+    @property
+    def required(self):
+        """The version specifier as shown, `Any` if there is none."""
+        return str(self.requirement.specifier) or "Any"
+
+    @property
+    def satisfied(self):
+        """Wether the installed version matches the requirement."""
+        if self.dist is None:
+            return False
+        specifier = self.requirement.specifier
+        return not specifier or specifier.contains(self.dist.version)
+
+
+
+class DependencyGraph:
+    """
+    The dependencies between the distributions of a venv, in both
+    directions.
+    """
+    def __init__(self, dists, environment):
+        self.dists = {dist.key: dist for dist in dists}
+        self.environment = environment
+        self.requires = {key: [] for key in self.dists}
+        self.required_by = {key: [] for key in self.dists}
+        self.extras = {key: set() for key in self.dists}
+        self._build()
+
+    def _requirements(self, dist):
+        """Return the parsed requirements of a distribution.
+        """
+        parsed = []
+        for text in dist.requires:
+            try:
+                parsed.append(parse_requirement(text))
+            except InvalidRequirement as e:
+                logger.debug(f"{dist.name}: {e}")
+        return parsed
+
+    def _active(self, requirements, extras):
+        """
+        Return the requirements whose marker holds for this venv, with
+        the extras the distribution was asked for.
+        """
+        environments = [self.environment]
+        environments.extend(
+            dict(self.environment, extra=extra) for extra in sorted(extras)
+        )
+        return [
+            req for req in requirements
+            if any(evaluate_marker(req.marker, e) for e in environments)
+        ]
+
+    def _build(self):
+        """
+        Find the extras every distribution is required with, then add
+        the edges of the requirements active with those extras.
+        """
+        requirements = {
+            key: self._requirements(dist) for key, dist in self.dists.items()
+        }
+
+        pending = list(self.dists)
+        while pending:
+            key = pending.pop()
+            for req in self._active(requirements[key], self.extras[key]):
+                child = self.extras.get(req.key)
+                if child is not None and not child.issuperset(req.extras):
+                    child.update(req.extras)
+                    pending.append(req.key)
+
+        for key in sorted(self.dists):
+            seen = set()
+            for req in self._active(requirements[key], self.extras[key]):
+                if req.key in seen or req.key == key:
+                    continue
+                seen.add(req.key)
+                dependency = Dependency(req, self.dists.get(req.key))
+                self.requires[key].append(dependency)
+                if dependency.dist is not None:
+                    self.required_by[req.key].append((key, dependency))
+
+        for dependencies in self.requires.values():
+            dependencies.sort(key=lambda d: d.key)
+
+    def reachable(self, keys):
+        """Return the keys of `keys` and all they depend on.
+        """
+        reached = set()
+        stack = list(keys)
+        while stack:
+            key = stack.pop()
+            if key in reached:
+                continue
+            reached.add(key)
+            stack.extend(
+                d.key for d in self.requires[key] if d.dist is not None
+            )
+        return reached
+
+    def roots(self):
+        """
+        Return the keys of the distributions no other one requires,
+        plus one of each group only requiring each other.
+        """
+        roots = [
+            key for key, parents in sorted(self.required_by.items())
+            if not parents
+        ]
+        reached = self.reachable(roots)
+        for key in sorted(self.dists):
+            if key not in reached:
+                roots.append(key)
+                reached |= self.reachable([key])
+        return sorted(roots)
+
+    def problems(self):
+        """
+        Return `(parent key, Dependency)` tuples of the requirements
+        that are missing or not satisfied by the installed version.
+        """
+        return [
+            (key, dependency)
+            for key, dependencies in sorted(self.requires.items())
+            for dependency in dependencies
+            if not dependency.satisfied
+        ]
+
+
+# {venv path: (fingerprint, environment, DependencyGraph)}
+_graph_cache = {}
+
+
+def get_dependency_graph(venv_path, version_info=(), implementation="cpython"):
+    """
+    Return the `DependencyGraph` of a venv. It is cached until a
+    site-packages directory of the venv changes.
+    """
+    environment = marker_environment(version_info, implementation)
+    fingerprint = inventory.inventory_fingerprint(venv_path)
+    cached = _graph_cache.get(venv_path)
+    if cached is not None and cached[:2] == (fingerprint, environment):
+        return cached[2]
+
+    start = time.perf_counter()
+    graph = DependencyGraph(
+        inventory.get_distributions(venv_path), environment
+    )
+    _graph_cache[venv_path] = (fingerprint, environment, graph)
+    logger.debug(
+        f"Built the dependency graph of '{venv_path}' in "
+        f"{time.perf_counter() - start:.3f}s"
+    )
+    return graph
@@ -5,7 +5,7 @@ This module contains some dialogs.
 import sys
 import logging
 
-from PyQt5.QtGui import QIcon, QPixmap, QFontMetrics
+from PyQt5.QtGui import QIcon, QPixmap, QFontMetrics, QBrush, QColor
 from PyQt5.QtCore import Qt, QSize, pyqtSlot
 from PyQt5 import QtWidgets
 from PyQt5.QtWidgets import (
@@ -23,6 +23,10 @@ from PyQt5.QtWidgets import (
     QDialogButtonBox,
     QComboBox,
     QSizePolicy,
+    QCheckBox,
+    QTreeWidget,
+    QTreeWidgetItem,
+    QLineEdit,
 )
 
 import venvipy_rc  # pylint: disable=unused-import
@@ -409,6 +413,268 @@ class ProjectsDialog(QDialog):
 
 
 
+
+#]===========================================================================[#
+#] PACKAGES DIALOG [#========================================================[#
+#]===========================================================================[#
+
+class PackagesDialog(QDialog):
+    """
+    Dialog showing a text about the packages of a venv, like the list
+    or freeze output read from its metadata.
+    """
+    def __init__(self, title, text, parent=None):
+        super().__init__(parent)
+
+        self.title = title
+        self.text = text
+
+        self.initUI()
+
+    def initUI(self):
+        self.setWindowTitle(self.title)
+        self.resize(880, 510)
+        self.center()
+        self.setWindowIcon(QIcon(":/img/profile.png"))
+        self.setWindowFlag(Qt.WindowContextHelpButtonHint, False)
+
+        self.setStyleSheet(
+            """
+            QTextEdit {
+                background-color: black;
+                color: lightgrey;
+                selection-background-color: rgb(50, 50, 60);
+                selection-color: rgb(0, 255, 0)
+            }
+            """
+        )
+
+        self.text_window = QTextEdit()
+        self.text_window.setReadOnly(True)
+        self.text_window.setFontFamily("Monospace")
+        self.text_window.setFontPointSize(11)
+        self.text_window.setLineWrapMode(QTextEdit.NoWrap)
+        self.text_window.setPlainText(self.text)
+
+        self.close_button = QPushButton("Close", self)
+        self.close_button.clicked.connect(self.accept)
+
+        v_layout = QVBoxLayout(self)
+        v_layout.addWidget(self.text_window)
+        v_layout.addWidget(self.close_button)
+
+    def center(self):
+        """Center Dialog."""
+        qr = self.frameGeometry()
+        cp = QDesktopWidget().availableGeometry().center()
+        qr.moveCenter(cp)
+        self.move(qr.topLeft())
+
+
+
+#]===========================================================================[#
+#] FREEZE OPTIONS DIALOG [#==================================================[#
+#]===========================================================================[#
+
+class FreezeOptionsDialog(QDialog):
+    """
+    Dialog asking for the options of a requirements export, like
+    `pip freeze --all --exclude <name>`.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.initUI()
+
+    def initUI(self):
+        self.setWindowTitle("Requirements options")
+        self.setWindowIcon(QIcon(":/img/profile.png"))
+        self.setWindowFlag(Qt.WindowContextHelpButtonHint, False)
+
+        self.all_box = QCheckBox(
+            "Include pip, setuptools and wheel (--all)", self
+        )
+
+        exclude_label = QLabel("Exclude (comma separated):", self)
+        self.exclude_line = QLineEdit(self)
+        self.exclude_line.setPlaceholderText("e.g. black, flake8")
+
+        button_box = QDialogButtonBox(
+            QDialogButtonBox.Ok | QDialogButtonBox.Cancel, self
+        )
+        button_box.accepted.connect(self.accept)
+        button_box.rejected.connect(self.reject)
+
+        v_layout = QVBoxLayout(self)
+        v_layout.addWidget(self.all_box)
+        v_layout.addWidget(exclude_label)
+        v_layout.addWidget(self.exclude_line)
+        v_layout.addWidget(button_box)
+
+    def include_all(self):
+        """Wether pip, setuptools and wheel are written too.
+        """
+        return self.all_box.isChecked()
+
+    def exclude(self):
+        """Return the names of the packages left out.
+        """
+        return [
+            name.strip() for name in self.exclude_line.text().split(",")
+            if name.strip()
+        ]
+
+
+
+#]===========================================================================[#
+#] DEPENDENCY TREE DIALOG [#=================================================[#
+#]===========================================================================[#
+
+class DependencyTreeDialog(QDialog):
+    """
+    Dialog showing the dependency graph of a venv as a collapsible
+    tree, or as a reverse tree listing what requires each package.
+    Children are added when an item is expanded the first time.
+    """
+    def __init__(self, graph, venv, parent=None):
+        super().__init__(parent)
+
+        self.graph = graph
+        self.venv = venv
+
+        self.initUI()
+        self.populate()
+
+    def initUI(self):
+        self.setWindowTitle(f"Dependency tree of:  {self.venv}")
+        self.resize(880, 510)
+        self.center()
+        self.setWindowIcon(QIcon(":/img/profile.png"))
+        self.setWindowFlag(Qt.WindowContextHelpButtonHint, False)
+
+        self.tree = QTreeWidget(self)
+        self.tree.setHeaderLabels(["Package", "Installed", "Required"])
+        self.tree.setColumnWidth(0, 380)
+        self.tree.setColumnWidth(1, 160)
+        self.tree.itemExpanded.connect(self.on_item_expanded)
+
+        self.reverse_box = QCheckBox(
+            "Reverse (show what requires each package)", self
+        )
+        self.reverse_box.toggled.connect(self.populate)
+
+        problems = len(self.graph.problems())
+        self.status_label = QLabel(self)
+        self.status_label.setText(
+            f"{len(self.graph.dists)} packages, "
+            f"{problems} missing or conflicting requirement(s)"
+        )
+
+        self.collapse_button = QPushButton("Collapse all", self)
+        self.collapse_button.clicked.connect(self.tree.collapseAll)
+        self.close_button = QPushButton("Close", self)
+        self.close_button.clicked.connect(self.accept)
+
+        h_layout = QHBoxLayout()
+        h_layout.addWidget(self.reverse_box)
+        h_layout.addStretch()
+        h_layout.addWidget(self.status_label)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        button_layout.addWidget(self.collapse_button)
+        button_layout.addWidget(self.close_button)
+
+        v_layout = QVBoxLayout(self)
+        v_layout.addLayout(h_layout)
+        v_layout.addWidget(self.tree)
+        v_layout.addLayout(button_layout)
+
+    def center(self):
+        """Center Dialog."""
+        qr = self.frameGeometry()
+        cp = QDesktopWidget().availableGeometry().center()
+        qr.moveCenter(cp)
+        self.move(qr.topLeft())
+
+    def populate(self):
+        """Fill the tree with the top level items.
+        """
+        self.tree.clear()
+        if self.reverse_box.isChecked():
+            keys = sorted(self.graph.dists)
+        else:
+            keys = self.graph.roots()
+
+        items = []
+        for key in keys:
+            dist = self.graph.dists[key]
+            item = QTreeWidgetItem([dist.name, dist.version, ""])
+            self.add_placeholder(item, key, (key,))
+            items.append(item)
+        self.tree.addTopLevelItems(items)
+
+    def children(self, key):
+        """
+        Return `(key, name, installed, required, ok)` tuples of the
+        children of `key` in the current direction.
+        """
+        if self.reverse_box.isChecked():
+            return [
+                (
+                    parent, self.graph.dists[parent].name,
+                    self.graph.dists[parent].version,
+                    dependency.required, dependency.satisfied
+                )
+                for parent, dependency in self.graph.required_by[key]
+            ]
+        return [
+            (
+                dependency.key, dependency.requirement.name,
+                dependency.dist.version if dependency.dist else "missing",
+                dependency.required, dependency.satisfied
+            )
+            for dependency in self.graph.requires[key]
+        ]
+
+    def add_placeholder(self, item, key, ancestors):
+        """
+        Remember the key and the ancestors of an item and give it an
+        empty child, so it can be expanded.
+        """
+        item.setData(0, Qt.UserRole, (key, ancestors))
+        if key in self.graph.dists and self.children(key):
+            item.addChild(QTreeWidgetItem())
+
+    @pyqtSlot(QTreeWidgetItem)
+    def on_item_expanded(self, item):
+        """Replace the empty child of an item by its real children.
+        """
+        data = item.data(0, Qt.UserRole)
+        if data is None or item.childCount() != 1 \
+                or item.child(0).data(0, Qt.UserRole) is not None:
+            return
+
+        key, ancestors = data
+        item.takeChildren()
+        red = QBrush(QColor("red"))
+        for child_key, name, installed, required, ok in self.children(key):
+            cycle = child_key in ancestors
+            child = QTreeWidgetItem([
+                f"{name} (cycle)" if cycle else name, installed, required
+            ])
+            if not ok:
+                for column in range(3):
+                    child.setForeground(column, red)
+            if cycle:
+                child.setData(0, Qt.UserRole, (child_key, ancestors))
+            else:
+                self.add_placeholder(
+                    child, child_key, ancestors + (child_key,)
+                )
+            item.addChild(child)
+
+
 if __name__ == "__main__":
 
     app = QApplication(sys.argv)
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+This module contains the environment sources. Each source knows where
+one tool (poetry, pipenv, hatch, uv, ...) keeps the virtual environments
+it creates and lists them without running the tool.
+"""
+import os
+import sys
+import glob
+
+from providers import (
+    USER_HOME,
+    list_dirs,
+    map_parallel,
+    natural_key,
+    run_timed,
+    tool_data_dir
+)
+
+
+
+def user_cache_dir():
+    """Return the per-user cache directory of the OS.
+    """
+    if os.name == 'nt':
+        return os.environ.get(
+            "LOCALAPPDATA", os.path.join(USER_HOME, "AppData", "Local")
+        )
+    if sys.platform == "darwin":
+        return os.path.join(USER_HOME, "Library", "Caches")
+    return os.environ.get(
+        "XDG_CACHE_HOME", os.path.join(USER_HOME, ".cache")
+    )
+
+
+def user_data_dir():
+    """Return the per-user data directory of the OS.
+    """
+    if os.name == 'nt':
+        return os.environ.get(
+            "LOCALAPPDATA", os.path.join(USER_HOME, "AppData", "Local")
+        )
+    if sys.platform == "darwin":
+        return os.path.join(USER_HOME, "Library", "Application Support")
+    return os.environ.get(
+        "XDG_DATA_HOME", os.path.join(USER_HOME, ".local", "share")
+    )
+
+
+def is_venv_dir(path):
+    """Test wether a directory holds a `pyvenv.cfg` file.
+    """
+    return os.path.isfile(os.path.join(path, "pyvenv.cfg"))
+
+
+
+class EnvSource:
+    """
+    Base class of all environment sources.
+    """
+    name = "base"
+
+    def roots(self):
+        """
+        Return the directories holding the environments of this source.
+        """
+        return []
+
+    def venv_paths(self):
+        """
+        Return the paths of the environments of this source.
+        """
+        return [
+            path for root in self.roots() for path in list_dirs(root)
+            if is_venv_dir(path)
+        ]
+
+    def venv_name(self, venv_path):
+        """
+        Return the name an environment of this source is shown as.
+        """
+        return os.path.basename(venv_path)
+
+
+
+class PoetrySource(EnvSource):
+    """Environments created by poetry outside of the projects."""
+    name = "poetry"
+
+    def roots(self):
+        if "POETRY_VIRTUALENVS_PATH" in os.environ:
+            return [os.environ["POETRY_VIRTUALENVS_PATH"]]
+        if "POETRY_CACHE_DIR" in os.environ:
+            cache_dir = os.environ["POETRY_CACHE_DIR"]
+        elif os.name == 'nt':
+            cache_dir = os.path.join(user_cache_dir(), "pypoetry", "Cache")
+        else:
+            cache_dir = os.path.join(user_cache_dir(), "pypoetry")
+        return [os.path.join(cache_dir, "virtualenvs")]
+
+
+class PipenvSource(EnvSource):
+    """Environments created by pipenv outside of the projects."""
+    name = "pipenv"
+
+    def roots(self):
+        if "WORKON_HOME" in os.environ:
+            return [os.path.expanduser(os.environ["WORKON_HOME"])]
+        if os.name == 'nt':
+            return [os.path.join(USER_HOME, ".virtualenvs")]
+        return [os.path.join(tool_data_dir(), "virtualenvs")]
+
+
+class HatchSource(EnvSource):
+    """
+    Virtual environments created by hatch, kept as
+    `env/virtual/<project>/<project id>/<env>`.
+    """
+    name = "hatch"
+
+    def roots(self):
+        data_dir = os.environ.get(
+            "HATCH_DATA_DIR", os.path.join(user_data_dir(), "hatch")
+        )
+        return [os.path.join(data_dir, "env", "virtual")]
+
+    def venv_paths(self):
+        paths = []
+        for root in self.roots():
+            pattern = os.path.join(glob.escape(root), "*", "*", "*")
+            paths.extend(
+                path for path in sorted(glob.glob(pattern), key=natural_key)
+                if is_venv_dir(path)
+            )
+        return paths
+
+    def venv_name(self, venv_path):
+        rest, env = os.path.split(venv_path)
+        project = os.path.basename(os.path.dirname(rest))
+        return f"{project}/{env}"
+
+
+class UvSource(EnvSource):
+    """Environments of the tools installed by `uv tool install`."""
+    name = "uv"
+
+    def roots(self):
+        if "UV_TOOL_DIR" in os.environ:
+            return [os.environ["UV_TOOL_DIR"]]
+        return [os.path.join(tool_data_dir(), "uv", "tools")]
+
+
+ENV_SOURCES = [
+    PoetrySource(),
+    PipenvSource(),
+    HatchSource(),
+    UvSource(),
+]
+
+
+def run_env_source(source):
+    """Return the environments of a single source.
+    """
+    return run_timed(
+        f"Environment source '{source.name}'", source.venv_paths
+    )
+
+
+def run_env_sources(sources=None):
+    """
+    Run all sources in parallel and return a list of
+    `(source, venv paths)` tuples, in the order of the sources.
+    """
+    if sources is None:
+        sources = ENV_SOURCES
+    return list(zip(sources, map_parallel(run_env_source, sources)))
@@ -4,19 +4,55 @@ This module provides all the necessary data.
 """
 import xmlrpc.client
 import shutil
-import csv
+import json
+import logging
 import sys
 import os
-from subprocess import Popen, PIPE
-from dataclasses import dataclass
+import re
+import time
+import glob
+from fnmatch import fnmatch
+from itertools import islice
+from collections import deque
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from subprocess import Popen, PIPE, TimeoutExpired
+from dataclasses import dataclass, field, asdict
 
 from venvi_cfg import VenvConfigMgr
+from registry import (
+    InterpreterRegistry, REGISTRY_FILE, SOURCE_SCAN, SOURCE_USER
+)
+from providers import run_providers, provider_roots
+from env_sources import ENV_SOURCES, run_env_sources
+from venv_index import VenvIndex, INDEX_FILE, VENV_FILES, venv_fingerprint
+from package_index import PackageIndex, PACKAGE_INDEX_FILE
 
 __version__ = "0.3.5"
 
+logger = logging.getLogger(__name__)
+
+# seconds to wait for a single interpreter to answer
+PROBE_TIMEOUT = 10
+
+# number of interpreters probed at the same time
+PROBE_WORKERS = 16
+
+# oldest Python able to create virtual environments
+MIN_VERSION = (3, 3)
+
+# number of venvs read at the same time
+VENV_WORKERS = 8
+
+# number of venvs handed to the venv table at once
+VENV_BATCH_SIZE = 50
+
 CFG_DIR = os.path.expanduser("~/.venvipy")
-DB_FILE = os.path.expanduser("~/.venvipy/py-installs")
+DB_FILE = REGISTRY_FILE
+CSV_DB_FILE = os.path.expanduser("~/.venvipy/py-installs")
 ACTIVE_FILE = os.path.expanduser("~/.venvipy/active")
+ROOTS_FILE = os.path.expanduser("~/.venvipy/search-roots")
+WORKSPACE_FILE = os.path.expanduser("~/.venvipy/workspace-roots")
 
 if os.name == 'nt':
     USER_HOME = os.environ['USERPROFILE']
@@ -30,6 +66,37 @@ else:
     USER_LOCAL_3 = os.path.join(USER_HOME, 'python')
     PATHS = [USER_HOME, USER_LOCAL, USER_LOCAL_2, USER_LOCAL_3]
 
+# how many directory levels below a search root are looked at
+DEFAULT_ROOT_DEPTH = 1
+
+# directory names never descended into when searching a root
+DEFAULT_SKIP_PATTERNS = [
+    ".*", "__pycache__", "node_modules", "site-packages", "Lib", "lib"
+]
+
+# where a venv was found, besides the names of the environment sources
+ORIGIN_FOLDER = "folder"
+ORIGIN_WORKSPACE = "workspace"
+
+# how many directory levels below a workspace root are looked at
+DEFAULT_WORKSPACE_DEPTH = 4
+
+# directory names never descended into when searching a workspace
+DEFAULT_WORKSPACE_SKIP = [
+    ".git", ".hg", ".svn", ".tox", ".nox", ".mypy_cache", ".pytest_cache",
+    "__pycache__", "node_modules", "site-packages", "build", "dist",
+    "*.egg-info"
+]
+
+REGISTRY = InterpreterRegistry(DB_FILE)
+VENV_INDEX = VenvIndex(INDEX_FILE)
+PACKAGE_INDEX = PackageIndex(PACKAGE_INDEX_FILE)
+
+if os.name == 'nt':
+    PYTHON_BIN_RE = re.compile(r"^python(3(\.\d+)?t?)?\.exe$", re.IGNORECASE)
+else:
+    PYTHON_BIN_RE = re.compile(r"^python3\.\d+t?$")
+
 #]===========================================================================[#
 #] FIND PYTHON 3 INSTALLATIONS [#============================================[#
 #]===========================================================================[#
@@ -63,11 +130,19 @@ def ensure_confdir():
         os.mkdir(CFG_DIR)
 
 
-def ensure_dbfile():
-    """Create the database in `~/.venvipy/py-installs`.
+def ensure_dbfile(scan=True):
+    """
+    Fill the database in `~/.venvipy/py-installs.db` on first use.
+    Import the interpreters from the old CSV database if there is one,
+    else search for interpreters if `scan=True`. Other calls may have
+    created the file already, so the registry's marker is checked.
     """
-    if not os.path.exists(DB_FILE):
-        get_python_installs()
+    if not REGISTRY.initialized():
+        ensure_confdir()
+        if os.path.exists(CSV_DB_FILE):
+            REGISTRY.import_csv(CSV_DB_FILE)
+        elif scan:
+            get_python_installs(relaunching=True)
 
 
 def ensure_active_file():
@@ -79,143 +154,953 @@ def ensure_active_file():
             f.write("")
 
 
-def get_python_version(py_path):
-    """Return Python version.
+# Runs inside the probed interpreter, so it has to stay compatible
+# with every Python we may find (no f-strings, no walrus, etc.).
+PROBE_SCRIPT = """
+import json, os, platform, sys, sysconfig
+try:
+    from importlib.util import find_spec
+except ImportError:
+    from pkgutil import find_loader as find_spec
+def importable(name):
+    try:
+        return find_spec(name) is not None
+    except Exception:
+        return False
+impl = getattr(sys, "implementation", None)
+print(json.dumps({
+    "version": "Python " + platform.python_version(),
+    "version_info": list(sys.version_info),
+    "implementation": impl.name if impl else platform.python_implementation().lower(),
+    "executable": sys.executable,
+    "realpath": os.path.realpath(sys.executable),
+    "prefix": sys.prefix,
+    "base_prefix": getattr(sys, "base_prefix", sys.prefix),
+    "has_venv": importable("venv"),
+    "has_ensurepip": importable("ensurepip"),
+    "platform": sysconfig.get_platform(),
+    "soabi": sysconfig.get_config_var("SOABI"),
+    "cache_tag": impl.cache_tag if impl else None,
+    "free_threading": bool(sysconfig.get_config_var("Py_GIL_DISABLED")),
+}))
+"""
+
+
+def run_python_script(py_path, script, timeout=None):
+    """
+    Run `script` with the interpreter and return the JSON it prints.
+    Return `None` if the interpreter fails or does not answer within
+    `timeout` seconds.
     """
+    if timeout is None:
+        timeout = PROBE_TIMEOUT
+
     res = Popen(
-        [py_path, "-V"],
+        [py_path, "-E", "-s", "-c", script],
         stdout=PIPE,
+        stderr=PIPE,
         universal_newlines=True
     )
-    out, _ = res.communicate()
-    python_version = out.strip()
-    return python_version
+    try:
+        out, _ = res.communicate(timeout=timeout)
+    except TimeoutExpired:
+        res.kill()
+        res.communicate()
+        logger.warning(f"Timed out probing '{py_path}' after {timeout}s")
+        return None
+    if res.returncode != 0:
+        return None
+    try:
+        return json.loads(out)
+    except ValueError:
+        logger.warning(f"Unexpected probe output from '{py_path}'")
+        return None
+
+
+def probe_python(py_path, timeout=None):
+    """
+    Run the interpreter once and return its introspection record
+    as a dict. Return `None` if the interpreter fails or does not
+    answer within `timeout` seconds.
+    """
+    return run_python_script(py_path, PROBE_SCRIPT, timeout)
 
 
-def get_python_installs(relaunching=False):
+def probe_pythons(py_paths, timeout=None, max_workers=PROBE_WORKERS):
     """
-    Write the found Python versions to `py-installs`. Create
-    a new database if `relaunching=True`.
+    Run `probe_python()` concurrently for every path in `py_paths`.
+    Yield `(py_path, record)` tuples in the order the probes finish.
+    """
+    py_paths = list(py_paths)
+    if not py_paths:
+        return
+
+    workers = max(1, min(max_workers, len(py_paths)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(probe_python, py_path, timeout): py_path
+            for py_path in py_paths
+        }
+        for future in as_completed(futures):
+            py_path = futures[future]
+            try:
+                record = future.result()
+            except OSError as e:
+                logger.warning(f"Could not probe '{py_path}': {e}")
+                record = None
+            yield py_path, record
+
+
+def get_fingerprint(py_path):
+    """
+    Return the real path of a Python binary and its fingerprint
+    `[inode, size, mtime]`. The fingerprint is `None` if the
+    binary can not be accessed.
+    """
+    real_path = os.path.realpath(py_path)
+    try:
+        st = os.stat(real_path)
+    except OSError:
+        return real_path, None
+    return real_path, [st.st_ino, st.st_size, st.st_mtime_ns]
+
+
+def is_wrapper(real_path, record):
+    """
+    Test wether the binary at `real_path` ran another one, according
+    to its probe `record`.
+    """
+    return record is not None and record["realpath"] != real_path
+
+
+def get_python_records(py_paths):
+    """
+    Return a dict mapping each path in `py_paths` to its
+    introspection record (`None` if probing failed). Only
+    binaries that are new or changed since the last run are
+    probed, all others are answered from the cache, failures
+    included. Wrappers like pyenv shims run another binary
+    depending on settings the fingerprint can't see, they are
+    probed every time.
+    """
+    cache = REGISTRY.load_probes()
+    fingerprints = {}
+    records = {}
+    probed = {}
+    misses = []
+
+    for py_path in py_paths:
+        real_path, fingerprint = get_fingerprint(py_path)
+        fingerprints[py_path] = (real_path, fingerprint)
+        entry = cache.get(real_path)
+        if (
+            fingerprint is not None
+            and entry is not None
+            and entry.get("fingerprint") == fingerprint
+            and "record" in entry
+            and not is_wrapper(real_path, entry["record"])
+        ):
+            records[py_path] = entry["record"]
+        else:
+            misses.append(py_path)
+
+    logger.debug(
+        f"Probe cache: {len(records)} hit(s), {len(misses)} miss(es)"
+    )
+
+    for py_path, record in probe_pythons(misses):
+        records[py_path] = record
+        real_path, fingerprint = fingerprints[py_path]
+        # failures are cached too, a binary that hangs or crashes
+        # is only run again once it changed
+        if fingerprint is not None:
+            probed[real_path] = {
+                "fingerprint": fingerprint,
+                "record": record
+            }
+
+    if probed:
+        REGISTRY.save_probes(probed)
+
+    return records
+
+
+def get_python_record(py_path):
+    """
+    Return the introspection record of a single interpreter,
+    or `None` if it can not be probed.
+    """
+    return get_python_records([py_path]).get(py_path)
+
+
+def get_cached_record(py_path):
+    """
+    Return the probe record of an interpreter from the registry
+    without running it, or `None` if it was not probed since it
+    last changed.
+    """
+    real_path, fingerprint = get_fingerprint(py_path)
+    entry = REGISTRY.load_probes().get(real_path)
+    if (
+        fingerprint is None
+        or entry is None
+        or entry.get("fingerprint") != fingerprint
+        or is_wrapper(real_path, entry.get("record"))
+    ):
+        return None
+    return entry.get("record")
+
+
+def normalize_python_path(python_path):
+    """
+    For some reason, on windows, `shutil.which()` upper cases the
+    python interpreter's extension, as in EXE, when in the file
+    system, it is lower case. This causes issues later when we do
+    string compares in the py_installs CSV DB.
+    """
+    if os.name == 'nt':
+        return python_path[:-3] + python_path[-3:].lower()
+    return python_path
+
+
+def python_bin_key(name):
+    """
+    Sort key for binary names like `python3.12t`, newest first.
+    """
+    numbers = [int(n) for n in re.findall(r"\d+", name)]
+    return [-n for n in numbers], name
+
+
+def scan_path(path_list=None):
+    """
+    Return the paths of all Python binaries found in `PATH`. Every
+    directory is listed only once and binaries reachable through
+    several names or directories are reported only once.
+    """
+    if path_list is None:
+        path_list = os.environ.get("PATH", "")
+
+    seen_dirs = set()
+    seen_bins = set()
+    found = []
+
+    for directory in path_list.split(os.pathsep):
+        if not directory:
+            continue
+        real_dir = os.path.realpath(directory)
+        if real_dir in seen_dirs:
+            continue
+        seen_dirs.add(real_dir)
+
+        # the store stubs in 'WindowsApps' may open the store when run
+        if os.name == 'nt' and "WindowsApps" in real_dir:
+            continue
+
+        try:
+            with os.scandir(directory) as it:
+                entries = [e for e in it if PYTHON_BIN_RE.match(e.name)]
+        except OSError:
+            continue
+
+        for entry in sorted(entries, key=lambda e: python_bin_key(e.name)):
+            try:
+                if not entry.is_file():
+                    continue
+                st = os.stat(entry.path)
+            except OSError:
+                continue  # e.g. a dangling symlink
+            if not os.access(entry.path, os.X_OK):
+                continue
+
+            # no inode numbers from FAT or some network drives
+            if st.st_ino:
+                key = (st.st_dev, st.st_ino)
+            else:
+                key = os.path.realpath(entry.path)
+            if key in seen_bins:
+                continue
+            seen_bins.add(key)
+            found.append(normalize_python_path(entry.path))
+
+    return found
+
+
+#]===========================================================================[#
+#] SEARCH ROOTS [#===========================================================[#
+#]===========================================================================[#
+
+@dataclass
+class SearchRoot:
+    """A directory searched for Python installs."""
+    path: str
+    depth: int = DEFAULT_ROOT_DEPTH
+
+
+@dataclass
+class SearchConfig:
+    """The search roots and the directory names to skip."""
+    roots: list = field(default_factory=list)
+    skip: list = field(default_factory=lambda: list(DEFAULT_SKIP_PATTERNS))
+
+
+def root_key(path):
+    """Return the key used to detect duplicate search roots.
+    """
+    return os.path.normcase(os.path.realpath(os.path.expanduser(path)))
+
+
+def dedupe_roots(roots):
+    """
+    Drop roots pointing to a directory that is already in the list.
+    If the same directory is listed twice, the larger depth wins.
+    """
+    unique = {}
+    for root in roots:
+        key = root_key(root.path)
+        if key in unique:
+            unique[key].depth = max(unique[key].depth, root.depth)
+        else:
+            unique[key] = SearchRoot(root.path, root.depth)
+    return list(unique.values())
+
+
+def default_search_roots():
+    """
+    Return the OS specific default roots plus the roots given
+    in the `PYTHON_INSTALLS` environment variable.
+    """
+    roots = [SearchRoot(path) for path in PATHS]
+
+    # Short of searching the registry (shudder), I thought
+    # this might be a good compromise
+    py_installs = os.environ.get("PYTHON_INSTALLS", "")
+    roots.extend(SearchRoot(path) for path in py_installs.split(";") if path)
+    return roots
+
+
+def read_roots_file(roots_file, config, default_depth):
+    """
+    Read the roots and skip patterns of a roots file into `config`.
+    Write the file if it does not exist yet, so it can be edited
+    by hand.
+    """
+    try:
+        with open(roots_file, "r") as f:
+            data = json.load(f)
+        config.roots = [
+            SearchRoot(r["path"], int(r.get("depth", default_depth)))
+            for r in data.get("roots", [])
+        ]
+        config.skip = list(data.get("skip", config.skip))
+    except FileNotFoundError:
+        write_roots_file(roots_file, config)
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        logger.warning(f"Ignoring invalid '{roots_file}': {e}")
+
+
+def write_roots_file(roots_file, config):
+    """
+    Write the roots and skip patterns of `config` to a roots file.
     """
-    versions = ["3.9", "3.8", "3.7", "3.6", "3.5", "3.4", "3.3"]
-    py_info_list = []
     ensure_confdir()
+    config.roots = dedupe_roots(config.roots)
+    tmp_file = f"{roots_file}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(asdict(config), f, indent=4)
+    os.replace(tmp_file, roots_file)
 
-    if not os.path.exists(DB_FILE) or relaunching:
-        with open(DB_FILE, "w", newline="") as cf:
-            fields = ["PYTHON_VERSION", "PYTHON_PATH"]
-            writer = csv.DictWriter(
-                cf,
-                delimiter=",",
-                quoting=csv.QUOTE_ALL,
-                fieldnames=fields
-            )
-            writer.writeheader()
-
-            for i, version in enumerate(versions):
-                python_path = shutil.which(f"python{version}")
-                if python_path is not None:
-                    # For some reason, on windows, shutil.which() upper cases
-                    # the python interpreter's extension, as in EXE, when in 
-                    # the file system, it is lower case. This causes issues
-                    # later when we do string compares in the py_installs CSV DB
-                    if os.name == 'nt':
-                        python_path = python_path[:-3] + python_path[-3:].lower()
-                    python_version = get_python_version(python_path)
-                    py_info = PythonInfo(python_version, python_path)
-                    py_info_list.append(py_info)
-                    writer.writerow({
-                        "PYTHON_VERSION": py_info.py_version,
-                        "PYTHON_PATH": py_info.py_path
-                    })
-
-            # The above code finds python interpreters that are in the execution
-            # path; some systems have python interpreters installed that are not
-            # in the execution path, by would like to be used for venv creation.
+
+def load_search_config(with_defaults=True):
+    """
+    Load the search config from `~/.venvipy/search-roots` and merge
+    in the default roots if `with_defaults=True`.
+    """
+    config = SearchConfig()
+    read_roots_file(ROOTS_FILE, config, DEFAULT_ROOT_DEPTH)
+
+    if with_defaults:
+        config.roots = config.roots + default_search_roots()
+    config.roots = dedupe_roots(config.roots)
+    return config
+
+
+def save_search_config(config):
+    """
+    Write the search config to `~/.venvipy/search-roots`.
+    """
+    write_roots_file(ROOTS_FILE, config)
+
+
+def add_search_root(path, depth=DEFAULT_ROOT_DEPTH):
+    """
+    Add a root to `~/.venvipy/search-roots`.
+    """
+    config = load_search_config(with_defaults=False)
+    config.roots.append(SearchRoot(path, depth))
+    save_search_config(config)
+
+
+def find_python_in_dir(directory):
+    """
+    Return the Python binary of an install directory like
+    `C:\\Python39` or `~/python/python3.9`, or `None`.
+    """
+    search_path = os.pathsep.join(
+        [directory, os.path.join(directory, "bin")]
+    )
+    for name in ("python", "python3"):
+        python_path = shutil.which(name, path=search_path)
+        if python_path is not None:
+            return normalize_python_path(python_path)
+    return None
+
+
+def search_root(root, skip_patterns):
+    """
+    Walk `root` down to `root.depth` levels and return the binaries
+    of all directories whose name starts with `python`. Directories
+    matching one of `skip_patterns` are not descended into.
+    """
+    found = []
+    level = [root.path]
+
+    for _ in range(root.depth):
+        next_level = []
+        for directory in level:
             try:
-                # Short of searching the registry (shudder), I thought
-                # this might be a good compromise
-                py_installs = os.environ['PYTHON_INSTALLS']
-                PATHS.extend(py_installs.split(';'))
-            except:
-                pass
-
-            for path in PATHS:
-                if not os.path.exists(path):
+                with os.scandir(directory) as it:
+                    entries = [e for e in it if e.is_dir()]
+            except OSError:
+                continue
+
+            for entry in entries:
+                if any(fnmatch(entry.name, p) for p in skip_patterns):
                     continue
                 # Looking for a directory that starts with 'python'
-                for item in os.listdir(path):
-                    item_full_path = os.path.join(path, item)
-                    if os.path.isdir(item_full_path):
-                        if item.lower().startswith('python'):
-                            python_path = shutil.which("python", path=item_full_path)
-                            if python_path is not None:
-                                if os.name == 'nt':
-                                    # For some reason, on windows, shutil.which() upper cases
-                                    # the python interpreter's extension, as in EXE, when in 
-                                    # the file system, it is lower case. This causes issues
-                                    # later when we do string compares against the file system.
-                                    python_path = python_path[:-3] + python_path[-3:].lower()   
-
-                                python_version = get_python_version(python_path)
-                                if python_version:
-                                    # It seems that on Windows, the Python 2.7 interpreter
-                                    # returns an empty version string to stdout, None to stderr
-                                    # and yet the console shows the -V output, go figure.
-                                    py_info = PythonInfo(python_version, python_path)
-                                    py_info_list.append(py_info)
-                                    writer.writerow({
-                                        "PYTHON_VERSION": py_info.py_version,
-                                        "PYTHON_PATH": py_info.py_path
-                                    })
-
-            cf.close()
-
-            # add the system's Python manually if running in a virtual env
-            if "VIRTUAL_ENV" in os.environ:
-                system_python = os.path.realpath(sys.executable)
-                add_python(system_python)
+                if entry.name.lower().startswith("python"):
+                    python_path = find_python_in_dir(entry.path)
+                    if python_path is not None:
+                        found.append(python_path)
+                        continue
+                next_level.append(entry.path)
+        level = next_level
+
+    return found
+
+
+def find_python_candidates():
+    """
+    Return the paths of all Python binaries found, without
+    running any of them.
+    """
+    candidates = scan_path()
+
+    # The above code finds python interpreters that are in the execution
+    # path; some systems have python interpreters installed that are not
+    # in the execution path, by would like to be used for venv creation.
+    config = load_search_config()
+    for root in config.roots:
+        if not os.path.isdir(root.path):
+            continue
+        start = time.perf_counter()
+        found = search_root(root, config.skip)
+        logger.debug(
+            f"Searched '{root.path}' (depth {root.depth}) in "
+            f"{time.perf_counter() - start:.3f}s, found {len(found)}"
+        )
+        candidates.extend(found)
+
+    # pyenv, asdf, conda, uv, ... know where their installs live
+    candidates.extend(run_providers())
+
+    # drop duplicates, keep the order of discovery
+    return list(dict.fromkeys(candidates))
+
+
+def get_python_installs(relaunching=False):
+    """
+    Write the found Python versions to the registry. Rescan if
+    `relaunching=True`. Interpreters that are new or changed are
+    probed concurrently.
+    """
+    py_info_list = []
+    ensure_confdir()
+
+    if relaunching or not REGISTRY.initialized():
+        candidates = find_python_candidates()
+        records = get_python_records(candidates)
+
+        # keep the rows in the order of discovery, list binaries
+        # reached through wrappers like pyenv shims only once
+        rows = []
+        seen = set()
+        for python_path in candidates:
+            record = records.get(python_path)
+            if record is None or record["realpath"] in seen:
+                continue
+            if tuple(record["version_info"][:2]) < MIN_VERSION:
+                continue
+            seen.add(record["realpath"])
+            py_info = PythonInfo(record["version"], python_path)
+            py_info_list.append(py_info)
+            rows.append((py_info.py_version, python_path, record["realpath"]))
+        REGISTRY.replace_scanned(
+            rows, keep_probes={os.path.realpath(p) for p in candidates}
+        )
+
+        # add the system's Python manually if running in a virtual env
+        if "VIRTUAL_ENV" in os.environ:
+            system_python = os.path.realpath(sys.executable)
+            add_python(system_python)
 
         return py_info_list[::-1]
     return False
 
 
-def add_python(py_path):
+def get_interpreters(scan=True):
+    """
+    Return the registered Python installs as a list of `PythonInfo`
+    objects. Use `scan=False` to only read what is already known.
+    """
+    ensure_dbfile(scan)
+    return [
+        PythonInfo(version, path)
+        for version, path, _, _ in REGISTRY.interpreters()
+    ]
+
+
+@dataclass
+class InterpreterChanges:
+    """Interpreters added, removed or changed by a rescan."""
+    added: list
+    removed: list
+    changed: list
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+
+def diff_interpreters(old, new):
     """
-    Write (append) a Python version and its path to `py-installs`.
+    Compare two lists of `PythonInfo` objects by path.
     """
-    ensure_dbfile()
+    old_infos = {info.py_path: info for info in old}
+    new_infos = {info.py_path: info for info in new}
+    return InterpreterChanges(
+        added=[i for i in new if i.py_path not in old_infos],
+        removed=[i for i in old if i.py_path not in new_infos],
+        changed=[
+            i for i in new
+            if i.py_path in old_infos and old_infos[i.py_path] != i
+        ]
+    )
+
+
+def rediscover_pythons():
+    """
+    Rescan for interpreters and return what changed compared
+    to the registry content before the rescan.
+    """
+    before = get_interpreters(scan=False)
+    get_python_installs(True)
+    return diff_interpreters(before, get_interpreters(scan=False))
+
 
-    with open(DB_FILE, "a", newline="") as cf:
-        fields = ["PYTHON_VERSION", "PYTHON_PATH"]
-        writer = csv.DictWriter(
-            cf,
-            delimiter=",",
-            quoting=csv.QUOTE_ALL,
-            fieldnames=fields
+def update_pythons(paths):
+    """
+    Update the registry for the entries in `paths` that have been
+    added, replaced or removed, without a full rescan. Entries may
+    be binaries or install directories. Return what changed.
+    """
+    before = get_interpreters(scan=False)
+    registered = {
+        path: (realpath, source)
+        for _, path, realpath, source in REGISTRY.interpreters()
+    }
+
+    candidates = []
+    gone = set()
+    for path in paths:
+        if os.path.isdir(path):
+            python_path = find_python_in_dir(path)
+            if python_path is not None:
+                candidates.append(python_path)
+        elif os.path.isfile(path) and (
+            path in registered
+            or PYTHON_BIN_RE.match(os.path.basename(path))
+        ):
+            candidates.append(normalize_python_path(path))
+
+        # the interpreters at or below the entry are probed again
+        prefix = os.path.join(path, "")
+        gone.update(
+            p for p, (_, source) in registered.items()
+            if source == SOURCE_SCAN and (p == path or p.startswith(prefix))
         )
-        writer.writerow({
-            "PYTHON_VERSION": get_python_version(py_path),
-            "PYTHON_PATH": py_path
-        })
-        cf.close()
+    candidates = list(dict.fromkeys(candidates))
+
+    # binaries reached through another registered path are listed once
+    seen = {
+        realpath for path, (realpath, _) in registered.items()
+        if realpath and path not in gone and path not in candidates
+    }
+    records = get_python_records(candidates)
+    rows = []
+    for python_path in candidates:
+        record = records.get(python_path)
+        if record is None or record["realpath"] in seen:
+            continue
+        if tuple(record["version_info"][:2]) < MIN_VERSION:
+            continue
+        seen.add(record["realpath"])
+        rows.append((record["version"], python_path, record["realpath"]))
+
+    found = {path for _, path, _ in rows}
+    REGISTRY.update_scanned(rows, removed=gone - found)
+    return diff_interpreters(before, get_interpreters(scan=False))
+
+
+def get_watch_paths():
+    """
+    Return the directories where interpreters may appear, as a dict
+    mapping each directory to `True` if any new entry in it is an
+    install (provider roots), and the registered binaries.
+    """
+    watch_dirs = {}
+    for directory in os.environ.get("PATH", "").split(os.pathsep):
+        if directory:
+            watch_dirs[directory] = False
+    for root in load_search_config().roots:
+        watch_dirs.setdefault(root.path, False)
+    for root, installs_only in provider_roots().items():
+        watch_dirs[root] = watch_dirs.get(root, False) or installs_only
+
+    watch_dirs = {
+        directory: any_entry
+        for directory, any_entry in watch_dirs.items()
+        if os.path.isdir(directory)
+    }
+    watch_files = [info.py_path for info in get_interpreters(scan=False)]
+    return watch_dirs, watch_files
+
+
+def is_interpreter_entry(name):
+    """
+    Test wether a directory entry may be a Python binary or
+    a Python install directory.
+    """
+    return bool(PYTHON_BIN_RE.match(name)) or name.lower().startswith("python")
+
+
+def get_installed_paths():
+    """
+    Return the set of registered interpreter paths.
+    """
+    ensure_dbfile(scan=False)
+    return REGISTRY.installed_paths()
+
+
+def add_python(py_path):
+    """
+    Add a Python version and its path to the registry.
+    """
+    ensure_dbfile(scan=False)
+    record = get_python_record(py_path)
+
+    REGISTRY.add(
+        py_path,
+        record["version"] if record else "",
+        record["realpath"] if record else None,
+        source=SOURCE_USER
+    )
 
     # remove the interpreter if running in a virtual env
     if "VIRTUAL_ENV" in os.environ:
         remove_env()
 
 
+def remove_python(py_path):
+    """
+    Remove a Python install from the registry.
+    """
+    removed = REGISTRY.remove(py_path)
+    logger.debug(f"Removed '{py_path}' from database")
+    return removed
+
+
 def remove_env():
     """
     Remove our interpreter if we're running in a virtual
     environment.
     """
-    with open(DB_FILE, "r") as f:
-        lines = f.readlines()
-    with open(DB_FILE, "w") as f:
-        for line in lines:
-            if sys.executable not in line.strip("\n"):
-                f.write(line)
+    venv_prefix = os.path.join(sys.prefix, "")
+    for _, path, _, _ in REGISTRY.interpreters():
+        if path == sys.executable or path.startswith(venv_prefix):
+            REGISTRY.remove(path)
+
+
+#]===========================================================================[#
+#] INTERPRETER HEALTH [#=====================================================[#
+#]===========================================================================[#
+
+HEALTH_OK = "ok"
+HEALTH_BROKEN = "broken"
+
+# actually import the modules needed to create a venv with pip
+HEALTH_SCRIPT = """
+import json
+result = {}
+for name in ("venv", "ensurepip"):
+    try:
+        __import__(name)
+        result[name] = None
+    except Exception as e:
+        result[name] = "%s: %s" % (type(e).__name__, e)
+print(json.dumps(result))
+"""
+
+
+@dataclass
+class HealthInfo:
+    """Health check result of a Python install."""
+    py_path: str
+    verdict: str
+    detail: str
+
+    @property
+    def ok(self):
+        return self.verdict == HEALTH_OK
+
+
+def check_python_health(py_path, timeout=None):
+    """
+    Check that the binary runs and that `venv` and `ensurepip`
+    can be imported.
+    """
+    _, fingerprint = get_fingerprint(py_path)
+    if fingerprint is None:
+        return HealthInfo(py_path, HEALTH_BROKEN, "binary not found")
+
+    try:
+        result = run_python_script(py_path, HEALTH_SCRIPT, timeout)
+    except OSError as e:
+        return HealthInfo(py_path, HEALTH_BROKEN, f"does not run: {e}")
+    if result is None:
+        return HealthInfo(py_path, HEALTH_BROKEN, "does not run")
+
+    for name in ("venv", "ensurepip"):
+        if result.get(name):
+            logger.debug(f"'{py_path}' can't import {name}: {result[name]}")
+            return HealthInfo(py_path, HEALTH_BROKEN, f"no {name}")
+    return HealthInfo(py_path, HEALTH_OK, "")
+
+
+def check_health(py_paths=None, timeout=None, max_workers=PROBE_WORKERS):
+    """
+    Check the health of the given (default: all registered)
+    interpreters concurrently. Store the verdicts with the
+    fingerprints of the binaries and return them as a dict
+    mapping each path to a `HealthInfo`.
+    """
+    if py_paths is None:
+        py_paths = [info.py_path for info in get_interpreters(scan=False)]
+    if not py_paths:
+        return {}
+
+    results = {}
+    workers = max(1, min(max_workers, len(py_paths)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(check_python_health, py_path, timeout): py_path
+            for py_path in py_paths
+        }
+        for future in as_completed(futures):
+            health = future.result()
+            results[health.py_path] = health
+
+    REGISTRY.save_health([
+        (h.py_path, get_fingerprint(h.py_path)[1], h.verdict, h.detail)
+        for h in results.values()
+    ])
+    return results
+
+
+def get_health():
+    """
+    Return the stored verdicts as a dict mapping each path to a
+    `HealthInfo`. Verdicts of binaries that changed since they
+    were checked are left out.
+    """
+    health = {}
+    for py_path, fingerprint, verdict, detail in REGISTRY.load_health():
+        if get_fingerprint(py_path)[1] == fingerprint:
+            health[py_path] = HealthInfo(py_path, verdict, detail)
+    return health
+
+
+def get_broken_paths():
+    """
+    Return the set of interpreters that failed their last check.
+    """
+    return {
+        py_path for py_path, health in get_health().items()
+        if not health.ok
+    }
+
+
+#]===========================================================================[#
+#] PARSE PYVENV.CFG [#=======================================================[#
+#]===========================================================================[#
+
+# `sys.version_info` release levels as written in a version string
+RELEASE_LEVELS = {"alpha": "a", "beta": "b", "candidate": "rc", "final": ""}
+
+
+@dataclass
+class PyvenvCfg:
+    """The values of a `pyvenv.cfg` file."""
+    home: str = ""
+    version: str = ""
+    include_system_site_packages: bool = None
+    executable: str = ""
+    prompt: str = ""
+    extra: dict = field(default_factory=dict)
+
+    @property
+    def version_info(self):
+        """
+        The version as tuple of ints, e.g. `(3, 12, 1)`. Empty
+        if the config has no readable version.
+        """
+        numbers = []
+        for part in self.version.split(".")[:3]:
+            if not part.isdigit():
+                break
+            numbers.append(int(part))
+        return tuple(numbers)
+
+    @property
+    def version_str(self):
+        """The version as shown in the venv table."""
+        if not self.version:
+            return "N/A"
+        # virtualenv and uv write `sys.version_info`, e.g. 3.13.0.final.0
+        parts = self.version.split(".")
+        if len(parts) == 5 and parts[3] in RELEASE_LEVELS:
+            level = RELEASE_LEVELS[parts[3]]
+            return to_version(
+                ".".join(parts[:3]) + (f"{level}{parts[4]}" if level else "")
+            )
+        return to_version(self.version)
+
+    @property
+    def site_packages(self):
+        """Wether the venv sees the global site-packages."""
+        if self.include_system_site_packages is None:
+            return "N/A"
+        if self.include_system_site_packages:
+            return "global"
+        return "isolated"
+
+    @property
+    def py_path(self):
+        """The interpreter the venv was created with."""
+        if self.executable:
+            return self.executable
+        return to_path(
+            self.home, ".".join(str(n) for n in self.version_info[:2])
+        )
+
+    def is_installed(self, installed=None):
+        """
+        Test wether the interpreter of the venv is registered. Pass
+        the set returned by `get_installed_paths()` as `installed`
+        when checking many venvs.
+        """
+        if installed is None:
+            installed = get_installed_paths()
+        py_path = self.py_path
+        return py_path in installed or os.path.realpath(py_path) in installed
+
+
+# parsed configs by file path: (mtime_ns, size, PyvenvCfg)
+_pyvenv_cfg_cache = {}
+
+
+def parse_pyvenv_cfg(text):
+    """
+    Parse the `key = value` lines of a `pyvenv.cfg` file the same way
+    `site.py` does. Knows the keys written by venv, virtualenv and uv.
+    """
+    values = {}
+    for line in text.splitlines():
+        key, sep, value = line.partition("=")
+        if sep:
+            values[key.strip().lower()] = value.strip()
+
+    # venv writes 'version', virtualenv and uv write 'version_info'
+    version = values.pop("version", "") or values.pop("version_info", "")
+    values.pop("version_info", None)
+
+    include = values.pop("include-system-site-packages", "").lower()
+    return PyvenvCfg(
+        home=values.pop("home", ""),
+        version=version,
+        include_system_site_packages={
+            "true": True, "false": False
+        }.get(include),
+        executable=values.pop("executable", ""),
+        prompt=values.pop("prompt", "").strip("'\""),
+        extra=values
+    )
+
+
+def read_pyvenv_cfg(cfg_file):
+    """
+    Return the `PyvenvCfg` of a `pyvenv.cfg` file, or `None` if it
+    can't be read. The file is only read again after it changed.
+    """
+    try:
+        st = os.stat(cfg_file)
+    except OSError:
+        _pyvenv_cfg_cache.pop(cfg_file, None)
+        return None
+
+    cached = _pyvenv_cfg_cache.get(cfg_file)
+    if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+
+    try:
+        with open(cfg_file, "r", encoding="utf-8", errors="replace") as f:
+            cfg = parse_pyvenv_cfg(f.read())
+    except OSError as e:
+        logger.warning(f"Failed to read '{cfg_file}': {e}")
+        return None
+
+    _pyvenv_cfg_cache[cfg_file] = (st.st_mtime_ns, st.st_size, cfg)
+    return cfg
+
+
+def get_venv_interpreter(venv_dir):
+    """
+    Return the `(version_info, implementation)` of the interpreter a
+    venv was created with, e.g. `((3, 12, 1), "cpython")`. Taken from
+    the probe record of the interpreter, else from the values virtualenv
+    and uv write to `pyvenv.cfg`. The version is empty if unknown.
+    """
+    cfg = read_pyvenv_cfg(os.path.join(venv_dir, "pyvenv.cfg"))
+    if cfg is None:
+        return (), "cpython"
+
+    record = get_cached_record(cfg.py_path)
+    if record is not None:
+        return (
+            tuple(record["version_info"][:3]),
+            record.get("implementation") or "cpython"
+        )
+    implementation = cfg.extra.get("implementation", "").lower()
+    return cfg.version_info, implementation or "cpython"
+
 
 
 #]===========================================================================[#
@@ -225,109 +1110,505 @@ def remove_env():
 @dataclass
 class VenvInfo:
     """_"""
+    __slots__ = (
+        "venv_name",
+        "venv_version",
+        "site_packages",
+        "is_installed",
+        "comment",
+        "refs",
+        "projects",
+        "venv_path",
+        "origin"
+    )
     venv_name: str
     venv_version: str
     site_packages: str
     is_installed: str
     comment: str
     refs: int
+    projects: list
+    venv_path: str
+    origin: str
 
 
-def get_venvs(path):
+def read_venv_record(venv_path, venv_name=None, origin=ORIGIN_FOLDER):
+    """
+    Read the `pyvenv.cfg` and `venvipy.cfg` files of a venv and return
+    a dict of what is shown in the venv table, or `None` if it is not
+    a venv. The venv is shown as `venv_name`, by default the name of
+    its directory.
+    """
+    pyvenv_cfg = read_pyvenv_cfg(os.path.join(venv_path, "pyvenv.cfg"))
+    if pyvenv_cfg is None:
+        return None
+
+    path, venv = os.path.split(venv_path)
+    vcf = VenvConfigMgr(path, venv)
+    vcf.read()
+
+    return {
+        "venv_name": venv_name or venv,
+        "venv_path": venv_path,
+        "venv_version": pyvenv_cfg.version_str,
+        "site_packages": pyvenv_cfg.site_packages,
+        "py_path": pyvenv_cfg.py_path,
+        "comment": vcf.vc.comment,
+        "refs": str(len(vcf.vc.projects)),
+        "projects": list(vcf.vc.projects or []),
+        "origin": origin
+    }
+
+
+def to_venv_info(record, installed):
     """
-    Get the available virtual environments
-    from the specified folder.
+    Return the `VenvInfo` of a record returned by `read_venv_record()`.
     """
-    # return an emtpty list if directory doesn"t exist
-    if not os.path.isdir(path):
-        return []
+    py_path = record["py_path"]
+    is_installed = (
+        py_path in installed or os.path.realpath(py_path) in installed
+    )
+    return VenvInfo(
+        record["venv_name"],
+        record["venv_version"],
+        record["site_packages"],
+        "yes" if is_installed else "no",
+        record["comment"],
+        record["refs"],
+        record["projects"],
+        record["venv_path"],
+        record["origin"]
+    )
 
-    venv_info_list = []
 
-    for i, venv in enumerate(os.listdir(path)):
-        # build path to venv directory
-        valid_venv = os.path.join(path, venv)
-        if not os.path.isdir(valid_venv):
+def get_indexed_venvs(path):
+    """
+    Return the venvs of the specified folder and of the workspace
+    roots as found by the last scan, straight from the venv index
+    without touching the venvs.
+    """
+    keys = [os.path.abspath(path)] if path else []
+    keys.extend(
+        workspace_key(root) for root in load_workspace_config().roots
+    )
+    keys.extend(source_key(source) for source in ENV_SOURCES)
+
+    venv_infos = {}
+    installed = None
+    for key in keys:
+        index = VENV_INDEX.load(key)
+        if index and installed is None:
+            installed = get_installed_paths()
+        for venv_path, entry in index.items():
+            if venv_path not in venv_infos:
+                venv_infos[venv_path] = to_venv_info(
+                    entry["record"], installed
+                )
+    return list(venv_infos.values())
+
+
+def map_bounded(func, items, max_workers=VENV_WORKERS):
+    """
+    Yield `func(item)` for each of `items`, in order, computed by a
+    thread pool. Only a few items are submitted ahead, so closing the
+    generator early only waits for the calls already running.
+    """
+    items = iter(items)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            for item in islice(items, 2 * max_workers):
+                pending.append(executor.submit(func, item))
+            while pending:
+                result = pending.popleft().result()
+                for item in islice(items, 1):
+                    pending.append(executor.submit(func, item))
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def scan_venv_paths(key, venv_paths, names=None, installed=None,
+                    origin=ORIGIN_FOLDER, batch_size=VENV_BATCH_SIZE,
+                    max_workers=VENV_WORKERS):
+    """
+    Read the venvs in `venv_paths` with a thread pool and yield them
+    as lists of `VenvInfo`, in the order given. `names` maps a venv
+    path to the name shown, `origin` tells where they were found.
+    Venvs whose files didn't change since the last scan are taken
+    from the venv index, stored under `key`.
+    """
+    if names is None:
+        names = {}
+    if installed is None:
+        installed = get_installed_paths()
+    index = VENV_INDEX.load(key)
+    workers = max(1, min(max_workers, len(venv_paths) or 1))
+
+    def scan_venv(venv_path):
+        fingerprint = venv_fingerprint(venv_path)
+        entry = index.get(venv_path)
+        if entry is not None and entry["fingerprint"] == fingerprint:
+            return venv_path, entry
+        record = read_venv_record(venv_path, names.get(venv_path), origin)
+        if record is None:
+            return venv_path, None
+        return venv_path, {"fingerprint": fingerprint, "record": record}
+
+    entries = {}
+    reread = 0
+    batch = []
+    for venv_path, entry in map_bounded(scan_venv, venv_paths, workers):
+        if entry is None:
             continue
+        if entry is not index.get(venv_path):
+            reread += 1
+        entries[venv_path] = entry
+        batch.append(to_venv_info(entry["record"], installed))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+    logger.debug(f"Scanned '{key}': {len(entries)} venv(s), {reread} reread")
+    if entries != index:
+        VENV_INDEX.replace(key, entries)
+
+
+def iter_venvs(path, batch_size=VENV_BATCH_SIZE, max_workers=VENV_WORKERS):
+    """
+    Yield the virtual environments of the specified folder as lists
+    of `VenvInfo`, in the order of the directory entries. The venvs
+    are read by a thread pool and each batch is yielded as soon as
+    it is complete.
+    """
+    if not path:
+        return
+
+    folder = os.path.abspath(path)
+    try:
+        with os.scandir(folder) as it:
+            venv_paths = [e.path for e in it if e.is_dir()]
+    except OSError:
+        # yield nothing if directory doesn't exist
+        return
+
+    yield from scan_venv_paths(
+        folder, venv_paths, batch_size=batch_size, max_workers=max_workers
+    )
 
-        # build path to pyvenv.cfg file
-        cfg_file = os.path.join(valid_venv, "pyvenv.cfg")
-        if not os.path.isfile(cfg_file):
-            continue
 
-        venv_name = os.path.basename(valid_venv)
-        venv_version = get_pyvenv_cfg(cfg_file, "version")
-        site_packages = get_pyvenv_cfg(cfg_file, "site_packages")
-        is_installed = get_pyvenv_cfg(cfg_file, "installed")
+def iter_all_venvs(path):
+    """
+    Yield the venvs of the specified folder, then the ones found
+    in the workspace roots and by the environment sources, each
+    venv only once.
+    """
+    seen = set()
+    for venv_infos in iter_venvs(path):
+        seen.update(info.venv_path for info in venv_infos)
+        yield venv_infos
+    for venv_infos in iter_workspace_venvs(exclude=seen):
+        seen.update(info.venv_path for info in venv_infos)
+        yield venv_infos
+    yield from iter_source_venvs(exclude=seen)
+
+
+def get_active_dir_str():
+    """Get the default venv directory string from `active` file.
+    """
+    ensure_active_file()
+    with open(ACTIVE_FILE, "r") as f:
+        active_dir = f.read()
+        return active_dir
+    return ""
+
+
+#]===========================================================================[#
+#] WORKSPACES [#=============================================================[#
+#]===========================================================================[#
+
+def workspace_key(root):
+    """
+    Return the key the venvs of a workspace root are stored under in
+    the venv index, distinct from the key of a venv folder.
+    """
+    return f"workspace:{root_path(root)}"
+
+
+def root_path(root):
+    """Return the absolute path of a root.
+    """
+    return os.path.abspath(os.path.expanduser(root.path))
+
+
+def load_workspace_config():
+    """
+    Load the workspace roots from `~/.venvipy/workspace-roots`. Write
+    the file if it does not exist yet, so it can be edited by hand.
+    """
+    config = SearchConfig(skip=list(DEFAULT_WORKSPACE_SKIP))
+    read_roots_file(WORKSPACE_FILE, config, DEFAULT_WORKSPACE_DEPTH)
+    config.roots = dedupe_roots(config.roots)
+    return config
+
+
+def add_workspace_root(path, depth=DEFAULT_WORKSPACE_DEPTH):
+    """
+    Add a root to `~/.venvipy/workspace-roots`.
+    """
+    config = load_workspace_config()
+    config.roots.append(SearchRoot(path, depth))
+    write_roots_file(WORKSPACE_FILE, config)
+
+
+def list_workspace_dir(directory, cached=None):
+    """
+    Return `[mtime_ns, is_venv, subdirs]` of a directory, or `None` if
+    it can't be read. The `cached` listing is reused if the mtime of
+    the directory didn't change.
+    """
+    try:
+        mtime = os.stat(directory).st_mtime_ns
+    except OSError:
+        return None
+    if cached is not None and cached[0] == mtime:
+        return cached
+
+    try:
+        with os.scandir(directory) as it:
+            entries = list(it)
+    except OSError:
+        return None
+
+    is_venv = any(e.name == "pyvenv.cfg" and e.is_file() for e in entries)
+    subdirs = sorted(
+        e.name for e in entries if e.is_dir(follow_symlinks=False)
+    )
+    return [mtime, is_venv, subdirs]
+
 
-        vcf = VenvConfigMgr(path, venv)
-        vcf.read()
-        comment = vcf.vc.comment
-        refs = str(len(vcf.vc.projects))
+def find_workspace_venvs(roots, skip_patterns, max_workers=VENV_WORKERS):
+    """
+    Walk the workspace roots in parallel, each down to `root.depth`
+    levels, and return a dict mapping each root path to the venvs
+    found below it. Venvs and directories matching `skip_patterns` are
+    not descended into. The listings are kept in the venv index, so
+    only directories that changed are listed again.
+    """
+    paths = [root_path(root) for root in roots]
+    found = {path: [] for path in paths}
+    cached = {path: VENV_INDEX.load_dirs(path) for path in paths}
+    listings = {path: {} for path in paths}
+
+    level = [
+        (path, path, root.depth) for path, root in zip(paths, roots)
+        if os.path.isdir(path)
+    ]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while level:
+            results = executor.map(
+                lambda item: list_workspace_dir(
+                    item[1], cached[item[0]].get(item[1])
+                ),
+                level
+            )
+            next_level = []
+            for (path, directory, depth), listing in zip(level, results):
+                if listing is None:
+                    continue
+                listings[path][directory] = listing
+                _, is_venv, subdirs = listing
+                if is_venv:
+                    found[path].append(directory)
+                    continue
+                if depth <= 0:
+                    continue
+                for name in subdirs:
+                    if any(fnmatch(name, p) for p in skip_patterns):
+                        continue
+                    next_level.append(
+                        (path, os.path.join(directory, name), depth - 1)
+                    )
+            level = next_level
 
-        venv_info = VenvInfo(
-            venv_name, venv_version, site_packages, is_installed, comment, refs
+    for path in paths:
+        if listings[path] != cached[path]:
+            VENV_INDEX.replace_dirs(path, listings[path])
+    return found
+
+
+def iter_workspace_venvs(exclude=()):
+    """
+    Yield the venvs found in the workspace roots as lists of
+    `VenvInfo`. The venvs are shown by their path relative to the
+    parent of their root, e.g. `code/project/.venv`.
+    """
+    config = load_workspace_config()
+    if not config.roots:
+        return
+
+    start = time.perf_counter()
+    found = find_workspace_venvs(config.roots, config.skip)
+    logger.debug(
+        f"Walked {len(config.roots)} workspace root(s) in "
+        f"{time.perf_counter() - start:.3f}s"
+    )
+
+    seen = set(exclude)
+    installed = get_installed_paths()
+    for root in config.roots:
+        path = root_path(root)
+        venv_paths = [p for p in found[path] if p not in seen]
+        seen.update(venv_paths)
+        names = {
+            p: os.path.relpath(p, os.path.dirname(path)) for p in venv_paths
+        }
+        yield from scan_venv_paths(
+            workspace_key(root), venv_paths, names, installed,
+            ORIGIN_WORKSPACE
         )
-        venv_info_list.append(venv_info)
 
-    return venv_info_list[::-1]   # This reverses the list
 
+#]===========================================================================[#
+#] ENVIRONMENT SOURCES [#====================================================[#
+#]===========================================================================[#
 
-def get_pyvenv_cfg(cfg_file, cfg):
+def source_key(source):
     """
-    Return the values as string from a `pyvenv.cfg` file.
-    Values for `cfg` can be strings: `version`, `py_path`,
-    `site_packages` or `installed`.
+    Return the key the venvs of an environment source are stored
+    under in the venv index.
     """
-    with open(cfg_file, "r") as f:
-        lines = f.readlines()
+    return f"source:{source.name}"
 
-    version_str = to_version(lines[2][10:].strip())
-    binary_path = to_path(lines[0][7:].strip(), lines[2][10:13].strip())
-    site_packages = lines[1][31:].strip()
 
-    if cfg == "version":
-        return version_str
+def iter_source_venvs(exclude=()):
+    """
+    Yield the venvs listed by the environment sources (poetry, pipenv,
+    hatch, uv, ...) as lists of `VenvInfo`, tagged with the name of
+    their source.
+    """
+    seen = set(exclude)
+    installed = get_installed_paths()
+    for source, found in run_env_sources():
+        venv_paths = [p for p in found if p not in seen]
+        seen.update(venv_paths)
+        names = {p: source.venv_name(p) for p in venv_paths}
+        yield from scan_venv_paths(
+            source_key(source), venv_paths, names, installed, source.name
+        )
+
 
-    if cfg == "py_path":
-        return binary_path
 
-    if cfg == "site_packages":
-        if site_packages == "true":
-            return "global"
-        if site_packages == "false":
-            return "isolated"
-        return "N/A"
+#]===========================================================================[#
+#] DISK USAGE [#=============================================================[#
+#]===========================================================================[#
 
-    if cfg == "installed":
-        ensure_dbfile()
-        with open(DB_FILE, newline="") as cf:
-            reader = csv.DictReader(cf, delimiter=",")
-            for info in reader:
-                if binary_path == info["PYTHON_PATH"]:
-                    return "yes"
-            return "no"
+def size_fingerprint(venv_path):
+    """
+    Return the mtimes of the directories changing when packages are
+    added or removed: the venv itself, its scripts directory and its
+    site-packages. `None` if the venv is gone.
+    """
+    dirs = [venv_path]
+    dirs.extend(glob.glob(os.path.join(glob.escape(venv_path), "*", "")))
+    dirs.extend(glob.glob(os.path.join(
+        glob.escape(venv_path), "lib", "python*", "site-packages"
+    )))
+    dirs.append(os.path.join(venv_path, "Lib", "site-packages"))
+
+    fingerprint = []
+    for directory in sorted(set(dirs)):
+        try:
+            fingerprint.append(os.stat(directory).st_mtime_ns)
+        except OSError:
+            if directory == venv_path:
+                return None
+            fingerprint.append(None)
+    return fingerprint
+
+
+def disk_usage(path):
+    """
+    Return the bytes used by the files below `path`. Files hardlinked
+    more than once are counted once, symlinks are not followed.
+    """
+    total = 0
+    seen = set()
+    stack = [path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                entries = list(it)
+        except OSError:
+            continue
 
-    return "N/A"
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
 
+            if st.st_nlink > 1 and st.st_ino:
+                key = (st.st_dev, st.st_ino)
+                if key in seen:
+                    continue
+                seen.add(key)
+            # the blocks allocated, where the OS tells
+            blocks = getattr(st, "st_blocks", None)
+            total += blocks * 512 if blocks is not None else st.st_size
+    return total
 
-def get_active_dir_str():
-    """Get the default venv directory string from `active` file.
+
+def get_cached_sizes():
     """
-    ensure_active_file()
-    with open(ACTIVE_FILE, "r") as f:
-        active_dir = f.read()
-        return active_dir
-    return ""
+    Return the sizes found by the last walk as a dict mapping
+    venv paths to bytes, without checking for changes.
+    """
+    return {path: size for path, (_, size) in VENV_INDEX.load_sizes().items()}
 
 
-def get_active_dir():
+def iter_venv_sizes(venv_paths, max_workers=VENV_WORKERS):
     """
-    Get the active venv directory path string from `active`
-    file and pass it to `get_venvs()`.
+    Yield dicts mapping venv paths to their size in bytes. The cached
+    sizes of venvs that didn't change are yielded first, then the
+    sizes of the others as they are walked in parallel. Closing the
+    generator stops the walks not started yet.
     """
-    active_dir = get_active_dir_str()
-    return get_venvs(active_dir)
+    cached = VENV_INDEX.load_sizes()
+    fingerprints = {p: size_fingerprint(p) for p in venv_paths}
+
+    sizes = {}
+    stale = []
+    for venv_path, fingerprint in fingerprints.items():
+        if fingerprint is None:
+            continue
+        entry = cached.get(venv_path)
+        if entry is not None and entry[0] == fingerprint:
+            sizes[venv_path] = entry[1]
+        else:
+            stale.append(venv_path)
+    if sizes:
+        yield sizes
+    if not stale:
+        return
+
+    start = time.perf_counter()
+    workers = max(1, min(max_workers, len(stale)))
+    with closing(map_bounded(disk_usage, stale, workers)) as results:
+        for venv_path, size in zip(stale, results):
+            VENV_INDEX.save_size(venv_path, fingerprints[venv_path], size)
+            yield {venv_path: size}
+    logger.debug(
+        f"Walked {len(stale)} venv(s) for their size in "
+        f"{time.perf_counter() - start:.3f}s"
+    )
+
 
 
 #]===========================================================================[#
@@ -0,0 +1,689 @@
+# -*- coding: utf-8 -*-
+"""
+This module reads the packages installed in a venv straight from the
+`*.dist-info` and `*.egg-info` metadata in its site-packages, without
+running pip or the venv's interpreter.
+"""
+import os
+import re
+import csv
+import glob
+import json
+import time
+import logging
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+
+logger = logging.getLogger(__name__)
+
+# left out of the freeze output, like `pip freeze` does without `--all`
+FREEZE_EXCLUDES = {"pip", "setuptools", "wheel", "distribute"}
+
+# number of venvs exported in parallel
+EXPORT_WORKERS = 8
+
+# number of venvs whose distributions are kept in memory
+INVENTORY_CACHE_SIZE = 32
+
+# the modules setuptools installs for PEP 660 editable installs
+EDITABLE_PREFIX = "__editable__"
+
+
+
+def canonical_name(name):
+    """Normalize a project name like PEP 503 does.
+    """
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def site_packages_dirs(venv_path):
+    """
+    Return the site-packages directories of a venv, for both the
+    POSIX and the Windows layout.
+    """
+    dirs = sorted(glob.glob(os.path.join(
+        glob.escape(venv_path), "lib", "python*", "site-packages"
+    )))
+    dirs.append(os.path.join(venv_path, "Lib", "site-packages"))
+
+    found = []
+    seen = set()
+    for directory in dirs:
+        if not os.path.isdir(directory):
+            continue
+        real = os.path.realpath(directory)
+        if real not in seen:
+            seen.add(real)
+            found.append(directory)
+    return found
+
+
+def inventory_fingerprint(venv_path):
+    """
+    Return the mtimes of the site-packages directories of a venv. They
+    change whenever a distribution is installed, upgraded or removed.
+    """
+    fingerprint = []
+    for directory in site_packages_dirs(venv_path):
+        try:
+            fingerprint.append([directory, os.stat(directory).st_mtime_ns])
+        except OSError:
+            pass
+    return fingerprint
+
+
+
+#]===========================================================================[#
+#] READ METADATA [#==========================================================[#
+#]===========================================================================[#
+
+def read_metadata(metadata_file):
+    """
+    Return the headers of a `METADATA` or `PKG-INFO` file as a dict
+    mapping lower case keys to lists of values. The description after
+    the headers is not read.
+    """
+    headers = {}
+    key = None
+    try:
+        with open(metadata_file, "r", encoding="utf-8",
+                  errors="replace") as f:
+            for line in f:
+                line = line.rstrip("\r\n")
+                if not line:
+                    break
+                if line[0] in " \t":
+                    # continuation of the previous value
+                    if key is not None:
+                        headers[key][-1] += f"\n{line.strip()}"
+                    continue
+                key, _, value = line.partition(":")
+                key = key.strip().lower()
+                headers.setdefault(key, []).append(value.strip())
+    except OSError:
+        return None
+    return headers
+
+
+def read_first_line(text_file):
+    """Return the first line of a small text file, or an empty string.
+    """
+    try:
+        with open(text_file, "r", encoding="utf-8", errors="replace") as f:
+            return f.readline().strip()
+    except OSError:
+        return ""
+
+
+def read_requires_txt(requires_file):
+    """
+    Return the requirements of an egg-info `requires.txt` as
+    `Requires-Dist` values. The `[extra:marker]` sections become
+    markers.
+    """
+    requires = []
+    marker = ""
+    try:
+        with open(requires_file, "r", encoding="utf-8",
+                  errors="replace") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                if line.startswith("[") and line.endswith("]"):
+                    extra, _, section_marker = line[1:-1].partition(":")
+                    markers = []
+                    if section_marker:
+                        markers.append(f"({section_marker})")
+                    if extra:
+                        markers.append(f'extra == "{extra}"')
+                    marker = " and ".join(markers)
+                    continue
+                requires.append(f"{line} ; {marker}" if marker else line)
+    except OSError:
+        return []
+    return requires
+
+
+def read_direct_url(dist_info):
+    """Return the parsed `direct_url.json` of a dist-info, or `None`.
+    """
+    try:
+        with open(os.path.join(dist_info, "direct_url.json"), "r",
+                  encoding="utf-8") as f:
+            direct_url = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return direct_url if isinstance(direct_url, dict) else None
+
+
+def url_to_path(url):
+    """Return the local path of a `file://` URL, or `None`.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme != "file":
+        return None
+    path = url2pathname(parsed.path)
+    if parsed.netloc and parsed.netloc != "localhost":
+        path = f"//{parsed.netloc}{path}"
+    return path
+
+
+
+#]===========================================================================[#
+#] DISTRIBUTIONS [#==========================================================[#
+#]===========================================================================[#
+
+@dataclass
+class Distribution:
+    """Info about a distribution installed in a venv."""
+    name: str
+    version: str
+    installer: str
+    editable: bool
+    location: str
+    metadata_path: str
+    direct_url: dict = None
+    requires: list = field(default_factory=list)
+
+    @property
+    def key(self):
+        """The canonical name, to compare and sort distributions by.
+        """
+        return canonical_name(self.name)
+
+
+def read_dist_info(dist_info):
+    """Return the `Distribution` of a `*.dist-info` directory.
+    """
+    headers = read_metadata(os.path.join(dist_info, "METADATA"))
+    if not headers or "name" not in headers:
+        return None
+
+    direct_url = read_direct_url(dist_info)
+    editable = False
+    location = None
+    if direct_url is not None:
+        editable = bool(direct_url.get("dir_info", {}).get("editable"))
+        if editable:
+            location = url_to_path(direct_url.get("url", ""))
+
+    return Distribution(
+        name=headers["name"][0],
+        version=headers.get("version", [""])[0],
+        installer=read_first_line(os.path.join(dist_info, "INSTALLER")),
+        editable=editable,
+        location=location,
+        metadata_path=dist_info,
+        direct_url=direct_url,
+        requires=headers.get("requires-dist", [])
+    )
+
+
+def read_egg_info(egg_info, editable=False, location=None):
+    """
+    Return the `Distribution` of an `*.egg-info`, which is either a
+    directory holding a `PKG-INFO` or the `PKG-INFO` file itself.
+    """
+    if os.path.isdir(egg_info):
+        headers = read_metadata(os.path.join(egg_info, "PKG-INFO"))
+        installer = read_first_line(os.path.join(egg_info, "INSTALLER"))
+        requires = read_requires_txt(os.path.join(egg_info, "requires.txt"))
+    else:
+        headers = read_metadata(egg_info)
+        installer = ""
+        requires = []
+    if not headers or "name" not in headers:
+        return None
+
+    return Distribution(
+        name=headers["name"][0],
+        version=headers.get("version", [""])[0],
+        installer=installer,
+        editable=editable,
+        location=location,
+        metadata_path=egg_info,
+        requires=requires
+    )
+
+
+def read_egg_link(egg_link):
+    """
+    Return the `Distribution` of a legacy editable install, an
+    `*.egg-link` file pointing to the project holding its egg-info.
+    """
+    project_dir = read_first_line(egg_link)
+    if not project_dir:
+        return None
+    pattern = os.path.join(glob.escape(project_dir), "*.egg-info")
+    for egg_info in sorted(glob.glob(pattern)):
+        dist = read_egg_info(egg_info, editable=True, location=project_dir)
+        if dist is not None:
+            return dist
+    return None
+
+
+def read_site_packages(directory):
+    """
+    Yield the distributions installed in a site-packages directory.
+    """
+    try:
+        with os.scandir(directory) as it:
+            names = sorted(entry.name for entry in it)
+    except OSError:
+        return
+
+    for name in names:
+        path = os.path.join(directory, name)
+        if name.endswith(".dist-info"):
+            dist = read_dist_info(path)
+        elif name.endswith(".egg-info"):
+            dist = read_egg_info(path)
+        elif name.endswith(".egg-link"):
+            dist = read_egg_link(path)
+        else:
+            continue
+        if dist is not None:
+            yield dist
+
+
+def dist_files(dist):
+    """
+    Return `(path, size)` tuples of the files of a distribution, with
+    the paths relative to site-packages. Read from its `RECORD`, or
+    from `installed-files.txt` for egg-info, which has no sizes.
+    """
+    if dist.metadata_path.endswith(".dist-info"):
+        try:
+            with open(os.path.join(dist.metadata_path, "RECORD"), "r",
+                      encoding="utf-8", errors="replace", newline="") as f:
+                rows = list(csv.reader(f))
+        except OSError:
+            return []
+        return [
+            (row[0], int(row[2]) if row[2:] and row[2].isdigit() else None)
+            for row in rows if row
+        ]
+
+    listing = os.path.join(dist.metadata_path, "installed-files.txt")
+    egg_info = os.path.basename(dist.metadata_path)
+    try:
+        with open(listing, "r", encoding="utf-8", errors="replace") as f:
+            return [
+                (os.path.normpath(os.path.join(egg_info, line.strip())), None)
+                for line in f if line.strip()
+            ]
+    except OSError:
+        return []
+
+
+def dist_size(dist, files=None):
+    """
+    Return the bytes taken by the files of a distribution, `None` if
+    the files aren't listed. Pass the result of `dist_files()` as
+    `files` if it was read already.
+    """
+    if files is None:
+        files = dist_files(dist)
+    if not files:
+        return None
+    if dist.metadata_path.endswith(".dist-info"):
+        return sum(size for _, size in files if size is not None)
+
+    site_packages = os.path.dirname(dist.metadata_path)
+    size = 0
+    for path, _ in files:
+        try:
+            size += os.stat(os.path.join(site_packages, path)).st_size
+        except OSError:
+            pass
+    return size
+
+
+def read_entry_points(dist):
+    """
+    Return the `entry_points.txt` of a distribution as a dict mapping
+    a group to the names of its entry points.
+    """
+    groups = {}
+    group = None
+    entry_points = os.path.join(dist.metadata_path, "entry_points.txt")
+    try:
+        with open(entry_points, "r", encoding="utf-8",
+                  errors="replace") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line[0] in "#;":
+                    continue
+                if line.startswith("[") and line.endswith("]"):
+                    group = groups.setdefault(line[1:-1].strip(), [])
+                elif group is not None and "=" in line:
+                    group.append(line.split("=", 1)[0].strip())
+    except OSError:
+        return {}
+    return groups
+
+
+def dist_commands(dist, files=None):
+    """
+    Return the sorted names of the commands a distribution installs:
+    its console and GUI scripts, plus the other files it puts into the
+    `bin` or `Scripts` directory of the venv.
+    """
+    entry_points = read_entry_points(dist)
+    commands = set(entry_points.get("console_scripts", []))
+    commands.update(entry_points.get("gui_scripts", []))
+
+    if files is None:
+        files = dist_files(dist)
+    for path, _ in files:
+        parts = path.replace("\\", "/").split("/")
+        if parts[0] != ".." or len(parts) < 2:
+            continue
+        if parts[-2] not in ("bin", "Scripts"):
+            continue
+        name = parts[-1]
+        for suffix in (".exe", "-script.py", "-script.pyw"):
+            if name.lower().endswith(suffix):
+                name = name[:-len(suffix)]
+                break
+        if name and not name.startswith(("activate", "python")):
+            commands.add(name)
+    return sorted(commands)
+
+
+def is_import_name(name):
+    """Test wether a top-level name is one to import a package by.
+    """
+    return name.isidentifier() and not name.startswith(EDITABLE_PREFIX)
+
+
+def dist_import_names(dist, files=None):
+    """
+    Return the sorted top-level names a distribution can be imported
+    by, from its `top_level.txt` or else from the files it installed.
+    """
+    top_level = os.path.join(dist.metadata_path, "top_level.txt")
+    try:
+        with open(top_level, "r", encoding="utf-8", errors="replace") as f:
+            names = {line.strip().split("/")[0] for line in f}
+        names.discard("")
+        if names:
+            return sorted(n for n in names if is_import_name(n))
+    except OSError:
+        pass
+
+    if files is None:
+        files = dist_files(dist)
+    names = set()
+    for path, _ in files:
+        parts = path.replace("\\", "/").split("/")
+        top = parts[0]
+        if top in ("..", "__pycache__") \
+                or top.endswith((".dist-info", ".egg-info", ".data")):
+            continue
+        if len(parts) > 1:
+            if parts[-1].endswith((".py", ".so", ".pyd")):
+                names.add(top)
+        elif top.endswith(".py"):
+            names.add(top[:-3])
+        elif top.endswith((".so", ".pyd")):
+            names.add(top.split(".")[0])
+    return sorted(n for n in names if is_import_name(n))
+
+
+# {venv path: (fingerprint, distributions)}, least recently used first
+_inventory_cache = OrderedDict()
+
+
+def read_distributions(fingerprint):
+    """
+    Return the distributions in the site-packages directories of a
+    venv's `inventory_fingerprint()`, sorted by name.
+    """
+    dists = {}
+    for directory, _ in fingerprint:
+        for dist in read_site_packages(directory):
+            # the first one found wins, like it does on import
+            dists.setdefault(dist.key, dist)
+    return sorted(dists.values(), key=lambda d: d.key)
+
+
+def get_distributions(venv_path):
+    """
+    Return the distributions installed in a venv, sorted by name. The
+    result is cached until a site-packages directory changes, for the
+    `INVENTORY_CACHE_SIZE` venvs used last.
+    """
+    fingerprint = inventory_fingerprint(venv_path)
+    cached = _inventory_cache.get(venv_path)
+    if cached is not None and cached[0] == fingerprint:
+        _inventory_cache.move_to_end(venv_path)
+        return cached[1]
+
+    start = time.perf_counter()
+    dists = read_distributions(fingerprint)
+    _inventory_cache[venv_path] = (fingerprint, dists)
+    _inventory_cache.move_to_end(venv_path)
+    while len(_inventory_cache) > INVENTORY_CACHE_SIZE:
+        _inventory_cache.popitem(last=False)
+    logger.debug(
+        f"Read {len(dists)} distribution(s) of '{venv_path}' in "
+        f"{time.perf_counter() - start:.3f}s"
+    )
+    return dists
+
+
+
+#]===========================================================================[#
+#] FORMAT [#=================================================================[#
+#]===========================================================================[#
+
+def format_table(header, rows):
+    """
+    Return `rows` as text columns below `header` and a dashed line,
+    like pip prints its tables.
+    """
+    widths = [
+        max(len(str(cell)) for cell in column)
+        for column in zip(header, *rows)
+    ]
+    lines = [header, ["-" * width for width in widths]]
+    lines.extend(rows)
+    return "\n".join(
+        " ".join(
+            str(cell).ljust(width) for cell, width in zip(line, widths)
+        ).rstrip()
+        for line in lines
+    )
+
+
+def format_list(dists):
+    """
+    Return the distributions as a table like `pip list -v` prints it,
+    with the editable project location if there are editable installs.
+    """
+    header = ["Package", "Version", "Installer"]
+    rows = [[d.name, d.version, d.installer] for d in dists]
+    if any(d.editable for d in dists):
+        header.append("Editable project location")
+        for row, dist in zip(rows, dists):
+            row.append(dist.location or "")
+    return format_table(header, rows)
+
+
+def direct_url_line(dist):
+    """
+    Return the requirement of a distribution installed from a URL, as
+    `pip freeze` writes it from `direct_url.json`, or `None`.
+    """
+    direct_url = dist.direct_url or {}
+    url = direct_url.get("url")
+    if not url:
+        return None
+
+    fragment = ""
+    if direct_url.get("subdirectory"):
+        fragment = f"#subdirectory={direct_url['subdirectory']}"
+
+    vcs_info = direct_url.get("vcs_info")
+    if vcs_info:
+        url = f"{vcs_info.get('vcs', 'git')}+{url}"
+        revision = (
+            vcs_info.get("commit_id") or vcs_info.get("requested_revision")
+        )
+        if revision:
+            url = f"{url}@{revision}"
+        if dist.editable:
+            egg = f"egg={dist.name.replace('-', '_')}"
+            fragment = f"#{egg}&{fragment[1:]}" if fragment else f"#{egg}"
+            return f"-e {url}{fragment}"
+        return f"{dist.name} @ {url}{fragment}"
+
+    if dist.editable:
+        return None
+    return f"{dist.name} @ {url}{fragment}"
+
+
+def freeze_lines(dist):
+    """
+    Return the lines `pip freeze` writes for a single distribution.
+    """
+    line = direct_url_line(dist)
+    if line is not None:
+        return [line]
+    if dist.editable and dist.location:
+        return [
+            "# Editable install with no version control "
+            f"({dist.name}=={dist.version})",
+            f"-e {dist.location}"
+        ]
+    return [f"{dist.name}=={dist.version}"]
+
+
+def format_freeze(dists, include_all=False, exclude=()):
+    """
+    Return the distributions as requirements like `pip freeze` prints
+    them. Pass `include_all=True` to keep pip, setuptools and wheel,
+    like `--all` does, and names to leave out as `exclude`.
+    """
+    skip = {canonical_name(name) for name in exclude}
+    if not include_all:
+        skip |= FREEZE_EXCLUDES
+
+    lines = []
+    for dist in dists:
+        if dist.key not in skip:
+            lines.extend(freeze_lines(dist))
+    return "\n".join(lines)
+
+
+
+#]===========================================================================[#
+#] EXPORT REQUIREMENTS [#====================================================[#
+#]===========================================================================[#
+
+def write_atomic(save_path, text):
+    """
+    Write `text` to a temporary file next to `save_path`, then move it
+    in place, so the file is never seen half written.
+    """
+    directory = os.path.dirname(os.path.abspath(save_path))
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(save_path)}.", dir=directory
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        # keep the mode of the file replaced, temporary files are private
+        try:
+            mode = os.stat(save_path).st_mode & 0o777
+        except OSError:
+            mode = 0o644
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, save_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_freeze(venv_path, save_path, include_all=False, exclude=()):
+    """
+    Write the requirements of a venv to `save_path`. Return the number
+    of requirements written, raise `OSError` if the file can't be
+    written.
+    """
+    dists = get_distributions(venv_path)
+    text = format_freeze(dists, include_all, exclude)
+    write_atomic(save_path, f"{text}\n" if text else "")
+    logger.debug(f"Saved the requirements of '{venv_path}' in '{save_path}'")
+    return len([line for line in text.splitlines() if line[:1] != "#"])
+
+
+def export_file_names(venv_paths, directory):
+    """
+    Return a dict mapping venv paths to a requirements file each in
+    `directory`, named after the venv and its parent directory if
+    several venvs share a name, e.g. `project-.venv.txt`.
+    """
+    names = {p: os.path.basename(os.path.normpath(p)) for p in venv_paths}
+    counts = {}
+    for name in names.values():
+        counts[name] = counts.get(name, 0) + 1
+
+    taken = set()
+    files = {}
+    for venv_path in venv_paths:
+        name = names[venv_path]
+        if counts[name] > 1:
+            parent = os.path.basename(os.path.dirname(
+                os.path.normpath(venv_path)
+            ))
+            name = f"{parent}-{name}"
+        unique = name
+        number = 1
+        while unique in taken:
+            number += 1
+            unique = f"{name}-{number}"
+        taken.add(unique)
+        files[venv_path] = os.path.join(directory, f"{unique}.txt")
+    return files
+
+
+def export_requirements(targets, include_all=False, exclude=(),
+                        max_workers=EXPORT_WORKERS):
+    """
+    Write the requirements of many venvs in parallel. `targets` maps
+    venv paths to the files to write. Return a dict mapping each venv
+    path to the error message, `None` where writing succeeded.
+    """
+    def export(item):
+        venv_path, save_path = item
+        try:
+            write_freeze(venv_path, save_path, include_all, exclude)
+        except OSError as e:
+            logger.warning(f"Failed to save '{save_path}': {e}")
+            return venv_path, str(e)
+        return venv_path, None
+
+    if not targets:
+        return {}
+    start = time.perf_counter()
+    workers = max(1, min(max_workers, len(targets)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = dict(executor.map(export, targets.items()))
+    logger.debug(
+        f"Exported the requirements of {len(targets)} venv(s) in "
+        f"{time.perf_counter() - start:.3f}s"
+    )
+    return results
@@ -0,0 +1,491 @@
+# -*- coding: utf-8 -*-
+"""
+This module contains the item models.
+"""
+import re
+import logging
+from bisect import bisect_left
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"[^0-9a-z]+")
+
+# dotted versions are kept whole, so `3.11` is not found in `3.8.11`
+VERSION_WORD_RE = re.compile(r"\d+(?:\.\d+)+[0-9a-z]*")
+
+# pre-releases sort before the final release
+PRE_RELEASES = {"a": 0, "b": 1, "rc": 2}
+VERSION_KEY_RE = re.compile(r"(\d+(?:\.\d+)*)(?:\.?(a|b|rc)(\d+))?")
+
+
+
+def split_words(text):
+    """
+    Split a lower case text into its words, dotted versions like
+    `3.11.4` or `3.13.0rc1` are one word.
+    """
+    words = VERSION_WORD_RE.findall(text)
+    words.extend(
+        w for w in TOKEN_RE.split(VERSION_WORD_RE.sub(" ", text)) if w
+    )
+    return words
+
+
+def word_matches(token, word):
+    """
+    Test wether `token` starts with `word`. A dotted version only
+    matches whole numbers: `3.11` matches `3.11.4`, not `3.110`.
+    """
+    if not token.startswith(word):
+        return False
+    if "." not in word or len(token) == len(word):
+        return True
+    return not (word[-1].isdigit() and token[len(word)].isdigit())
+
+
+def venv_tokens(venv):
+    """
+    Return the set of lower case tokens a venv can be found by: the
+    words of its name, comment, version, origin and project paths,
+    plus the name and comment as a whole.
+    """
+    texts = [venv.venv_name, venv.comment, venv.venv_version, venv.origin]
+    texts.extend(venv.projects or [])
+
+    tokens = set()
+    for text in texts:
+        if not text:
+            continue
+        text = text.lower()
+        tokens.add(text)
+        tokens.update(split_words(text))
+    return tokens
+
+
+def query_words(text):
+    """Split a filter text into lower case words.
+    """
+    return split_words(text.lower())
+
+
+def venv_matches(venv, words):
+    """
+    Test wether a single venv matches all `words`, like
+    `VenvSearchIndex.search()` does.
+    """
+    tokens = venv_tokens(venv)
+    return all(any(word_matches(t, w) for t in tokens) for w in words)
+
+
+def version_key(text):
+    """
+    Sort key putting `Python 3.9.18` before `Python 3.10.13` and
+    `Python 3.13.0rc1` before `Python 3.13.0`, venvs without a
+    readable version come first.
+    """
+    match = VERSION_KEY_RE.search(text or "")
+    if match is None:
+        return (), ()
+    release = tuple(int(n) for n in match.group(1).split("."))
+    if match.group(2):
+        return release, (PRE_RELEASES[match.group(2)], int(match.group(3)))
+    return release, (len(PRE_RELEASES), 0)
+
+
+def number_key(text):
+    """Sort key for columns holding a number as string.
+    """
+    try:
+        return int(text)
+    except (TypeError, ValueError):
+        return -1
+
+
+def size_key(size):
+    """Sort key for the size column, unknown sizes come first.
+    """
+    return -1 if size is None else size
+
+
+def format_size(size):
+    """Return a size in bytes as readable text, e.g. `12.3 MB`.
+    """
+    if size is None:
+        return ""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            break
+        size /= 1024
+    else:
+        unit = "TB"
+    if unit == "B":
+        return f"{size} B"
+    return f"{size:.1f} {unit}"
+
+
+def text_key(text):
+    """Sort key for columns holding text.
+    """
+    return (text or "").lower()
+
+
+
+class VenvSearchIndex:
+    """
+    Sorted list of `(token, venv path)` pairs of all venvs. Finding the
+    venvs having a token that starts with a word is a binary search
+    instead of a scan over all strings.
+    """
+    def __init__(self):
+        self._pairs = []
+        self._tokens = []
+        self._venv_tokens = {}
+
+    def build(self, venvs):
+        """Rebuild the index from all venvs.
+        """
+        self._venv_tokens = {
+            venv.venv_path: venv_tokens(venv) for venv in venvs
+        }
+        self._pairs = sorted(
+            (token, path)
+            for path, tokens in self._venv_tokens.items()
+            for token in tokens
+        )
+        self._tokens = [token for token, _ in self._pairs]
+
+    def prefix_range(self, word):
+        """
+        Return the `(first, last)` slice of the pairs whose token
+        starts with `word`.
+        """
+        return (
+            bisect_left(self._tokens, word),
+            bisect_left(self._tokens, word + chr(0x10ffff))
+        )
+
+    def search(self, words):
+        """
+        Return the paths of the venvs matching all `words`, or `None`
+        if there is nothing to filter by.
+        """
+        if not words:
+            return None
+
+        # start with the rarest word, then narrow down, either by
+        # intersecting or, if a word is very common, by testing the
+        # tokens of the remaining venvs
+        ranges = [(self.prefix_range(word), word) for word in set(words)]
+        ranges.sort(key=lambda r: r[0][1] - r[0][0])
+
+        (first, last), word = ranges[0]
+        paths = {
+            path for token, path in self._pairs[first:last]
+            if word_matches(token, word)
+        }
+        for (first, last), word in ranges[1:]:
+            if not paths:
+                break
+            if last - first < len(paths) * 8:
+                paths &= {
+                    path for token, path in self._pairs[first:last]
+                    if word_matches(token, word)
+                }
+            else:
+                paths = {
+                    path for path in paths
+                    if any(
+                        word_matches(t, word)
+                        for t in self._venv_tokens[path]
+                    )
+                }
+        return paths
+
+
+
+class VenvTableModel(QAbstractTableModel):
+    """
+    Table model over a plain list of `VenvInfo`, identified by their
+    paths. The cell texts are read from the `VenvInfo` attributes when
+    the view asks for them. Only the venvs matching the filter text
+    are shown.
+    """
+    columns = (
+        ("Venv", "venv_name", text_key),
+        ("Version", "venv_version", version_key),
+        ("Packages", "site_packages", text_key),
+        ("installed", "is_installed", text_key),
+        ("Size", "size", size_key),
+        ("Comment", "comment", text_key),
+        ("Refs", "refs", number_key),
+        ("Origin", "origin", text_key),
+    )
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # all venvs in sort order, and the ones shown
+        self._all = []
+        self._venvs = []
+        self._all_rows = {}
+        self._rows = {}
+        self._sort_column = None
+        self._sort_order = Qt.AscendingOrder
+
+        # sizes come in later, from a worker walking the venvs
+        self._sizes = {}
+        self._size_column = [c[1] for c in self.columns].index("size")
+
+        self._search = VenvSearchIndex()
+        self._search_stale = True
+        self._words = []
+        self._matches = None
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._venvs)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.TextAlignmentRole:
+            if index.column() == self._size_column:
+                return int(Qt.AlignRight | Qt.AlignVCenter)
+            return None
+        if role != Qt.DisplayRole:
+            return None
+
+        venv = self._venvs[index.row()]
+        if index.column() == self._size_column:
+            return format_size(self._sizes.get(venv.venv_path))
+        return getattr(venv, self.columns[index.column()][1])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.columns[section][0]
+        return section + 1
+
+    def sort_key(self, column):
+        """Return the key sorting the venvs by `column`.
+        """
+        _, attr, key = self.columns[column]
+        if column == self._size_column:
+            return lambda venv: key(self._sizes.get(venv.venv_path))
+        return lambda venv: key(getattr(venv, attr))
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """
+        Sort the venvs, the selection follows the venvs. The sort is
+        stable, so venvs equal in `column` keep the order of the
+        previous sort.
+        """
+        self._sort_column = column
+        self._sort_order = order
+        if column < 0 or len(self._all) < 2:
+            return
+
+        self.layoutAboutToBeChanged.emit()
+        persistent = [
+            (index, self._venvs[index.row()].venv_path, index.column())
+            for index in self.persistentIndexList()
+            if index.isValid()
+        ]
+        self._all.sort(
+            key=self.sort_key(column),
+            reverse=(order == Qt.DescendingOrder)
+        )
+        self._venvs = [v for v in self._all if self._accepts(v)]
+        self._reindex()
+        for index, path, col in persistent:
+            self.changePersistentIndex(
+                index, self.index(self._rows[path], col)
+            )
+        self.layoutChanged.emit()
+
+    def resort(self):
+        """Sort again by the last column sorted by.
+        """
+        if self._sort_column is not None:
+            self.sort(self._sort_column, self._sort_order)
+
+    def _reindex(self):
+        """Rebuild the mappings of venv paths to rows.
+        """
+        self._all_rows = {
+            venv.venv_path: row for row, venv in enumerate(self._all)
+        }
+        self._reindex_shown()
+
+    def _reindex_shown(self):
+        """Rebuild the mapping of the shown venv paths to rows.
+        """
+        self._rows = {
+            venv.venv_path: row for row, venv in enumerate(self._venvs)
+        }
+
+    def _accepts(self, venv):
+        """Test wether a venv passes the filter.
+        """
+        return self._matches is None or venv.venv_path in self._matches
+
+    def _changed(self, venv):
+        """
+        Keep the filter matches up to date after `venv` has been
+        added or changed, the index is rebuilt on the next filter.
+        """
+        self._search_stale = True
+        if self._matches is None:
+            return
+        if venv_matches(venv, self._words):
+            self._matches.add(venv.venv_path)
+        else:
+            self._matches.discard(venv.venv_path)
+
+    def set_filter(self, text):
+        """
+        Show only the venvs having, for every word of `text`, a word
+        in their name, comment, version or project paths starting
+        with it.
+        """
+        words = query_words(text)
+        if words == self._words:
+            return
+
+        if words and self._search_stale:
+            self._search.build(self._all)
+            self._search_stale = False
+        self._words = words
+        self._matches = self._search.search(words)
+
+        self.beginResetModel()
+        self._venvs = [v for v in self._all if self._accepts(v)]
+        self._reindex_shown()
+        self.endResetModel()
+
+    def set_sizes(self, sizes):
+        """
+        Store the sizes of venvs given as a dict mapping a venv path
+        to its size in bytes, and update their rows in one signal.
+        """
+        self._sizes.update(sizes)
+        rows = [self._rows[p] for p in sizes if p in self._rows]
+        if rows:
+            self.dataChanged.emit(
+                self.index(min(rows), self._size_column),
+                self.index(max(rows), self._size_column)
+            )
+
+    def row(self, venv_path):
+        """Return the row a venv is shown in, or `None`.
+        """
+        return self._rows.get(venv_path)
+
+    def venv(self, row):
+        """Return the `VenvInfo` shown in `row`.
+        """
+        return self._venvs[row]
+
+    def paths(self):
+        """Return the set of the paths of all venvs, shown or not.
+        """
+        return set(self._all_rows)
+
+    def reset(self, venvs=()):
+        """Replace all venvs at once.
+        """
+        self.beginResetModel()
+        self._all = list(venvs)
+        self._search_stale = True
+        if self._words:
+            self._search.build(self._all)
+            self._search_stale = False
+            self._matches = self._search.search(self._words)
+        self._venvs = [v for v in self._all if self._accepts(v)]
+        self._reindex()
+        self.endResetModel()
+        self.resort()
+
+    def update(self, venvs):
+        """
+        Add the venvs not known yet, the shown ones in one insert, and
+        update the rows of the others if their data changed.
+        """
+        added = []
+        for venv in venvs:
+            all_row = self._all_rows.get(venv.venv_path)
+            if all_row is None:
+                self._all_rows[venv.venv_path] = len(self._all)
+                self._all.append(venv)
+                self._changed(venv)
+                if self._accepts(venv):
+                    added.append(venv)
+                continue
+
+            if self._all[all_row] == venv:
+                continue
+            self._all[all_row] = venv
+            self._changed(venv)
+
+            row = self._rows.get(venv.venv_path)
+            if row is None:
+                if self._accepts(venv):
+                    added.append(venv)
+            elif self._accepts(venv):
+                self._venvs[row] = venv
+                self.dataChanged.emit(
+                    self.index(row, 0),
+                    self.index(row, len(self.columns) - 1)
+                )
+            else:
+                self._remove_rows([row])
+
+        if added:
+            first = len(self._venvs)
+            self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+            self._venvs.extend(added)
+            for row, venv in enumerate(added, first):
+                self._rows[venv.venv_path] = row
+            self.endInsertRows()
+
+    def _remove_rows(self, rows):
+        """
+        Remove the shown `rows`, one signal per range of adjacent rows.
+        """
+        # group the rows into ranges, last range first
+        ranges = []
+        for row in sorted(rows, reverse=True):
+            if ranges and ranges[-1][0] == row + 1:
+                ranges[-1][0] = row
+            else:
+                ranges.append([row, row])
+
+        for first, last in ranges:
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._venvs[first:last + 1]
+            self.endRemoveRows()
+        self._reindex_shown()
+
+    def remove(self, paths):
+        """Remove the venvs in `paths`.
+        """
+        paths = set(paths) & set(self._all_rows)
+        if not paths:
+            return
+
+        self._remove_rows(
+            [self._rows[path] for path in paths if path in self._rows]
+        )
+        self._all = [v for v in self._all if v.venv_path not in paths]
+        self._reindex()
+        self._search_stale = True
+        if self._matches is not None:
+            self._matches -= paths
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+This module manages the package index, a SQLite database in `~/.venvipy`
+holding the distributions installed in every venv listed, with the
+commands and import names they provide. A venv is only read again after
+one of its site-packages directories changed.
+"""
+import os
+import re
+import json
+import time
+import logging
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+
+import inventory
+from sqlite_store import SQLiteStore
+from requirements import InvalidRequirement, parse_requirement
+
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_INDEX_FILE = os.path.expanduser("~/.venvipy/package-index.db")
+
+# bump when the tables change, the index is dropped on mismatch
+RECORD_VERSION = 3
+
+# what a distribution provides, besides itself
+KIND_COMMAND = "command"
+KIND_IMPORT = "import"
+
+# number of venvs read in parallel
+INDEX_WORKERS = 8
+
+# a bare, maybe partly typed, distribution name
+NAME_QUERY = re.compile(r"[A-Za-z0-9._-]+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS venvs (
+    path TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS packages (
+    venv TEXT NOT NULL,
+    key TEXT NOT NULL,
+    name TEXT NOT NULL,
+    version TEXT NOT NULL,
+    installer TEXT,
+    size INTEGER
+);
+CREATE INDEX IF NOT EXISTS packages_key ON packages (key);
+CREATE INDEX IF NOT EXISTS packages_venv ON packages (venv);
+CREATE TABLE IF NOT EXISTS provides (
+    venv TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    lname TEXT NOT NULL,
+    key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS provides_name ON provides (kind, lname);
+CREATE INDEX IF NOT EXISTS provides_venv ON provides (venv);
+"""
+
+
+
+@dataclass
+class PackageHit:
+    """A distribution found in a venv."""
+    venv_path: str
+    name: str
+    version: str
+    installer: str
+    size: int
+    provides: str = ""
+
+
+def read_venv_packages(venv_path):
+    """
+    Return the fingerprint of a venv, the `(key, name, version,
+    installer, size)` rows of its distributions and the `(kind, name,
+    key)` rows of the commands and import names they provide.
+    """
+    fingerprint = inventory.inventory_fingerprint(venv_path)
+    rows = []
+    provides = []
+    # read directly, the index build must not fill the cache of the
+    # venvs shown with every venv found
+    for dist in inventory.read_distributions(fingerprint):
+        files = inventory.dist_files(dist)
+        rows.append((
+            dist.key, dist.name, dist.version, dist.installer,
+            inventory.dist_size(dist, files)
+        ))
+        provides.extend(
+            (KIND_COMMAND, name, dist.key)
+            for name in inventory.dist_commands(dist, files)
+        )
+        provides.extend(
+            (KIND_IMPORT, name, dist.key)
+            for name in inventory.dist_import_names(dist, files)
+        )
+    return fingerprint, rows, provides
+
+
+def parse_query(text):
+    """
+    Return the `Requirement` a query like `urllib3<2` or `numpy` stands
+    for, or `None` if it is not one. Names typed halfway, like
+    `opencv_`, are taken without their trailing separator.
+    """
+    text = text.strip()
+    if NAME_QUERY.fullmatch(text):
+        text = text.rstrip("-_.")
+    if not text:
+        return None
+    try:
+        return parse_requirement(text)
+    except InvalidRequirement:
+        return None
+
+
+
+class PackageIndex(SQLiteStore):
+    """Store the distributions of many venvs.
+    """
+    NAME = "package index"
+    SCHEMA = SCHEMA
+    RECORD_VERSION = RECORD_VERSION
+    TABLES = ("venvs", "packages", "provides")
+
+    def __init__(self, db_file=PACKAGE_INDEX_FILE):
+        super().__init__(db_file)
+
+    def fingerprints(self):
+        """
+        Return the fingerprints of the indexed venvs as a dict mapping
+        a venv path to its fingerprint.
+        """
+        rows = self.fetchall("SELECT path, fingerprint FROM venvs")
+        return {path: json.loads(fingerprint) for path, fingerprint in rows}
+
+    def replace(self, venvs, removed=()):
+        """
+        Replace the packages of the venvs given as a dict mapping a
+        venv path to `(fingerprint, rows, provides)`, and drop the
+        venvs in `removed`, in one transaction.
+        """
+        with self.transaction() as conn:
+            for path in list(venvs) + list(removed):
+                conn.execute("DELETE FROM venvs WHERE path = ?", (path,))
+                conn.execute(
+                    "DELETE FROM packages WHERE venv = ?", (path,)
+                )
+                conn.execute(
+                    "DELETE FROM provides WHERE venv = ?", (path,)
+                )
+            for path, (fingerprint, rows, provides) in venvs.items():
+                conn.execute(
+                    "INSERT INTO venvs (path, fingerprint) VALUES (?, ?)",
+                    (path, json.dumps(fingerprint))
+                )
+                conn.executemany(
+                    "INSERT INTO packages "
+                    "(venv, key, name, version, installer, size) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(path, *row) for row in rows]
+                )
+                conn.executemany(
+                    "INSERT INTO provides (venv, kind, name, lname, key) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (path, kind, name, name.lower(), key)
+                        for kind, name, key in provides
+                    ]
+                )
+
+    def update(self, venv_paths, max_workers=INDEX_WORKERS):
+        """
+        Bring the index up to date with the venvs in `venv_paths`. Only
+        venvs whose site-packages changed are read. Venvs of other
+        folders are kept, so the index covers every folder visited,
+        only the ones whose directory is gone are dropped. Return the
+        number of venvs read.
+        """
+        start = time.perf_counter()
+        indexed = self.fingerprints()
+        stale = [
+            path for path in venv_paths
+            if indexed.get(path) != inventory.inventory_fingerprint(path)
+        ]
+        removed = {
+            path for path in set(indexed) - set(venv_paths)
+            if not os.path.isdir(path)
+        }
+        if not stale and not removed:
+            return 0
+
+        venvs = {}
+        if stale:
+            workers = max(1, min(max_workers, len(stale)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                venvs = dict(
+                    zip(stale, executor.map(read_venv_packages, stale))
+                )
+        self.replace(venvs, removed)
+        logger.debug(
+            f"Indexed the packages of {len(stale)} venv(s), dropped "
+            f"{len(removed)} in {time.perf_counter() - start:.3f}s"
+        )
+        return len(stale)
+
+    def search(self, query, limit=1000):
+        """
+        Return the `PackageHit`s matching a query like `urllib3<2`,
+        `numpy==1.19.*` or `num`. A name without a version specifier
+        finds all packages whose name starts with it.
+        """
+        requirement = parse_query(query)
+        if requirement is None:
+            return []
+
+        key = requirement.key
+        if requirement.specifier:
+            where, args = "key = ?", (key,)
+        else:
+            where = "key >= ? AND key < ?"
+            args = (key, key + chr(0x10ffff))
+
+        rows = self.fetchall(
+            "SELECT venv, name, version, installer, size "
+            f"FROM packages WHERE {where}",
+            args
+        )
+        hits = [
+            PackageHit(*row) for row in rows
+            if requirement.specifier.contains(row[2])
+        ]
+        hits.sort(key=lambda h: (
+            inventory.canonical_name(h.name), h.venv_path
+        ))
+        return hits[:limit]
+
+    def search_provides(self, kind, query, limit=1000):
+        """
+        Return the `PackageHit`s of the distributions providing a
+        command (`KIND_COMMAND`) or an import name (`KIND_IMPORT`)
+        starting with `query`, ignoring case.
+        """
+        name = query.strip().lower()
+        if not name:
+            return []
+
+        rows = self.fetchall(
+            "SELECT p.venv, p.name, p.version, p.installer, p.size, "
+            "v.name FROM provides v JOIN packages p "
+            "ON p.venv = v.venv AND p.key = v.key "
+            "WHERE v.kind = ? AND v.lname >= ? AND v.lname < ? "
+            "ORDER BY v.lname, p.key, p.venv LIMIT ?",
+            (kind, name, name + chr(0x10ffff), limit)
+        )
+        return [PackageHit(*row) for row in rows]
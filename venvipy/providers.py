@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+This module contains the interpreter providers. Each provider knows the
+install layout of one tool (pyenv, asdf, conda, uv, ...) and lists the
+Python binaries found there without running any of them.
+"""
+import os
+import re
+import glob
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+USER_HOME = os.path.expanduser("~")
+
+
+
+def find_install_bin(prefix):
+    """
+    Return the Python binary of an install prefix, or `None`.
+    """
+    if os.name == 'nt':
+        names = [os.path.join(prefix, "python.exe")]
+    else:
+        names = [
+            os.path.join(prefix, "bin", "python3"),
+            os.path.join(prefix, "bin", "python")
+        ]
+    for name in names:
+        if os.path.isfile(name):
+            return name
+    return None
+
+
+def natural_key(path):
+    """
+    Sort key putting `3.9.18` before `3.10.13`.
+    """
+    return [
+        int(part) if part.isdigit() else part
+        for part in re.split(r"(\d+)", os.path.basename(path))
+    ]
+
+
+def tool_data_dir():
+    """
+    Return the per-user data directory of tools like uv, which use
+    `%APPDATA%` on Windows and the XDG layout everywhere else.
+    """
+    if os.name == 'nt':
+        return os.environ.get(
+            "APPDATA", os.path.join(USER_HOME, "AppData", "Roaming")
+        )
+    return os.environ.get(
+        "XDG_DATA_HOME", os.path.join(USER_HOME, ".local", "share")
+    )
+
+
+def list_dirs(path):
+    """
+    Return the paths of the sub directories of `path`, sorted by name.
+    """
+    try:
+        with os.scandir(path) as it:
+            return sorted((e.path for e in it if e.is_dir()), key=natural_key)
+    except OSError:
+        return []
+
+
+
+class InterpreterProvider:
+    """
+    Base class of all providers.
+    """
+    name = "base"
+
+    # wether every entry in a root is an install
+    installs_only = True
+
+    def roots(self):
+        """
+        Return the directories holding the installs of this provider.
+        """
+        return []
+
+    def prefixes(self):
+        """
+        Yield the install prefixes of this provider.
+        """
+        for root in self.roots():
+            yield from list_dirs(root)
+
+    def candidates(self):
+        """
+        Yield the Python binaries of this provider.
+        """
+        for prefix in self.prefixes():
+            python_path = find_install_bin(prefix)
+            if python_path is not None:
+                yield python_path
+
+
+
+class PyenvProvider(InterpreterProvider):
+    """Pythons built by pyenv (or pyenv-win)."""
+    name = "pyenv"
+
+    def roots(self):
+        pyenv_root = os.environ.get(
+            "PYENV_ROOT", os.path.join(USER_HOME, ".pyenv")
+        )
+        if os.name == 'nt':
+            return [os.path.join(pyenv_root, "pyenv-win", "versions")]
+        return [os.path.join(pyenv_root, "versions")]
+
+
+class AsdfProvider(InterpreterProvider):
+    """Pythons installed by the asdf python plugin."""
+    name = "asdf"
+
+    def roots(self):
+        asdf_dir = os.environ.get(
+            "ASDF_DATA_DIR", os.path.join(USER_HOME, ".asdf")
+        )
+        return [os.path.join(asdf_dir, "installs", "python")]
+
+
+class CondaProvider(InterpreterProvider):
+    """The base and `envs/` Pythons of conda installs."""
+    name = "conda"
+    bases = [
+        "miniconda3", "miniconda", "anaconda3", "miniforge3", "mambaforge"
+    ]
+
+    def base_dirs(self):
+        """Return the conda base installs found.
+        """
+        dirs = [os.path.join(USER_HOME, base) for base in self.bases]
+        if os.name != 'nt':
+            dirs.extend(os.path.join("/opt", base) for base in self.bases)
+        if "CONDA_ROOT" in os.environ:
+            dirs.insert(0, os.environ["CONDA_ROOT"])
+        return [d for d in dirs if os.path.isdir(d)]
+
+    def roots(self):
+        return [os.path.join(base, "envs") for base in self.base_dirs()]
+
+    def prefixes(self):
+        yield from self.base_dirs()
+        yield from super().prefixes()
+
+        # envs created with '--prefix' are listed here
+        environments = os.path.join(USER_HOME, ".conda", "environments.txt")
+        try:
+            with open(environments, "r") as f:
+                yield from (line.strip() for line in f if line.strip())
+        except OSError:
+            pass
+
+
+class UvProvider(InterpreterProvider):
+    """Pythons managed by uv (`uv python install`)."""
+    name = "uv"
+
+    def roots(self):
+        if "UV_PYTHON_INSTALL_DIR" in os.environ:
+            return [os.environ["UV_PYTHON_INSTALL_DIR"]]
+        return [os.path.join(tool_data_dir(), "uv", "python")]
+
+
+class OptProvider(InterpreterProvider):
+    """Pythons installed into `/opt/python*`."""
+    name = "opt"
+    installs_only = False
+
+    def roots(self):
+        return ["/opt"] if os.name != 'nt' else []
+
+    def prefixes(self):
+        if os.name == 'nt':
+            return []
+        return sorted(glob.glob("/opt/python*"), key=natural_key)
+
+
+PROVIDERS = [
+    PyenvProvider(),
+    AsdfProvider(),
+    CondaProvider(),
+    UvProvider(),
+    OptProvider(),
+]
+
+
+def provider_roots(providers=None):
+    """
+    Return a dict mapping the existing root directories of all
+    providers to their `installs_only` flag.
+    """
+    if providers is None:
+        providers = PROVIDERS
+    return {
+        root: provider.installs_only
+        for provider in providers
+        for root in provider.roots()
+        if os.path.isdir(root)
+    }
+
+
+def run_timed(label, find):
+    """
+    Return the list returned by `find()`, logging what `label` found
+    and how long it took. A failing provider or environment source
+    never stops the discovery, it just finds nothing.
+    """
+    start = time.perf_counter()
+    try:
+        found = list(find())
+    except OSError as e:
+        logger.warning(f"{label} failed: {e}")
+        found = []
+    logger.debug(
+        f"{label} found {len(found)} in "
+        f"{time.perf_counter() - start:.3f}s"
+    )
+    return found
+
+
+def map_parallel(func, items):
+    """
+    Call `func` for every item in its own thread and return the
+    results in the order of `items`.
+    """
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=len(items)) as executor:
+        return list(executor.map(func, items))
+
+
+def run_provider(provider):
+    """Return the binaries of a single provider.
+    """
+    return run_timed(f"Provider '{provider.name}'", provider.candidates)
+
+
+def run_providers(providers=None):
+    """
+    Run all providers in parallel and return the binaries found,
+    in the order of the providers.
+    """
+    if providers is None:
+        providers = PROVIDERS
+    return [
+        python_path
+        for found in map_parallel(run_provider, providers)
+        for python_path in found
+    ]
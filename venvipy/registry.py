@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+This module manages the interpreter registry, a SQLite database in
+`~/.venvipy` holding the Python installs found and their probe records.
+"""
+import os
+import csv
+import json
+import logging
+import time
+
+from sqlite_store import SQLiteStore
+
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_FILE = os.path.expanduser("~/.venvipy/py-installs.db")
+
+# interpreters found by scanning are replaced on every rescan,
+# interpreters added by the user are kept
+SOURCE_SCAN = "scan"
+SOURCE_USER = "user"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interpreters (
+    path TEXT NOT NULL,
+    version TEXT NOT NULL,
+    realpath TEXT,
+    source TEXT NOT NULL DEFAULT 'scan'
+);
+CREATE UNIQUE INDEX IF NOT EXISTS interpreters_path
+    ON interpreters (path);
+CREATE TABLE IF NOT EXISTS probes (
+    realpath TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS health (
+    path TEXT PRIMARY KEY,
+    fingerprint TEXT,
+    verdict TEXT NOT NULL,
+    detail TEXT,
+    checked REAL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+
+class InterpreterRegistry(SQLiteStore):
+    """Store the Python installs found and their probe records.
+    """
+    NAME = "interpreter registry"
+    SCHEMA = SCHEMA
+
+    def __init__(self, db_file=REGISTRY_FILE):
+        super().__init__(db_file)
+
+    def initialized(self):
+        """
+        Test wether the interpreters have been imported or scanned
+        once. Databases written before the marker existed count as
+        initialized if they hold any interpreter.
+        """
+        return bool(
+            self.fetchall("SELECT 1 FROM meta WHERE key = 'initialized'")
+            or self.fetchall("SELECT 1 FROM interpreters LIMIT 1")
+        )
+
+    def interpreters(self):
+        """
+        Return `(version, path, realpath, source)` tuples in the
+        order the interpreters were added.
+        """
+        return self.fetchall(
+            "SELECT version, path, realpath, source "
+            "FROM interpreters ORDER BY rowid"
+        )
+
+    def installed_paths(self):
+        """
+        Return the set of paths and real paths of all registered
+        interpreters, for quick "is this installed" lookups.
+        """
+        paths = set()
+        for _, path, realpath, _ in self.interpreters():
+            paths.add(path)
+            if realpath:
+                paths.add(realpath)
+        return paths
+
+    def add(self, path, version, realpath=None, source=SOURCE_USER):
+        """
+        Add an interpreter or update the version of a known one. A
+        scanned interpreter added by the user is kept from now on.
+        """
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO interpreters "
+                "(path, version, realpath, source) VALUES (?, ?, ?, ?)",
+                (path, version, realpath, source)
+            )
+            conn.execute(
+                "UPDATE interpreters SET version = ?, realpath = ? "
+                "WHERE path = ?",
+                (version, realpath, path)
+            )
+            if source == SOURCE_USER:
+                conn.execute(
+                    "UPDATE interpreters SET source = ? WHERE path = ?",
+                    (SOURCE_USER, path)
+                )
+
+    def remove(self, path):
+        """Remove an interpreter by its exact path.
+        """
+        removed = 0
+        with self.transaction() as conn:
+            removed = conn.execute(
+                "DELETE FROM interpreters WHERE path = ?", (path,)
+            ).rowcount
+        return removed
+
+    def replace_scanned(self, rows, keep_probes=()):
+        """
+        Replace all scanned interpreters by `rows` of
+        `(version, path, realpath)` tuples in one transaction.
+        Interpreters added by the user are kept. The probe records
+        of interpreters no longer registered are dropped, except the
+        ones keyed by a real path in `keep_probes`, like the failed
+        probes of the binaries just found.
+        """
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) "
+                "VALUES ('initialized', '1')"
+            )
+            conn.execute(
+                "DELETE FROM interpreters WHERE source = ?", (SOURCE_SCAN,)
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO interpreters "
+                "(version, path, realpath, source) VALUES (?, ?, ?, ?)",
+                [(*row, SOURCE_SCAN) for row in rows]
+            )
+
+            # probes are keyed by the real path of the binary called,
+            # for wrappers like shims it differs from the one stored
+            keep = set(keep_probes)
+            for path, realpath in conn.execute(
+                "SELECT path, realpath FROM interpreters"
+            ):
+                keep.add(os.path.realpath(path))
+                if realpath:
+                    keep.add(realpath)
+            stale = [
+                (realpath,)
+                for realpath, in conn.execute("SELECT realpath FROM probes")
+                if realpath not in keep
+            ]
+            conn.executemany("DELETE FROM probes WHERE realpath = ?", stale)
+
+    def update_scanned(self, rows, removed=()):
+        """
+        Add or update the scanned interpreters in `rows` of
+        `(version, path, realpath)` tuples and remove the scanned
+        interpreters at the paths in `removed`, in one transaction.
+        Interpreters added by the user are kept.
+        """
+        with self.transaction() as conn:
+            conn.executemany(
+                "DELETE FROM interpreters WHERE path = ? AND source = ?",
+                [(path, SOURCE_SCAN) for path in removed]
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO interpreters "
+                "(version, path, realpath, source) VALUES (?, ?, ?, ?)",
+                [(*row, SOURCE_SCAN) for row in rows]
+            )
+            conn.executemany(
+                "UPDATE interpreters SET version = ?, realpath = ? "
+                "WHERE path = ?",
+                [(version, realpath, path) for version, path, realpath in rows]
+            )
+
+    def load_probes(self):
+        """
+        Return the probe records as a dict mapping a real path to
+        `{"fingerprint": [...], "record": {...}}`. The record is `None`
+        for binaries that failed to answer.
+        """
+        rows = self.fetchall(
+            "SELECT realpath, fingerprint, record FROM probes"
+        )
+        return {
+            realpath: {
+                "fingerprint": json.loads(fingerprint),
+                "record": json.loads(record)
+            }
+            for realpath, fingerprint, record in rows
+        }
+
+    def save_probes(self, probes):
+        """
+        Store the probe records given as a dict like the one
+        returned by `load_probes()`.
+        """
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO probes "
+                "(realpath, fingerprint, record) VALUES (?, ?, ?)",
+                [
+                    (
+                        realpath,
+                        json.dumps(entry["fingerprint"]),
+                        json.dumps(entry["record"])
+                    )
+                    for realpath, entry in probes.items()
+                ]
+            )
+
+    def load_health(self):
+        """
+        Return the stored health verdicts as
+        `(path, fingerprint, verdict, detail)` tuples.
+        """
+        rows = self.fetchall(
+            "SELECT path, fingerprint, verdict, detail FROM health"
+        )
+        return [
+            (path, json.loads(fingerprint) if fingerprint else None,
+             verdict, detail)
+            for path, fingerprint, verdict, detail in rows
+        ]
+
+    def save_health(self, verdicts):
+        """
+        Store `(path, fingerprint, verdict, detail)` tuples.
+        """
+        checked = time.time()
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO health "
+                "(path, fingerprint, verdict, detail, checked) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (path, json.dumps(fingerprint), verdict, detail, checked)
+                    for path, fingerprint, verdict, detail in verdicts
+                ]
+            )
+
+    def import_csv(self, csv_file):
+        """
+        Import the interpreters from the old `py-installs` CSV
+        database, then rename the file to `py-installs.bak`.
+        """
+        with open(csv_file, newline="") as cf:
+            rows = [
+                (info["PYTHON_VERSION"], info["PYTHON_PATH"], None)
+                for info in csv.DictReader(cf, delimiter=",")
+            ]
+        self.replace_scanned(rows)
+        # keep the old file if the rows could not be written
+        if not self.initialized():
+            return
+        os.replace(csv_file, f"{csv_file}.bak")
+        logger.debug(f"Imported {len(rows)} interpreter(s) from '{csv_file}'")
@@ -0,0 +1,527 @@
+# -*- coding: utf-8 -*-
+"""
+This module parses versions, version specifiers, environment markers and
+requirements the way PEP 440 and PEP 508 describe them, so dependencies
+can be resolved without `packaging` being installed.
+"""
+import re
+import logging
+from functools import lru_cache, total_ordering
+from dataclasses import dataclass, field
+
+from inventory import canonical_name
+
+
+logger = logging.getLogger(__name__)
+
+VERSION_RE = re.compile(
+    r"""
+    ^\s*v?
+    (?:(?P<epoch>\d+)!)?
+    (?P<release>\d+(?:\.\d+)*)
+    (?:[-_.]?(?P<pre_l>alpha|beta|preview|pre|rc|a|b|c)[-_.]?(?P<pre_n>\d+)?)?
+    (?:-(?P<post_n1>\d+)|[-_.]?(?P<post_l>post|rev|r)[-_.]?(?P<post_n2>\d+)?)?
+    (?:[-_.]?(?P<dev_l>dev)[-_.]?(?P<dev_n>\d+)?)?
+    (?:\+(?P<local>[a-z0-9]+(?:[-_.][a-z0-9]+)*))?
+    \s*$
+    """,
+    re.VERBOSE | re.IGNORECASE
+)
+
+PRE_ORDER = {
+    "a": 0, "alpha": 0, "b": 1, "beta": 1,
+    "c": 2, "rc": 2, "pre": 2, "preview": 2
+}
+
+SPECIFIER_RE = re.compile(r"^\s*(===|~=|==|!=|<=|>=|<|>)\s*(\S+)\s*$")
+
+REQUIREMENT_RE = re.compile(
+    r"""
+    ^\s*(?P<name>[A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)\s*
+    (?:\[(?P<extras>[^\]]*)\])?\s*
+    (?:@\s*(?P<url>[^\s;]+)\s*)?
+    (?P<specifier>[^;]*?)\s*
+    (?:;\s*(?P<marker>.*?))?\s*$
+    """,
+    re.VERBOSE
+)
+
+MARKER_TOKEN_RE = re.compile(
+    r"""
+    \s*(?:
+        (?P<paren>[()])
+      | (?P<op>===|~=|==|!=|<=|>=|<|>|not\s+in\b|in\b)
+      | (?P<bool>and\b|or\b)
+      | (?P<string>'[^']*'|"[^"]*")
+      | (?P<var>[A-Za-z_][A-Za-z0-9_.]*)
+    )
+    """,
+    re.VERBOSE
+)
+
+# old marker names still found in metadata
+MARKER_ALIASES = {
+    "os.name": "os_name",
+    "sys.platform": "sys_platform",
+    "platform.version": "platform_version",
+    "platform.machine": "platform_machine",
+    "platform.python_implementation": "platform_python_implementation",
+    "python_implementation": "platform_python_implementation",
+}
+
+
+
+class InvalidRequirement(ValueError):
+    """Raised for requirements, specifiers or markers not understood."""
+
+
+
+#]===========================================================================[#
+#] VERSIONS [#===============================================================[#
+#]===========================================================================[#
+
+@total_ordering
+class Version:
+    """
+    A version parsed like PEP 440 describes it, comparable to other
+    versions.
+    """
+    def __init__(self, text):
+        match = VERSION_RE.match(text)
+        if match is None:
+            raise InvalidRequirement(f"Invalid version: '{text}'")
+
+        self.text = text.strip()
+        self.epoch = int(match.group("epoch") or 0)
+        self.release = tuple(int(n) for n in match.group("release").split("."))
+
+        pre_l = match.group("pre_l")
+        self.pre = None
+        if pre_l:
+            self.pre = (
+                PRE_ORDER[pre_l.lower()], int(match.group("pre_n") or 0)
+            )
+
+        self.post = None
+        if match.group("post_n1"):
+            self.post = int(match.group("post_n1"))
+        elif match.group("post_l"):
+            self.post = int(match.group("post_n2") or 0)
+
+        self.dev = None
+        if match.group("dev_l"):
+            self.dev = int(match.group("dev_n") or 0)
+
+        self.local = match.group("local")
+        self.key = self._key()
+
+    def _key(self):
+        """Return the tuple versions are compared by.
+        """
+        release = list(self.release)
+        while len(release) > 1 and release[-1] == 0:
+            release.pop()
+
+        # a dev release without pre-release comes before the pre-releases
+        if self.pre is None and self.post is None and self.dev is not None:
+            pre = (-1, 0)
+        elif self.pre is None:
+            pre = (3, 0)
+        else:
+            pre = self.pre
+        post = -1 if self.post is None else self.post
+        dev = float("inf") if self.dev is None else self.dev
+
+        local = ()
+        if self.local:
+            local = tuple(
+                (1, int(part), "") if part.isdigit() else (0, 0, part)
+                for part in re.split(r"[-_.]", self.local.lower())
+            )
+        return (self.epoch, tuple(release), pre, post, dev, local)
+
+    @property
+    def public(self):
+        """The version without its local part."""
+        return parse_version(self.text.split("+")[0])
+
+    @property
+    def base(self):
+        """The epoch and release only, e.g. `1.2` of `1.2rc1`."""
+        release = ".".join(str(n) for n in self.release)
+        if self.epoch:
+            return parse_version(f"{self.epoch}!{release}")
+        return parse_version(release)
+
+    @property
+    def is_prerelease(self):
+        return self.pre is not None or self.dev is not None
+
+    @property
+    def is_postrelease(self):
+        return self.post is not None
+
+    def __eq__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self.key == other.key
+
+    def __lt__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self.key < other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"Version('{self.text}')"
+
+    def __str__(self):
+        return self.text
+
+
+@lru_cache(maxsize=4096)
+def parse_version(text):
+    """Return the `Version` of `text`, or `None` if it is not one.
+    """
+    try:
+        return Version(text)
+    except InvalidRequirement:
+        return None
+
+
+
+#]===========================================================================[#
+#] SPECIFIERS [#=============================================================[#
+#]===========================================================================[#
+
+def padded(release, length):
+    """Pad a release tuple with zeros up to `length`.
+    """
+    return tuple(release) + (0,) * (length - len(release))
+
+
+def prefix_matches(version, prefix):
+    """
+    Test wether `version` matches a `==1.2.*` style prefix, given
+    without the `.*`.
+    """
+    spec = Version(prefix)
+    if version.epoch != spec.epoch:
+        return False
+    release = padded(version.release, len(spec.release))
+    return release[:len(spec.release)] == spec.release
+
+
+def specifier_contains(operator, spec_text, version):
+    """
+    Test wether the `Version` `version` matches a single specifier
+    like `>=` `1.2`.
+    """
+    if operator == "===":
+        return version.text.lower() == spec_text.lower()
+
+    if spec_text.endswith(".*"):
+        if operator not in ("==", "!="):
+            raise InvalidRequirement(
+                f"Invalid specifier: {operator}{spec_text}"
+            )
+        matches = prefix_matches(version.public, spec_text[:-2])
+        return matches if operator == "==" else not matches
+
+    spec = Version(spec_text)
+    if operator in ("==", "!="):
+        # a local version matches a specifier without one
+        candidate = version if spec.local else version.public
+        return (candidate == spec) == (operator == "==")
+
+    candidate = version.public
+    if operator == "~=":
+        if len(spec.release) < 2:
+            raise InvalidRequirement(f"Invalid specifier: ~={spec_text}")
+        prefix = ".".join(str(n) for n in spec.release[:-1])
+        if spec.epoch:
+            prefix = f"{spec.epoch}!{prefix}"
+        return candidate >= spec and prefix_matches(candidate, prefix)
+    if operator == ">=":
+        return candidate >= spec
+    if operator == "<=":
+        return candidate <= spec
+    if operator == ">":
+        # a post-release of the version itself is not greater
+        if not spec.is_postrelease and candidate.is_postrelease \
+                and candidate.base == spec.base:
+            return False
+        return candidate > spec
+    if operator == "<":
+        # neither is a pre-release of the version itself
+        if not spec.is_prerelease and candidate.is_prerelease \
+                and candidate.base == spec.base:
+            return False
+        return candidate < spec
+    raise InvalidRequirement(f"Invalid specifier: {operator}{spec_text}")
+
+
+@dataclass
+class SpecifierSet:
+    """A comma separated list of specifiers, e.g. `>=1.2,<2`."""
+    specifiers: list = field(default_factory=list)
+
+    def __str__(self):
+        return ",".join(f"{op}{version}" for op, version in self.specifiers)
+
+    def __bool__(self):
+        return bool(self.specifiers)
+
+    def contains(self, version):
+        """
+        Test wether a version, given as `Version` or as text, matches
+        all specifiers. Pre-releases match, like they do for installed
+        distributions.
+        """
+        if not self.specifiers:
+            return True
+        if not isinstance(version, Version):
+            version = parse_version(version)
+            if version is None:
+                return False
+        return all(
+            specifier_contains(op, spec, version)
+            for op, spec in self.specifiers
+        )
+
+
+@lru_cache(maxsize=4096)
+def parse_specifier(text):
+    """
+    Return the `SpecifierSet` of a text like `>=1.2, <2` or `(>=1.2)`.
+    """
+    text = text.strip()
+    if text.startswith("(") and text.endswith(")"):
+        text = text[1:-1]
+
+    specifiers = []
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        match = SPECIFIER_RE.match(part)
+        if match is None:
+            raise InvalidRequirement(f"Invalid specifier: '{part.strip()}'")
+        specifiers.append((match.group(1), match.group(2)))
+    return SpecifierSet(specifiers)
+
+
+
+#]===========================================================================[#
+#] MARKERS [#================================================================[#
+#]===========================================================================[#
+
+def tokenize_marker(text):
+    """
+    Return the `(kind, value)` tokens of a marker expression.
+    """
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = MARKER_TOKEN_RE.match(text, pos)
+        if match is None:
+            raise InvalidRequirement(f"Invalid marker: '{text}'")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "string":
+            value = value[1:-1]
+        elif kind == "op":
+            value = " ".join(value.split())
+        tokens.append((kind, value))
+        pos = match.end()
+    return tokens
+
+
+class MarkerParser:
+    """
+    Recursive descent parser turning marker tokens into nested tuples:
+    `("or", a, b)`, `("and", a, b)` and `(op, lhs, rhs)` where `lhs`
+    and `rhs` are `("var", name)` or `("str", value)`.
+    """
+    def __init__(self, tokens, text):
+        self.tokens = tokens
+        self.text = text
+        self.pos = 0
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return (None, None)
+
+    def take(self, kind=None):
+        token = self.peek()
+        if token[0] is None or (kind is not None and token[0] != kind):
+            raise InvalidRequirement(f"Invalid marker: '{self.text}'")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        tree = self.parse_or()
+        if self.pos != len(self.tokens):
+            raise InvalidRequirement(f"Invalid marker: '{self.text}'")
+        return tree
+
+    def parse_or(self):
+        tree = self.parse_and()
+        while self.peek() == ("bool", "or"):
+            self.take()
+            tree = ("or", tree, self.parse_and())
+        return tree
+
+    def parse_and(self):
+        tree = self.parse_atom()
+        while self.peek() == ("bool", "and"):
+            self.take()
+            tree = ("and", tree, self.parse_atom())
+        return tree
+
+    def parse_atom(self):
+        if self.peek() == ("paren", "("):
+            self.take()
+            tree = self.parse_or()
+            self.take("paren")
+            return tree
+        lhs = self.parse_value()
+        _, op = self.take("op")
+        rhs = self.parse_value()
+        return (op, lhs, rhs)
+
+    def parse_value(self):
+        kind, value = self.take()
+        if kind == "string":
+            return ("str", value)
+        if kind == "var":
+            return ("var", MARKER_ALIASES.get(value, value))
+        raise InvalidRequirement(f"Invalid marker: '{self.text}'")
+
+
+@lru_cache(maxsize=4096)
+def parse_marker(text):
+    """Return the parsed tree of a marker expression.
+    """
+    return MarkerParser(tokenize_marker(text), text).parse()
+
+
+def compare_marker_values(op, lhs, rhs):
+    """
+    Compare two marker values, as versions if both are versions and
+    the operator is a version operator, as strings otherwise.
+    """
+    if op == "in":
+        return lhs in rhs
+    if op == "not in":
+        return lhs not in rhs
+
+    if op != "===":
+        version = parse_version(lhs)
+        if version is not None:
+            try:
+                return specifier_contains(op, rhs, version)
+            except InvalidRequirement:
+                pass
+
+    if op in ("==", "==="):
+        return lhs == rhs
+    if op == "!=":
+        return lhs != rhs
+    if op == "<":
+        return lhs < rhs
+    if op == "<=":
+        return lhs <= rhs
+    if op == ">":
+        return lhs > rhs
+    if op == ">=":
+        return lhs >= rhs
+    return False
+
+
+def evaluate_tree(tree, environment):
+    """Evaluate a marker tree in `environment`.
+    """
+    op, lhs, rhs = tree
+    if op == "and":
+        return (
+            evaluate_tree(lhs, environment)
+            and evaluate_tree(rhs, environment)
+        )
+    if op == "or":
+        return (
+            evaluate_tree(lhs, environment)
+            or evaluate_tree(rhs, environment)
+        )
+
+    values = []
+    is_extra = False
+    for kind, value in (lhs, rhs):
+        if kind == "var":
+            if value == "extra":
+                is_extra = True
+            value = environment.get(value, "")
+        values.append(value)
+    if is_extra:
+        values = [canonical_name(v) for v in values]
+    return compare_marker_values(op, *values)
+
+
+def evaluate_marker(text, environment):
+    """
+    Test wether a marker expression holds in `environment`, a dict of
+    marker variables. Markers not understood count as true.
+    """
+    if not text:
+        return True
+    try:
+        return evaluate_tree(parse_marker(text), environment)
+    except InvalidRequirement as e:
+        logger.debug(str(e))
+        return True
+
+
+
+#]===========================================================================[#
+#] REQUIREMENTS [#===========================================================[#
+#]===========================================================================[#
+
+@dataclass
+class Requirement:
+    """A parsed requirement like `requests[socks]>=2 ; os_name == 'nt'`."""
+    name: str
+    extras: tuple
+    specifier: SpecifierSet
+    url: str
+    marker: str
+
+    @property
+    def key(self):
+        """The canonical name of the required distribution.
+        """
+        return canonical_name(self.name)
+
+
+@lru_cache(maxsize=8192)
+def parse_requirement(text):
+    """Return the `Requirement` of a `Requires-Dist` value.
+    """
+    match = REQUIREMENT_RE.match(text)
+    if match is None:
+        raise InvalidRequirement(f"Invalid requirement: '{text}'")
+
+    extras = tuple(
+        canonical_name(e.strip())
+        for e in (match.group("extras") or "").split(",")
+        if e.strip()
+    )
+    return Requirement(
+        name=match.group("name"),
+        extras=extras,
+        specifier=parse_specifier(match.group("specifier") or ""),
+        url=match.group("url"),
+        marker=(match.group("marker") or "").strip()
+    )
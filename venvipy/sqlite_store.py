@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+This module contains the base of the SQLite databases VenviPy keeps in
+`~/.venvipy`: the interpreter registry, the venv index and the package
+index.
+"""
+import os
+import sqlite3
+import logging
+import threading
+from contextlib import closing, contextmanager
+
+
+logger = logging.getLogger(__name__)
+
+
+
+class SQLiteStore:
+    """
+    A SQLite database whose tables are created on first use. Every
+    call opens its own connection, so a store can be used from any
+    thread.
+
+    Subclasses set `SCHEMA` and the `NAME` used in log messages. With
+    a `RECORD_VERSION`, the `TABLES` are dropped when the version
+    stored in the database differs, so they are filled again.
+    """
+    NAME = "database"
+    SCHEMA = ""
+    RECORD_VERSION = None
+    TABLES = ()
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self._schema_lock = threading.Lock()
+        self._has_schema = False
+
+    def _connect(self):
+        """Open a connection and create the tables if needed.
+        """
+        os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+        conn = sqlite3.connect(self.db_file, timeout=10)
+        with self._schema_lock:
+            if not self._has_schema:
+                if self.RECORD_VERSION is not None:
+                    self._check_version(conn)
+                conn.executescript(self.SCHEMA)
+                self._has_schema = True
+        return conn
+
+    def _check_version(self, conn):
+        """Drop the tables written by another record version.
+        """
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != self.RECORD_VERSION:
+            for table in self.TABLES:
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute(f"PRAGMA user_version = {self.RECORD_VERSION}")
+
+    def exists(self):
+        """Test wether the database file exists.
+        """
+        return os.path.exists(self.db_file)
+
+    def fetchall(self, sql, args=()):
+        """
+        Return the rows of a query. Return no rows if the database
+        does not exist yet or can't be read.
+        """
+        if not self.exists():
+            return []
+        try:
+            with closing(self._connect()) as conn:
+                return conn.execute(sql, args).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to read the {self.NAME}: {e}")
+            return []
+
+    @contextmanager
+    def transaction(self):
+        """
+        Yield a connection whose changes are committed together. On
+        errors nothing is changed and a warning is logged.
+        """
+        try:
+            with closing(self._connect()) as conn, conn:
+                yield conn
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to write the {self.NAME}: {e}")
@@ -23,8 +23,20 @@ from PyQt5.QtWidgets import (
 
 import get_data
 import creator
-from dialogs import ConsoleDialog, ProgBarDialog, ProjectsDialog
+import inventory
+import deptree
+import dedupe
+from dialogs import (
+    ConsoleDialog,
+    ProgBarDialog,
+    ProjectsDialog,
+    PackagesDialog,
+    DependencyTreeDialog,
+    FreezeOptionsDialog
+)
 from creator import CloningWorker, InstallPipWorker
+from workers import DedupeWorker
+from models import format_size
 from manage_pip import PipManager
 from venvi_cfg import VenvConfigMgr
 
@@ -64,6 +76,8 @@ class VenvTable(BaseTable):
     text_changed = pyqtSignal(str)
     refresh = pyqtSignal()
     add_pkgs = pyqtSignal(str)
+    start_dedupe_scan = pyqtSignal(object)
+    start_dedupe_link = pyqtSignal(object)
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -109,6 +123,22 @@ class VenvTable(BaseTable):
         self.thread2.finished.connect(self.thread2.quit)
         self.thread2.finished.connect(self.thread2.wait)
 
+        self.thread3 = QThread(self)
+        self.m_dedupe_worker = DedupeWorker()
+
+        self.thread3.start()
+        self.m_dedupe_worker.moveToThread(self.thread3)
+        self.m_dedupe_worker.started.connect(self.progress_bar.exec_)
+        self.m_dedupe_worker.scanned.connect(self.progress_bar.close)
+        self.m_dedupe_worker.scanned.connect(self.confirm_reclaim_space)
+        self.m_dedupe_worker.linked.connect(self.progress_bar.close)
+        self.m_dedupe_worker.linked.connect(self.finish_reclaim_space)
+        self.start_dedupe_scan.connect(self.m_dedupe_worker.run_scan)
+        self.start_dedupe_link.connect(self.m_dedupe_worker.run_link)
+
+        self.thread3.finished.connect(self.thread3.quit)
+        self.thread3.finished.connect(self.thread3.wait)
+
         self.pip_mgr_fail_msg = None
 
     def contextMenuEvent(self, event):
@@ -237,7 +267,7 @@ class VenvTable(BaseTable):
         list_deptree_action = QAction(
             "Display &dependency tree",
             self,
-            statusTip="List dependencies with 'pipdeptree'"
+            statusTip="Show the dependency tree of the installed packages"
         )
         list_deptree_action.triggered.connect(
             lambda: self.deptree_packages(event, style=3)
@@ -253,6 +283,16 @@ class VenvTable(BaseTable):
             lambda: self.open_venv_dir(event)
         )
 
+        reclaim_space_action = QAction(
+            self.drive_icon,
+            "Re&claim disk space",
+            self,
+            statusTip="Replace duplicate files of the selected venvs by links"
+        )
+        reclaim_space_action.triggered.connect(
+            lambda: self.reclaim_space(event)
+        )
+
         delete_venv_action = QAction(
             self.delete_icon,
             "&Delete environment",
@@ -287,21 +327,48 @@ class VenvTable(BaseTable):
         context_menu.addAction(generate_scripts_action)
         context_menu.addAction(list_projects_action)
         context_menu.addAction(open_venv_dir_action)
+        context_menu.addAction(reclaim_space_action)
         context_menu.addAction(delete_venv_action)
 
 
+    def get_selected_venv_path(self):
+        """Get the path of the selected venv.
+        """
+        for index in self.selectionModel().selectedRows():
+            return self.model().venv(index.row()).venv_path
+        return ""
+
+
+    def get_selected_venv(self):
+        """
+        Get the `(parent directory, name)` of the selected venv, the
+        venvs found in workspace roots can be anywhere.
+        """
+        return os.path.split(self.get_selected_venv_path())
+
+
+    def get_selected_venv_paths(self):
+        """Get the paths of all selected venvs.
+        """
+        return [
+            self.model().venv(index.row()).venv_path
+            for index in self.selectionModel().selectedRows()
+        ]
+
+
     def valid_version(self, venv_path):
         """Test wether the Python version required is installed.
         """
         cfg_file = os.path.join(venv_path, "pyvenv.cfg")
-        is_installed = get_data.get_pyvenv_cfg(cfg_file, "installed")
-        version = get_data.get_pyvenv_cfg(cfg_file, "version")
-        py_path = get_data.get_pyvenv_cfg(cfg_file, "py_path")
+        pyvenv_cfg = get_data.read_pyvenv_cfg(cfg_file)
+        if pyvenv_cfg is None:
+            return True
+
         msg_txt = (
-            f"This environment requires {version} \nfrom {py_path} which is \nnot installed.\n"
+            f"This environment requires {pyvenv_cfg.version_str} \nfrom {pyvenv_cfg.py_path} which is \nnot installed.\n"
         )
 
-        if is_installed == "no":
+        if not pyvenv_cfg.is_installed():
             msg_box = QMessageBox(
                 QMessageBox.Critical,
                 "Error",
@@ -420,14 +487,13 @@ class VenvTable(BaseTable):
     def upgrade_pip(self, event):
         """Run `pip install --upgrade pip` command.
         """
-        active_dir = get_data.get_active_dir_str()
-        venv = self.get_selected_item()
+        venv_parent, venv = self.get_selected_venv()
 
-        if self.has_pip(active_dir, venv):
+        if self.has_pip(venv_parent, venv):
             self.console.setWindowTitle("Updating Pip")
             logger.debug("Attempting to update Pip...")
 
-            self.manager = PipManager(active_dir, venv)
+            self.manager = PipManager(venv_parent, venv)
 
             # On Windows this call to run_pip BEFORE doing the connect calls
             # below is problematic, though it works fine on Ubuntu.
@@ -451,7 +517,7 @@ class VenvTable(BaseTable):
             response = QMessageBox.question(self, 'Need Pip?', "Would you like to install pip?", QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
             if response == QMessageBox.Yes:
                 wrapper = partial(
-                    self.m_install_pip_worker.run_process, active_dir, venv
+                    self.m_install_pip_worker.run_process, venv_parent, venv
                 )
                 QTimer.singleShot(0, wrapper)
                 
@@ -462,7 +528,7 @@ class VenvTable(BaseTable):
         """
         Install additional packages into the selected environment.
         """
-        self.add_pkgs.emit(self.get_selected_item())
+        self.add_pkgs.emit(self.get_selected_venv_path())
 
 
     def install_requires(self, event):
@@ -470,10 +536,9 @@ class VenvTable(BaseTable):
         Install packages from a requirements file into the
         selected environment.
         """
-        active_dir = get_data.get_active_dir_str()
-        venv = self.get_selected_item()
+        venv_parent, venv = self.get_selected_venv()
 
-        if self.has_pip(active_dir, venv):
+        if self.has_pip(venv_parent, venv):
             file_name = QFileDialog.getOpenFileName(
                 self,
                 "Select a requirements"
@@ -485,7 +550,7 @@ class VenvTable(BaseTable):
                 self.console.setWindowTitle("Installing from requirements")
                 logger.debug("Installing from requirements...")
 
-                self.manager = PipManager(active_dir, venv)
+                self.manager = PipManager(venv_parent, venv)
                 if os.name == 'nt':
                     self.manager.run_pip(
                         creator.cmds[0], [creator.opts[1], f"{file_path}"]
@@ -507,10 +572,9 @@ class VenvTable(BaseTable):
     def install_local(self, event):
         """Install from a local project.
         """
-        active_dir = get_data.get_active_dir_str()
-        venv = self.get_selected_item()
+        venv_parent, venv = self.get_selected_venv()
 
-        if self.has_pip(active_dir, venv):
+        if self.has_pip(venv_parent, venv):
             project_dir = QFileDialog.getExistingDirectory(
                 self,
                 "Select project directory"
@@ -521,7 +585,7 @@ class VenvTable(BaseTable):
                 self.console.setWindowTitle(f"Installing {project_name}")
                 logger.debug("Installing from local project path...")
 
-                self.manager = PipManager(active_dir, venv)
+                self.manager = PipManager(venv_parent, venv)
                 if os.name == 'nt':
                     self.manager.run_pip(
                         creator.cmds[0], [creator.opts[2], f"{project_dir}"]
@@ -543,16 +607,15 @@ class VenvTable(BaseTable):
     def install_vsc(self, event):
         """Install from a VSC repository.
         """
-        active_dir = get_data.get_active_dir_str()
+        venv_parent, venv = self.get_selected_venv()
         if os.name == 'nt':
-            active_dir = active_dir.replace('/', '\\')
-        venv = self.get_selected_item()
+            venv_parent = venv_parent.replace('/', '\\')
         if os.name == 'nt':
-            venv_bin = os.path.join(active_dir, venv, "Scripts", "python.exe")
+            venv_bin = os.path.join(venv_parent, venv, "Scripts", "python.exe")
         else:
-            venv_bin = os.path.join(active_dir, venv, "bin", "python")
+            venv_bin = os.path.join(venv_parent, venv, "bin", "python")
 
-        if self.has_pip(active_dir, venv):
+        if self.has_pip(venv_parent, venv):
             url, ok = QInputDialog.getText(
                 self,
                 "Specify VSC project url",
@@ -596,29 +659,40 @@ class VenvTable(BaseTable):
     def save_requires(self, event):
         """
         Write the requirements of the selected environment to file.
+        They are read from the metadata in site-packages, so pip isn't
+        needed in the venv.
         """
-        active_dir = get_data.get_active_dir_str()
-        venv = self.get_selected_item()
-        venv_dir = os.path.join(active_dir, venv)
+        venv_parent, venv = self.get_selected_venv()
+        venv_dir = os.path.join(venv_parent, venv)
 
-        if self.has_pip(active_dir, venv):
-            save_file = QFileDialog.getSaveFileName(
-                self,
-                "Save requirements",
-                directory=f"{venv_dir}/requirements.txt"
+        save_file = QFileDialog.getSaveFileName(
+            self,
+            "Save requirements",
+            directory=f"{venv_dir}/requirements.txt"
+        )
+        save_path = save_file[0]
+        if save_path == "":
+            return
+
+        options = FreezeOptionsDialog(self)
+        if not options.exec_():
+            return
+
+        logger.debug(f"Saving '{save_path}'...")
+        try:
+            inventory.write_freeze(
+                venv_dir, save_path, options.include_all(), options.exclude()
             )
-            save_path = save_file[0]
-
-            if save_path != "":
-                logger.debug(f"Saving '{save_path}'...")
-
-                # write 'pip freeze' output to selected file
-                self.manager = PipManager(active_dir, venv)
-                self.manager.run_pip(creator.cmds[2], [">", save_path])
+        except OSError as e:
+            logger.error(f"Failed to save '{save_path}': {e}")
+            QMessageBox.critical(
+                self, "Error", f"Could not save requirements:\n{e}"
+            )
+            return
 
-                # show an info message
-                message_txt = (f"Saved requirements in \n{save_path}")
-                QMessageBox.information(self, "Saved", message_txt)
+        # show an info message
+        message_txt = (f"Saved requirements in \n{save_path}")
+        QMessageBox.information(self, "Saved", message_txt)
 
 
     def generate_scripts(self, event):
@@ -626,9 +700,8 @@ class VenvTable(BaseTable):
         Generates an activate and deactive script in the chosen
         project directory for the venv selected in the table.
         """
-        active_dir = get_data.get_active_dir_str()
-        venv = self.get_selected_item()
-        venv_dir = os.path.join(active_dir, venv)
+        venv_parent, venv = self.get_selected_venv()
+        venv_dir = os.path.join(venv_parent, venv)
 
         if os.name == 'nt':
             ext = ".bat"
@@ -675,7 +748,7 @@ class VenvTable(BaseTable):
                         logger.debug(f"Script contents: {script_file_contents}")
 
                 # Update the venvi config
-                vcm = VenvConfigMgr(active_dir, venv)
+                vcm = VenvConfigMgr(venv_parent, venv)
                 if vcm.read():
                     logger.debug(f"Dev Project dir written to venvi cfg file: '{project_dir}'")
                     # Only append if project_dir is not in the projects directory list
@@ -692,38 +765,34 @@ class VenvTable(BaseTable):
 
     def list_packages(self, event, style):
         """
-        Open console dialog and list the installed packages. The argument
-        `style` controls which style the output should have: `style=1` for
-        `pip list`, `style=2` for `pip freeze` and style=3 for a dependency
-        output via `pipdeptree`.
+        Open a dialog and list the installed packages. The argument
+        `style` controls which style the output should have: `style=1`
+        for `pip list`, `style=2` for `pip freeze` and `style=3` for a
+        dependency tree. All are read from the metadata in site-packages,
+        without running pip in the venv.
         """
-        active_dir = get_data.get_active_dir_str()
-        venv = self.get_selected_item()
-
-        if self.has_pip(active_dir, venv):
-            self.console.setWindowTitle(f"Packages installed in:  {venv}")
-
-            if os.name == 'nt':
-                self.manager = PipManager(active_dir, f"{venv}")
-            else:
-                self.manager = PipManager(active_dir, f"'{venv}'")
-            
-            # We have to do the connect BEFORE we run_pip on Windows 10,
-            # else the console never is displayed. However, this works
-            # fine as originally coded on Ubuntu.
-            #self.manager.run_pip(creator.cmds[style])
-
-            #self.manager.started.connect(self.console.exec_)
-            self.manager.started.connect(self.raise_console_dialog)
+        venv_parent, venv = self.get_selected_venv()
 
-            self.manager.run_pip(creator.cmds[style])
+        if style == 3:
+            self.show_deptree(venv_parent, venv)
+        else:
+            self.show_inventory(venv_parent, venv, style)
 
-            # display the updated output
-            self.manager.textChanged.connect(self.console.update_status)
+    def show_inventory(self, venv_parent, venv, style):
+        """
+        Show the packages read from the metadata of a venv, `style=1`
+        as a table, `style=2` as requirements.
+        """
+        dists = inventory.get_distributions(os.path.join(venv_parent, venv))
+        if not dists:
+            text = f"No packages found in {venv}"
+        elif style == 1:
+            text = inventory.format_list(dists)
+        else:
+            text = inventory.format_freeze(dists)
 
-            # clear the content on window close
-            if self.console.close:
-                self.console.console_window.clear()
+        dialog = PackagesDialog(f"Packages installed in:  {venv}", text, self)
+        dialog.exec_()
 
     def list_projects(self, event, style):
         """
@@ -733,12 +802,11 @@ class VenvTable(BaseTable):
         `pip list`, `style=2` for `pip freeze` and style=3 for a dependency
         output via `pipdeptree`.
         """
-        active_dir = get_data.get_active_dir_str()
-        venv = self.get_selected_item()
+        venv_parent, venv = self.get_selected_venv()
 
         self.projects = ProjectsDialog(venv, self)
 
-        vcm = VenvConfigMgr(active_dir, venv)
+        vcm = VenvConfigMgr(venv_parent, venv)
         if vcm.read():
             logger.debug("Read a valid venvipy cfg file")
             for projdir in vcm.vc.projects:
@@ -750,79 +818,104 @@ class VenvTable(BaseTable):
 
         self.projects.exec_()
 
-    def raise_console_dialog(self):
-        """
-        On Windows 10, if we raise the console via self.console.exec_ as originally
-        coded (and which does work on Ubuntu), the self.manager.textChanged.connect() 
-        slots are not called eventhough the corresponding emits are happening in the 
-        self.manager object. This method should work on both Windows & Ubuntu since
-        it is doing essentially what the exec_ call does interms of displaying a modal
-        dialog while not inhibiting the textChanged connect slots from being invoked.
-        """
-        self.console.setModal(True)
-        self.console.show()
-
     def freeze_packages(self, event, style):
-        """Print `pip freeze` output to console window.
+        """Show the `pip freeze` like output of the selected venv.
         """
         self.list_packages(event, style)
 
 
     def deptree_packages(self, event, style):
+        """Show the dependency tree of the selected venv.
         """
-        Test if `pipdeptree` is installed and ask user wether to
-        install it if it's not. Then call `self.list_packages()`
+        self.list_packages(event, style)
+
+    def show_deptree(self, venv_parent, venv):
         """
-        active_dir = get_data.get_active_dir_str()
-        venv = self.get_selected_item()
-        if os.name == 'nt':
-            pipdeptree_loc = "Scripts"
-            pipdeptree_exe = "pipdeptree.exe"
-        else:
-            pipdeptree_loc = "bin"
-            pipdeptree_exe = "pipdeptree"
-        pipdeptree_binary = os.path.join(active_dir, venv, pipdeptree_loc, pipdeptree_exe)
-        has_pipdeptree = os.path.exists(pipdeptree_binary)
-        message_txt = (
-            "This requires the pipdeptree package\nto be installed.\n\n"
-            "Do you want to install it?\n"
+        Show the dependency tree of a venv, with the markers evaluated
+        for the interpreter of the venv.
+        """
+        venv_dir = os.path.join(venv_parent, venv)
+        version_info, implementation = get_data.get_venv_interpreter(
+            venv_dir
+        )
+        graph = deptree.get_dependency_graph(
+            venv_dir, version_info, implementation
         )
+        dialog = DependencyTreeDialog(graph, venv, self)
+        dialog.exec_()
 
-        if has_pipdeptree:
-            self.list_packages(event, style)
-        else:
-            if self.has_pip(active_dir, venv):
-                msg_box_confirm = QMessageBox.question(
-                    self,
-                    "Confirm",
-                    message_txt,
-                    QMessageBox.Yes | QMessageBox.Cancel
-                )
-                if msg_box_confirm == QMessageBox.Yes:
-                    self.progress_bar.setWindowTitle("Installing")
-                    self.progress_bar.status_label.setText(
-                        "Installing pipdeptree..."
-                    )
-                    logger.debug("Installing pipdeptree...")
 
-                    self.manager = PipManager(active_dir, venv)
-                    self.manager.started.connect(self.progress_bar.exec_)
-                    self.manager.finished.connect(self.progress_bar.close)
-                    self.manager.run_pip(
-                        creator.cmds[0], [creator.opts[0], "pipdeptree"]
-                    )
-                    #self.manager.started.connect(self.progress_bar.exec_)
-                    #self.manager.finished.connect(self.progress_bar.close)
-                    self.manager.process_stop()
-                    self.list_packages(event, style)
+    def reclaim_space(self, event):
+        """
+        Look for files with the same content in the site-packages of
+        the selected venvs, the report is shown before anything is
+        changed.
+        """
+        venv_paths = self.get_selected_venv_paths()
+        if not venv_paths:
+            return
+
+        self.progress_bar.setWindowTitle("Reclaim disk space")
+        self.progress_bar.status_label.setText(
+            "Looking for duplicate files..."
+        )
+        logger.debug(f"Looking for duplicates in {len(venv_paths)} venv(s)")
+        self.start_dedupe_scan.emit(venv_paths)
+
+
+    def confirm_reclaim_space(self, report):
+        """
+        Show the dry-run report of a scan, link the duplicates if
+        confirmed.
+        """
+        if not report.groups:
+            QMessageBox.information(
+                self,
+                "Reclaim disk space",
+                f"No duplicate files found in {report.scanned} file(s)."
+            )
+            return
+
+        msg_box = QMessageBox(
+            QMessageBox.Question,
+            "Reclaim disk space",
+            f"Found {report.duplicates} duplicate file(s), replacing "
+            f"them by links frees {format_size(report.reclaimable)}.\n\n"
+            "Linked files share their content: changing one in place "
+            "changes all of them. Replace the duplicates?",
+            QMessageBox.Yes | QMessageBox.Cancel,
+            self
+        )
+        msg_box.setDetailedText(dedupe.format_report(report, format_size))
+        if msg_box.exec_() != QMessageBox.Yes:
+            return
+
+        self.progress_bar.status_label.setText("Linking duplicate files...")
+        self.start_dedupe_link.emit(report)
+
+
+    def finish_reclaim_space(self, result):
+        """Show what linking the duplicates has freed.
+        """
+        msg_txt = (
+            f"Replaced {result.linked} duplicate file(s) by links, "
+            f"reclaimed {format_size(result.reclaimed)}."
+        )
+        if result.errors:
+            logger.warning("\n".join(result.errors))
+            msg_txt += (
+                f"\n\n{len(result.errors)} file(s) were skipped, "
+                "see the log for details."
+            )
+        QMessageBox.information(self, "Done", msg_txt)
+        self.refresh.emit()
 
 
     def open_venv_dir(self, event):
         """Open the selected venv directory.
         """
-        active_dir = get_data.get_active_dir_str()
-        venv = self.get_selected_item()
-        venv_dir = os.path.join(active_dir, venv)
+        venv_parent, venv = self.get_selected_venv()
+        venv_dir = os.path.join(venv_parent, venv)
 
         if os.path.isdir(venv_dir):
             if os.name == 'nt':
@@ -841,9 +934,8 @@ class VenvTable(BaseTable):
         Delete the selected virtual environment by clicking
         delete from the context menu in venv table.
         """
-        active_dir = get_data.get_active_dir_str()
-        venv = self.get_selected_item()
-        venv_path = os.path.join(active_dir, venv)
+        venv_parent, venv = self.get_selected_venv()
+        venv_path = os.path.join(venv_parent, venv)
 
         if self.venv_exists(venv_path):
             msg_box_critical = QMessageBox.critical(
@@ -942,10 +1034,19 @@ class InterpreterTable(BaseTable):
         )
 
 
+    def get_selected_path(self):
+        """
+        Get the interpreter path of the selected row (index 1).
+        """
+        listed_items = self.selectionModel().selectedRows(1)
+        for index in listed_items:
+            return index.data()
+
+
     def remove_python(self, event):
         """Remove a Python version from the table.
         """
-        item = self.get_selected_item()
+        item = self.get_selected_path()
 
         msg_box_warning = QMessageBox.warning(
             self,
@@ -954,12 +1055,5 @@ class InterpreterTable(BaseTable):
             QMessageBox.Yes | QMessageBox.Cancel
         )
         if msg_box_warning == QMessageBox.Yes:
-            with open(get_data.DB_FILE, "r") as f:
-                lines = f.readlines()
-            with open(get_data.DB_FILE, "w") as f:
-                for line in lines:
-                    if item not in line:
-                        f.write(line)
-
-            logger.debug(f"Removed '{item}' from database")
+            get_data.remove_python(item)
             self.drop_item.emit()
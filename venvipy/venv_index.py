@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+This module manages the venv index, a SQLite database in `~/.venvipy`
+holding what was read from each venv together with the stat of the
+files it was read from. Venvs whose stat didn't change are not read
+again. It also holds the directory listings of the workspace roots
+and the disk usage of the venvs.
+"""
+import os
+import json
+import logging
+
+from sqlite_store import SQLiteStore
+
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = os.path.expanduser("~/.venvipy/venv-index.db")
+
+# bump when the records change, the index is dropped on mismatch
+RECORD_VERSION = 5
+
+# the files read from a venv, their stat is part of the fingerprint
+VENV_FILES = ("pyvenv.cfg", "venvipy.cfg")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS venvs (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS venvs_folder ON venvs (folder);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    listing TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dirs_root ON dirs (root);
+CREATE TABLE IF NOT EXISTS sizes (
+    path TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+"""
+
+
+
+def venv_fingerprint(venv_path):
+    """
+    Return the `[mtime_ns, [mtime_ns, size], ...]` list of the venv
+    directory and its config files. Missing files are `None`.
+    """
+    try:
+        fingerprint = [os.stat(venv_path).st_mtime_ns]
+    except OSError:
+        return None
+
+    for name in VENV_FILES:
+        try:
+            st = os.stat(os.path.join(venv_path, name))
+            fingerprint.append([st.st_mtime_ns, st.st_size])
+        except OSError:
+            fingerprint.append(None)
+    return fingerprint
+
+
+
+class VenvIndex(SQLiteStore):
+    """Store the venvs read from the folders and workspace roots.
+    """
+    NAME = "venv index"
+    SCHEMA = SCHEMA
+    RECORD_VERSION = RECORD_VERSION
+    TABLES = ("venvs", "dirs", "sizes")
+
+    def __init__(self, db_file=INDEX_FILE):
+        super().__init__(db_file)
+
+    def load(self, folder):
+        """
+        Return the venvs indexed for `folder` as a dict mapping a
+        venv path to `{"fingerprint": [...], "record": {...}}`, in
+        the order they were indexed.
+        """
+        rows = self.fetchall(
+            "SELECT path, fingerprint, record FROM venvs "
+            "WHERE folder = ? ORDER BY rowid",
+            (folder,)
+        )
+        return {
+            path: {
+                "fingerprint": json.loads(fingerprint),
+                "record": json.loads(record)
+            }
+            for path, fingerprint, record in rows
+        }
+
+    def replace(self, folder, entries):
+        """
+        Replace the venvs indexed for `folder` by `entries`, a dict
+        like the one returned by `load()`, in one transaction.
+        """
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM venvs WHERE folder = ?", (folder,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO venvs "
+                "(path, folder, fingerprint, record) VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        path,
+                        folder,
+                        json.dumps(entry["fingerprint"]),
+                        json.dumps(entry["record"])
+                    )
+                    for path, entry in entries.items()
+                ]
+            )
+
+    def load_dirs(self, root):
+        """
+        Return the directory listings stored for the workspace root
+        `root` as a dict mapping a directory to its listing.
+        """
+        rows = self.fetchall(
+            "SELECT path, listing FROM dirs WHERE root = ?", (root,)
+        )
+        return {path: json.loads(listing) for path, listing in rows}
+
+    def replace_dirs(self, root, listings):
+        """
+        Replace the directory listings stored for `root` in one
+        transaction.
+        """
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM dirs WHERE root = ?", (root,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO dirs (path, root, listing) "
+                "VALUES (?, ?, ?)",
+                [
+                    (path, root, json.dumps(listing))
+                    for path, listing in listings.items()
+                ]
+            )
+
+    def load_sizes(self):
+        """
+        Return the stored venv sizes as a dict mapping a venv path to
+        a `(fingerprint, size)` tuple.
+        """
+        rows = self.fetchall("SELECT path, fingerprint, size FROM sizes")
+        return {
+            path: (json.loads(fingerprint), size)
+            for path, fingerprint, size in rows
+        }
+
+    def save_size(self, path, fingerprint, size):
+        """Store the size of a venv.
+        """
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sizes (path, fingerprint, size) "
+                "VALUES (?, ?, ?)",
+                (path, json.dumps(fingerprint), size)
+            )
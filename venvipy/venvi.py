@@ -4,7 +4,6 @@ The main module of VenviPy.
 """
 import sys
 import os
-import csv
 import getopt
 import logging
 from pathlib import Path
@@ -14,7 +13,15 @@ CURRENT_DIR = Path(__file__).parent
 sys.path.insert(0, str(CURRENT_DIR))
 os.chdir(CURRENT_DIR)
 
-from PyQt5.QtCore import Qt, QRect, QSize, pyqtSlot
+from PyQt5.QtCore import (
+    Qt,
+    QRect,
+    QSize,
+    QThread,
+    QTimer,
+    pyqtSignal,
+    pyqtSlot
+)
 from PyQt5.QtGui import (
     QIcon,
     QPixmap,
@@ -42,16 +49,39 @@ from PyQt5.QtWidgets import (
     QMessageBox,
     QDesktopWidget,
     QHBoxLayout,
-    QLineEdit
+    QLineEdit,
+    QDockWidget,
+    QTableView,
+    QComboBox
 )
 
 import venvipy_rc  # pylint: disable=unused-import
 import get_data
+import inventory
+from package_index import KIND_COMMAND, KIND_IMPORT
 import wizard
-from dialogs import InfoAboutVenviPy, LoggingLevelDialog
+from dialogs import (
+    InfoAboutVenviPy,
+    LoggingLevelDialog,
+    FreezeOptionsDialog
+)
 from tables import VenvTable, InterpreterTable
+from models import VenvTableModel, format_size
+from workers import (
+    DiscoveryWorker,
+    ExportWorker,
+    HealthWorker,
+    InterpreterWatcher,
+    PackageIndexWorker,
+    VenvScanWorker,
+    VenvSizeWorker,
+    VenvWatcher
+)
 
 LOG_FORMAT = "[%(levelname)s] - { %(name)s }: %(message)s"
+
+# check the interpreters' health every 12 hours
+HEALTH_CHECK_INTERVAL = 12 * 60 * 60 * 1000
 logger = logging.getLogger()
 
 
@@ -60,9 +90,18 @@ class MainWindow(QMainWindow):
     """
     The main window.
     """
+    start_discovery = pyqtSignal()
+    start_interpreter_update = pyqtSignal(object)
+    start_health_check = pyqtSignal()
+    start_venv_scan = pyqtSignal(int, str)
+    start_size_scan = pyqtSignal(int, object)
+    start_export = pyqtSignal(object, bool, object)
+    start_package_index = pyqtSignal(int, object)
+
     def __init__(self):
         super().__init__()
 
+        self.asked_for_python = False
         self.init_ui()
 
 
@@ -119,12 +158,91 @@ class MainWindow(QMainWindow):
         self.info_about_venvipy = InfoAboutVenviPy()
         self.venv_wizard = wizard.VenvWizard()
 
-        # refresh venv table on wizard close
-        self.venv_wizard.refresh.connect(self.pop_venv_table)
-
         # refresh interpreter table if 'py-installs' changes
         self.venv_wizard.update_table.connect(self.pop_interpreter_table)
 
+        # search for interpreters in the background, the tables are
+        # filled from the registry first and patched when finished
+        self.discovery_thread = QThread(self)
+        self.m_discovery_worker = DiscoveryWorker()
+        self.m_discovery_worker.moveToThread(self.discovery_thread)
+        self.start_discovery.connect(self.m_discovery_worker.run_discovery)
+        self.start_interpreter_update.connect(
+            self.m_discovery_worker.run_update
+        )
+        self.m_discovery_worker.finished.connect(
+            self.update_interpreter_table
+        )
+        self.discovery_thread.start()
+
+        # the health check shares the thread with the discovery,
+        # so both never write to the registry at the same time
+        self.m_health_worker = HealthWorker()
+        self.m_health_worker.moveToThread(self.discovery_thread)
+        self.start_health_check.connect(
+            self.m_health_worker.run_health_check
+        )
+        self.m_health_worker.finished.connect(self.update_health_column)
+
+        self.health_timer = QTimer(self)
+        self.health_timer.setInterval(HEALTH_CHECK_INTERVAL)
+        self.health_timer.timeout.connect(self.start_health_check)
+        self.health_timer.start()
+
+        # read the venvs in the background and fill the venv table
+        # batch by batch
+        self.venv_scan_id = 0
+        self.venv_scan_seen = set()
+        self.venv_scan_thread = QThread(self)
+        self.m_venv_scan_worker = VenvScanWorker()
+        self.m_venv_scan_worker.moveToThread(self.venv_scan_thread)
+        self.start_venv_scan.connect(self.m_venv_scan_worker.run_scan)
+        self.m_venv_scan_worker.batch.connect(self.add_venv_rows)
+        self.m_venv_scan_worker.finished.connect(self.finish_venv_scan)
+        self.venv_scan_thread.start()
+
+        # walk the venvs for their disk usage once they are listed
+        self.size_thread = QThread(self)
+        self.m_size_worker = VenvSizeWorker()
+        self.m_size_worker.moveToThread(self.size_thread)
+        self.start_size_scan.connect(self.m_size_worker.run_sizes)
+        self.m_size_worker.sizes.connect(self.update_venv_sizes)
+        self.size_thread.start()
+
+        # index the packages of all venvs listed once they are known
+        self.package_index_thread = QThread(self)
+        self.m_package_index_worker = PackageIndexWorker()
+        self.m_package_index_worker.moveToThread(self.package_index_thread)
+        self.start_package_index.connect(
+            self.m_package_index_worker.run_update
+        )
+        self.m_package_index_worker.finished.connect(
+            self.finish_package_index
+        )
+        self.package_index_thread.start()
+
+        # write the requirements of many venvs in the background
+        self.export_thread = QThread(self)
+        self.m_export_worker = ExportWorker()
+        self.m_export_worker.moveToThread(self.export_thread)
+        self.start_export.connect(self.m_export_worker.run_export)
+        self.m_export_worker.finished.connect(self.finish_export)
+        self.export_thread.start()
+
+        # rescan the active folder when it changes, refresh requests
+        # arriving close together cause a single rescan
+        self.venv_watcher = VenvWatcher(self)
+        self.venv_watcher.changed.connect(self.refresh_venv_table)
+
+        # refresh venv table on wizard close
+        self.venv_wizard.refresh.connect(self.venv_watcher.schedule)
+
+        # pick up interpreters installed or removed while running
+        self.interpreter_watcher = InterpreterWatcher(self)
+        self.interpreter_watcher.changed.connect(
+            self.start_interpreter_update
+        )
+
 
         #]===================================================================[#
         #] ICONS [#==========================================================[#
@@ -227,10 +345,19 @@ class MainWindow(QMainWindow):
             icon=reload_icon,
             toolTip="Reload",
             statusTip="Reload venv table content",
-            clicked=self.pop_venv_table
+            clicked=self.refresh_venv_table
         )
         self.reload_button.setFixedSize(30, 30)
 
+        # filter the venv table as you type
+        self.venv_filter_line = QLineEdit(
+            placeholderText="Filter venvs...",
+            toolTip="Show the venvs whose name, comment, version or "
+                    "projects have words starting with the words typed",
+            clearButtonEnabled=True
+        )
+        self.venv_filter_line.setFixedWidth(200)
+
         #]===================================================================[#
         # spacer between manage button and exit button
         spacer_item_1 = QSpacerItem(
@@ -280,11 +407,12 @@ class MainWindow(QMainWindow):
         h_header_interpreter_table.setStretchLastSection(True)
 
         # set table view model
-        self.model_interpreter_table = QStandardItemModel(0, 2, centralwidget)
+        self.model_interpreter_table = QStandardItemModel(0, 3, centralwidget)
         self.model_interpreter_table.setHorizontalHeaderLabels(
-            ["Version", "Path"]
+            ["Version", "Path", "Health"]
         )
         self.interpreter_table.setModel(self.model_interpreter_table)
+        self.interpreter_table.setColumnWidth(1, 500)
 
         #]===================================================================[#
         # spacer between interpreter table and venv table title
@@ -303,7 +431,7 @@ class MainWindow(QMainWindow):
             editTriggers=QAbstractItemView.NoEditTriggers,
             alternatingRowColors=True,
             sortingEnabled=True,
-            refresh=self.pop_venv_table,
+            refresh=self.venv_watcher.schedule,
         )
 
         self.venv_table.add_pkgs.connect(self.install_packages_wizard_page)
@@ -317,19 +445,21 @@ class MainWindow(QMainWindow):
         h_header_venv_table.setStretchLastSection(True)
 
         # set table view model
-        self.model_venv_table = QStandardItemModel(0, 3, centralwidget)
-        self.model_venv_table.setHorizontalHeaderLabels(
-            ["Venv", "Version", "Packages", "installed", "Comment", "Refs"]
-        )
+        self.model_venv_table = VenvTableModel(centralwidget)
         self.venv_table.setModel(self.model_venv_table)
+        self.venv_filter_line.textChanged.connect(
+            self.model_venv_table.set_filter
+        )
 
         # adjust column width
         self.venv_table.setColumnWidth(0, 225)
         self.venv_table.setColumnWidth(1, 120)
         self.venv_table.setColumnWidth(2, 100)
         self.venv_table.setColumnWidth(3, 80)
-        self.venv_table.setColumnWidth(4, 220)
-        self.venv_table.setColumnWidth(5, 40)
+        self.venv_table.setColumnWidth(4, 80)
+        self.venv_table.setColumnWidth(5, 220)
+        self.venv_table.setColumnWidth(6, 40)
+        self.venv_table.setColumnWidth(7, 80)
 
         # add widgets to layout
         v_layout_1.addWidget(interpreter_table_label)
@@ -337,6 +467,7 @@ class MainWindow(QMainWindow):
         v_layout_1.addItem(spacer_item_2)
         v_layout_1.addLayout(h_layout_1)
         h_layout_1.addWidget(self.venv_table_label)
+        h_layout_1.addWidget(self.venv_filter_line)
         h_layout_1.addWidget(self.reload_button)
         h_layout_1.addWidget(self.active_dir_button)
         v_layout_1.addWidget(self.venv_table)
@@ -346,6 +477,81 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(centralwidget)
 
 
+        #]===================================================================[#
+        #] PACKAGE SEARCH [#=================================================[#
+        #]===================================================================[#
+
+        package_search_widget = QWidget(self)
+        v_layout_3 = QVBoxLayout(package_search_widget)
+        h_layout_2 = QHBoxLayout()
+
+        # find packages by name and version, or by what they provide
+        self.package_search_kind = QComboBox(
+            package_search_widget,
+            toolTip="Find packages by name, by the commands they "
+                    "install or by the names they are imported by"
+        )
+        self.package_search_kind.addItem("Package", None)
+        self.package_search_kind.addItem("Command", KIND_COMMAND)
+        self.package_search_kind.addItem("Import", KIND_IMPORT)
+        self.package_search_kind.currentIndexChanged.connect(
+            self.search_packages
+        )
+
+        self.package_search_line = QLineEdit(
+            placeholderText="Find packages, e.g. urllib3<2 or numpy==1.19.*",
+            toolTip="Show the venvs having a package whose name starts "
+                    "with the name typed, matching the version specifier",
+            clearButtonEnabled=True
+        )
+        self.package_search_label = QLabel(package_search_widget)
+
+        # search as you type, once typing pauses
+        self.package_search_timer = QTimer(self)
+        self.package_search_timer.setSingleShot(True)
+        self.package_search_timer.setInterval(150)
+        self.package_search_timer.timeout.connect(self.search_packages)
+        self.package_search_line.textChanged.connect(
+            self.package_search_timer.start
+        )
+
+        self.package_table = QTableView(
+            package_search_widget,
+            selectionBehavior=QAbstractItemView.SelectRows,
+            editTriggers=QAbstractItemView.NoEditTriggers,
+            alternatingRowColors=True
+        )
+        self.package_table.verticalHeader().hide()
+        h_header_package_table = self.package_table.horizontalHeader()
+        h_header_package_table.setDefaultAlignment(Qt.AlignLeft)
+        h_header_package_table.setStretchLastSection(True)
+
+        self.model_package_table = QStandardItemModel(0, 6, self)
+        self.model_package_table.setHorizontalHeaderLabels(
+            ["Package", "Version", "Installer", "Size", "Provides", "Venv"]
+        )
+        self.package_table.setModel(self.model_package_table)
+        self.package_table.setColumnWidth(0, 200)
+        self.package_table.setColumnWidth(1, 120)
+        self.package_table.setColumnWidth(2, 80)
+        self.package_table.setColumnWidth(3, 80)
+        self.package_table.setColumnWidth(4, 150)
+        self.package_table.setColumnHidden(4, True)
+        self.package_table.doubleClicked.connect(self.select_package_venv)
+
+        h_layout_2.addWidget(self.package_search_kind)
+        h_layout_2.addWidget(self.package_search_line)
+        h_layout_2.addWidget(self.package_search_label)
+        v_layout_3.addLayout(h_layout_2)
+        v_layout_3.addWidget(self.package_table)
+
+        self.package_search_dock = QDockWidget("Find Packages", self)
+        self.package_search_dock.setObjectName("package_search_dock")
+        self.package_search_dock.setWidget(package_search_widget)
+        self.package_search_dock.hide()
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.package_search_dock)
+
+
         #]===================================================================[#
         #] ACTIONS [#========================================================[#
         #]===================================================================[#
@@ -360,6 +566,31 @@ class MainWindow(QMainWindow):
             triggered=self.add_interpreter
         )
 
+        self.action_rescan_interpreters = QAction(
+            reload_icon,
+            "&Rescan Interpreters",
+            self,
+            statusTip="Search for Python installs again",
+            shortcut="Ctrl+R",
+            triggered=self.start_discovery.emit
+        )
+
+        self.action_add_search_root = QAction(
+            folder_icon,
+            "Add Interpreter &Search Root...",
+            self,
+            statusTip="Also search a folder for Python installs",
+            triggered=self.select_search_root
+        )
+
+        self.action_check_health = QAction(
+            info_icon,
+            "Check Interpreter &Health",
+            self,
+            statusTip="Check that all interpreters can create venvs",
+            triggered=self.start_health_check.emit
+        )
+
         self.action_new_venv = QAction(
             new_icon,
             "&New Venv",
@@ -387,6 +618,29 @@ class MainWindow(QMainWindow):
             triggered=self.select_active_dir
         )
 
+        self.action_add_workspace_root = QAction(
+            folder_icon,
+            "Add &Workspace Root...",
+            self,
+            statusTip="Also show the venvs found inside a project tree",
+            triggered=self.select_workspace_root
+        )
+
+        self.action_export_requirements = QAction(
+            folder_icon,
+            "&Export Requirements...",
+            self,
+            statusTip="Save the requirements of all venvs listed",
+            triggered=self.export_requirements
+        )
+
+        self.action_find_packages = self.package_search_dock.toggleViewAction()
+        self.action_find_packages.setText("&Find Packages")
+        self.action_find_packages.setStatusTip(
+            "Find the venvs having a package, a command or an import name"
+        )
+        self.action_find_packages.setShortcut("Ctrl+F")
+
         self.action_exit = QAction(
             exit_icon,
             "&Quit",
@@ -436,9 +690,15 @@ class MainWindow(QMainWindow):
 
         menu_venv = QMenu("&Venv", menu_bar)
         menu_venv.addAction(self.action_add_interpreter)
+        menu_venv.addAction(self.action_rescan_interpreters)
+        menu_venv.addAction(self.action_add_search_root)
+        menu_venv.addAction(self.action_check_health)
         menu_venv.addSeparator()
         menu_venv.addAction(self.action_new_venv)
         menu_venv.addAction(self.action_select_active_dir)
+        menu_venv.addAction(self.action_add_workspace_root)
+        menu_venv.addAction(self.action_export_requirements)
+        menu_venv.addAction(self.action_find_packages)
         menu_venv.addSeparator()
         menu_venv.addAction(self.action_exit)
         menu_bar.addAction(menu_venv.menuAction())
@@ -467,13 +727,6 @@ class MainWindow(QMainWindow):
             self
         )
 
-        # check if any Python is installed
-        if os.path.exists(get_data.DB_FILE):
-            with open(get_data.DB_FILE, "r") as f:
-                lines = f.readlines()
-            if len(lines) < 2:
-                self.launching_without_python()
-
     def invoke_venv_wizard(self):
         """
         Added this because under certain failure situations,
@@ -488,8 +741,8 @@ class MainWindow(QMainWindow):
         self.venv_wizard.exec_()
 
     @pyqtSlot(str)
-    def install_packages_wizard_page(self, venv_name):
-        venv_loc = get_data.get_active_dir_str()
+    def install_packages_wizard_page(self, venv_path):
+        venv_loc, venv_name = os.path.split(venv_path)
         if len(venv_loc) > 0:
             self.venv_wizard.setField('venv_name', venv_name)
             self.venv_wizard.setField('venv_location', venv_loc)    
@@ -532,8 +785,14 @@ class MainWindow(QMainWindow):
         """Stop all threads, then close the application.
         """
         self.venv_wizard.basic_settings.thread.exit()
+        self.discovery_thread.exit()
+        self.venv_scan_thread.exit()
+        self.size_thread.exit()
+        self.export_thread.exit()
+        self.package_index_thread.exit()
         self.venv_table.thread.exit()
         self.venv_table.thread2.exit()
+        self.venv_table.thread3.exit()
         self.close()
 
     def change_logging_level(self):
@@ -571,39 +830,203 @@ class MainWindow(QMainWindow):
     def pop_interpreter_table(self):
         """Populate the interpreter table view.
         """
-        get_data.ensure_dbfile()
-
-        with open(get_data.DB_FILE, newline="") as cf:
-            reader = csv.DictReader(cf, delimiter=",")
-            self.model_interpreter_table.setRowCount(0)
-            for info in reader:
-                self.model_interpreter_table.insertRow(0)
-                for i, text in enumerate(
-                        (info["PYTHON_VERSION"], info["PYTHON_PATH"])
-                    ):
-                    self.model_interpreter_table.setItem(
-                        0, i, QStandardItem(text)
-                    )
+        health = get_data.get_health()
+
+        self.model_interpreter_table.setRowCount(0)
+        for info in get_data.get_interpreters(scan=False):
+            self.insert_interpreter_row(info, health.get(info.py_path))
         # also populate the combo box in wizard
         self.venv_wizard.basic_settings.pop_combo_box()
 
 
+    def insert_interpreter_row(self, info, health=None):
+        """Insert a row into the interpreter table.
+        """
+        self.model_interpreter_table.insertRow(0)
+        for i, text in enumerate((
+                info.py_version,
+                info.py_path,
+                health_text(health)
+        )):
+            self.model_interpreter_table.setItem(0, i, QStandardItem(text))
+
+
+    @pyqtSlot(object)
+    def update_health_column(self, results):
+        """
+        Show the health verdicts in the interpreter table and drop
+        the broken interpreters from the wizard's combo box.
+        """
+        for row in range(self.model_interpreter_table.rowCount()):
+            py_path = self.model_interpreter_table.item(row, 1).text()
+            if py_path in results:
+                self.model_interpreter_table.item(row, 2).setText(
+                    health_text(results[py_path])
+                )
+        self.venv_wizard.basic_settings.pop_combo_box()
+
+
+    @pyqtSlot(object, object)
+    def update_interpreter_table(self, changes, snapshot):
+        """
+        Patch the rows that changed after the interpreters
+        have been rediscovered or updated.
+        """
+        if changes:
+            removed = {info.py_path for info in changes.removed}
+            changed = {info.py_path: info for info in changes.changed}
+
+            for row in reversed(range(self.model_interpreter_table.rowCount())):
+                py_path = self.model_interpreter_table.item(row, 1).text()
+                if py_path in removed:
+                    self.model_interpreter_table.removeRow(row)
+                elif py_path in changed:
+                    self.model_interpreter_table.item(row, 0).setText(
+                        changed[py_path].py_version
+                    )
+
+            health = get_data.get_health()
+            for info in changes.added:
+                self.insert_interpreter_row(info, health.get(info.py_path))
+
+            self.venv_wizard.basic_settings.update_combo_box(changes)
+
+            # the 'installed' column depends on the interpreters
+            self.refresh_venv_table()
+
+        # watch the binaries and roots found
+        self.interpreter_watcher.watch(snapshot)
+
+        # check if any Python is installed, ask only once since
+        # the watcher may trigger the discovery again and again
+        if self.model_interpreter_table.rowCount() == 0:
+            if not self.asked_for_python:
+                self.asked_for_python = True
+                self.launching_without_python()
+
+
     def pop_venv_table(self):
-        """Populate the venv table view.
         """
-        self.model_venv_table.setRowCount(0)
+        Populate the venv table view from the venv index, then let
+        the background scan add, update and remove rows.
+        """
+        self.model_venv_table.reset(
+            get_data.get_indexed_venvs(get_data.get_active_dir_str())
+        )
+        self.model_venv_table.set_sizes(get_data.get_cached_sizes())
+        self.refresh_venv_table()
+
+
+    @pyqtSlot()
+    def refresh_venv_table(self):
+        """
+        Rescan the active folder, only the rows of venvs that were
+        added, removed or changed are touched.
+        """
+        self.venv_scan_seen = set()
+
+        # a running scan stops and its remaining batches are ignored
+        self.venv_scan_id += 1
+        self.m_venv_scan_worker.latest_id = self.venv_scan_id
+        self.start_venv_scan.emit(
+            self.venv_scan_id, get_data.get_active_dir_str()
+        )
+
+
+    @pyqtSlot(int, object)
+    def add_venv_rows(self, scan_id, venv_infos):
+        """Add a batch of venvs to the venv table.
+        """
+        if scan_id != self.venv_scan_id:
+            return
+
+        self.model_venv_table.update(venv_infos)
+        self.venv_scan_seen.update(info.venv_path for info in venv_infos)
+
+
+    @pyqtSlot(int, object)
+    def finish_venv_scan(self, scan_id, snapshot):
+        """
+        Remove the rows of the venvs not found by the scan, then
+        watch the scanned folder.
+        """
+        if scan_id != self.venv_scan_id:
+            return
+
+        self.model_venv_table.remove(
+            self.model_venv_table.paths() - self.venv_scan_seen
+        )
+        self.model_venv_table.resort()
+
+        self.venv_watcher.watch(get_data.get_active_dir_str(), snapshot)
+
+        self.m_size_worker.latest_id = scan_id
+        self.start_size_scan.emit(scan_id, sorted(self.venv_scan_seen))
+
+        self.m_package_index_worker.latest_id = scan_id
+        self.start_package_index.emit(scan_id, sorted(self.venv_scan_seen))
+
+
+    @pyqtSlot(int, object)
+    def update_venv_sizes(self, scan_id, sizes):
+        """Show the sizes of venvs as they come in.
+        """
+        self.model_venv_table.set_sizes(sizes)
+
 
-        for info in get_data.get_active_dir():
-            self.model_venv_table.insertRow(0)
-            for i, text in enumerate((
-                    info.venv_name,
-                    info.venv_version,
-                    info.site_packages,
-                    info.is_installed,
-                    info.comment,
-                    info.refs
-            )):
-                self.model_venv_table.setItem(0, i, QStandardItem(text))
+    @pyqtSlot(int)
+    def finish_package_index(self, scan_id):
+        """Search again, the packages found may have changed.
+        """
+        if self.package_search_line.text().strip():
+            self.search_packages()
+
+
+    def search_packages(self):
+        """
+        Show the packages matching the text in the search line, or the
+        ones providing a matching command or import name.
+        """
+        query = self.package_search_line.text()
+        kind = self.package_search_kind.currentData()
+        if kind is None:
+            hits = get_data.PACKAGE_INDEX.search(query)
+        else:
+            hits = get_data.PACKAGE_INDEX.search_provides(kind, query)
+        self.package_table.setColumnHidden(4, kind is None)
+
+        self.model_package_table.setRowCount(0)
+        for hit in hits:
+            items = [
+                QStandardItem(text) for text in (
+                    hit.name,
+                    hit.version,
+                    hit.installer,
+                    format_size(hit.size),
+                    hit.provides,
+                    hit.venv_path
+                )
+            ]
+            items[3].setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.model_package_table.appendRow(items)
+
+        if query.strip():
+            venvs = len({hit.venv_path for hit in hits})
+            self.package_search_label.setText(
+                f"{len(hits)} found in {venvs} venv(s)"
+            )
+        else:
+            self.package_search_label.clear()
+
+
+    def select_package_venv(self, index):
+        """Select the venv of a package found in the venv table.
+        """
+        venv_path = self.model_package_table.item(index.row(), 5).text()
+        row = self.model_venv_table.row(venv_path)
+        if row is not None:
+            self.venv_table.selectRow(row)
+            self.venv_table.scrollTo(self.model_venv_table.index(row, 0))
 
 
     def update_label(self):
@@ -655,12 +1078,109 @@ class MainWindow(QMainWindow):
                 self.update_label()
 
 
+    def select_search_root(self):
+        """
+        Add a directory that is searched for Python installs, then
+        rescan the interpreters.
+        """
+        directory = QFileDialog.getExistingDirectory(
+            self,
+            "Open a folder containing Python installs"
+        )
+        if directory != "":
+            get_data.add_search_root(directory)
+            self.start_discovery.emit()
+
+
+    def select_workspace_root(self):
+        """
+        Add a directory whose project trees are searched for venvs,
+        like `.venv` folders inside project checkouts.
+        """
+        directory = QFileDialog.getExistingDirectory(
+            self,
+            "Open a folder containing projects"
+        )
+        if directory != "":
+            get_data.add_workspace_root(directory)
+            self.refresh_venv_table()
+
+
+    def export_requirements(self):
+        """
+        Save the requirements of all venvs listed in the venv table,
+        one file per venv, into a directory.
+        """
+        model = self.model_venv_table
+        venv_paths = [
+            model.venv(row).venv_path for row in range(model.rowCount())
+        ]
+        if not venv_paths:
+            return
+
+        directory = QFileDialog.getExistingDirectory(
+            self,
+            "Open a folder to save the requirements in"
+        )
+        if directory == "":
+            return
+
+        options = FreezeOptionsDialog(self)
+        if not options.exec_():
+            return
+
+        targets = inventory.export_file_names(venv_paths, directory)
+        self.action_export_requirements.setEnabled(False)
+        self.statusBar().showMessage(
+            f"Exporting the requirements of {len(targets)} venv(s)..."
+        )
+        self.start_export.emit(
+            targets, options.include_all(), options.exclude()
+        )
+
+
+    @pyqtSlot(object)
+    def finish_export(self, errors):
+        """Tell how the export went.
+        """
+        self.action_export_requirements.setEnabled(True)
+        self.statusBar().clearMessage()
+
+        failed = {path: e for path, e in errors.items() if e is not None}
+        saved = len(errors) - len(failed)
+        if not failed:
+            QMessageBox.information(
+                self, "Saved", f"Saved the requirements of {saved} venv(s)."
+            )
+            return
+
+        details = "\n".join(
+            f"{path}: {e}" for path, e in sorted(failed.items())[:10]
+        )
+        QMessageBox.warning(
+            self,
+            "Export failed",
+            f"Saved the requirements of {saved} venv(s), "
+            f"{len(failed)} failed:\n\n{details}"
+        )
+
+
     def search_pypi(self):
         """Search the Python Package Index.
         """
         pass
 
 
+def health_text(health):
+    """Return the text shown in the health column.
+    """
+    if health is None:
+        return "not checked"
+    if health.ok:
+        return "OK"
+    return f"broken ({health.detail})"
+
+
 def with_args():
     """Execute with command-line arguments.
     """
@@ -705,13 +1225,14 @@ def main():
         os.system("clear")
 
     main_window = MainWindow()
-    get_data.get_python_installs(True)
     main_window.pop_interpreter_table()
-    main_window.venv_wizard.basic_settings.pop_combo_box()
     main_window.pop_venv_table()
     main_window.update_label()
     main_window.show()
 
+    # rediscover the interpreters without blocking the window
+    main_window.start_discovery.emit()
+
     sys.exit(app.exec_())
 
 
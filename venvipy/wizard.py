@@ -5,7 +5,6 @@ and setting up virtual environments.
 """
 import sys
 import os
-import csv
 import logging
 from functools import partial
 from pathlib import Path
@@ -48,6 +47,7 @@ from PyQt5.QtWidgets import (
 import venvipy_rc  # pylint: disable=unused-import
 import get_data
 import creator
+import inventory
 from dialogs import ProgBarDialog, ConsoleDialog
 from tables import ResultsTable
 from creator import CreationWorker
@@ -334,20 +334,49 @@ class BasicSettings(QWizardPage):
     def pop_combo_box(self):
         """Add the selected Python version to combo box.
         """
-        get_data.ensure_dbfile()
-
         # clear combo box content
         self.interpreter_combo_box.clear()
         self.interpreter_combo_box.addItem("---")
 
-        with open(get_data.DB_FILE, newline="") as cf:
-            reader = csv.DictReader(cf, delimiter=",")
-            for info in reader:
-                self.interpreter_combo_box.addItem(
-                    f'{info["PYTHON_VERSION"]}  ->  {info["PYTHON_PATH"]}',
-                    info["PYTHON_PATH"]
+        # hide the interpreters that failed the health check
+        broken = get_data.get_broken_paths()
+
+        # only what is known, the discovery worker adds the rest
+        for info in get_data.get_interpreters(scan=False):
+            if info.py_path in broken:
+                continue
+            self.interpreter_combo_box.addItem(
+                f"{info.py_version}  ->  {info.py_path}",
+                info.py_path
+            )
+
+
+    def update_combo_box(self, changes):
+        """
+        Add, remove or update only the interpreters that changed,
+        so the current selection is kept.
+        """
+        removed = {info.py_path for info in changes.removed}
+        changed = {info.py_path: info for info in changes.changed}
+
+        for i in reversed(range(self.interpreter_combo_box.count())):
+            py_path = self.interpreter_combo_box.itemData(i)
+            if py_path in removed:
+                self.interpreter_combo_box.removeItem(i)
+            elif py_path in changed:
+                self.interpreter_combo_box.setItemText(
+                    i, f"{changed[py_path].py_version}  ->  {py_path}"
                 )
 
+        broken = get_data.get_broken_paths()
+        for info in changes.added:
+            if info.py_path in broken:
+                continue
+            self.interpreter_combo_box.addItem(
+                f"{info.py_version}  ->  {info.py_path}",
+                info.py_path
+            )
+
 
     def select_python(self):
         """Specify path to a custom interpreter.
@@ -364,10 +393,7 @@ class BasicSettings(QWizardPage):
                 self,
                 "Select Python Interpreter",
                 "/usr/local/bin",
-                "Python binary (\
-                    python3.3 python3.4 python3.5 python3.6 \
-                    python3.7 python3.8 python3.9 \
-                )"
+                "Python binary (python3*)"
             )
         bin_file = file_name[0]
 
@@ -429,11 +455,14 @@ class BasicSettings(QWizardPage):
         self.requirements = self.field("requirements")
 
         if self.combo_box and self.venv_name and self.venv_location:
-            # format the text shown in progress bar window title
-            if self.python_version[12] == " ":
-                version = self.python_version[:12]  # stable releases
-            else:
-                version = self.python_version[:16]  # pre-releases
+            record = get_data.get_python_record(self.python_path)
+            if not self.interpreter_usable(record):
+                return
+
+            version = record["version"]
+            self.major_minor = ".".join(
+                str(n) for n in record["version_info"][:2]
+            )
 
             # show python version in progress bar window title
             self.progress_bar.setWindowTitle(f"Using {version}")
@@ -445,6 +474,36 @@ class BasicSettings(QWizardPage):
             self.setEnabled(False)
 
 
+    def interpreter_usable(self, record):
+        """
+        Test wether the selected interpreter is able to create the
+        virtual environment, based on its introspection record.
+        """
+        if record is None:
+            msg_txt = (
+                f"The selected interpreter \n'{self.python_path}' \n"
+                "could not be run.\n"
+            )
+        elif not record["has_venv"]:
+            msg_txt = (
+                f"{record['version']} does not provide \n"
+                "the 'venv' module.\n"
+            )
+        elif self.with_pip and not record["has_ensurepip"]:
+            msg_txt = (
+                f"{record['version']} does not provide \n"
+                "the 'ensurepip' module.\n\n"
+                "Uncheck 'Install and update Pip' to \n"
+                "create the environment without Pip.\n"
+            )
+        else:
+            return True
+
+        logger.error(msg_txt.replace("\n", ""))
+        QMessageBox.critical(self, "Error", msg_txt)
+        return False
+
+
     def create_process(self):
         """
         Create the virtual environment.
@@ -489,7 +548,7 @@ class BasicSettings(QWizardPage):
 
         default_msg = (
             f"Virtual environment created \nsuccessfully. \n\n"
-            f"New Python {self.python_version[7:10]} executable in \n"
+            f"New Python {self.major_minor} executable in \n"
             f"'{self.venv_location}/{self.venv_name}/{loc}'. \n"
         )
 
@@ -760,13 +819,18 @@ class InstallPackages(QWizardPage):
             save_path = save_file[0]
 
             if save_path != "":
-                self.manager = PipManager(self.venv_location, self.venv_name)
-                self.manager.run_pip(creator.cmds[2], [">", save_path])
-
-                msg_txt = (f"Saved requirements in: \n{save_path}")
-                QMessageBox.information(self, "Saved", msg_txt)
-                logger.debug(f"Saved '{save_path}'...")
-                self.wizard().next()
+                try:
+                    inventory.write_freeze(venv_dir, save_path)
+                except OSError as e:
+                    logger.error(f"Failed to save '{save_path}': {e}")
+                    QMessageBox.critical(
+                        self, "Error", f"Could not save requirements:\n{e}"
+                    )
+                else:
+                    msg_txt = (f"Saved requirements in: \n{save_path}")
+                    QMessageBox.information(self, "Saved", msg_txt)
+                    logger.debug(f"Saved '{save_path}'...")
+                    self.wizard().next()
         else:
             self.wizard().next()
 
@@ -0,0 +1,485 @@
+# -*- coding: utf-8 -*-
+"""
+This module contains the workers running in the background.
+"""
+import os
+import logging
+from contextlib import closing
+
+from PyQt5.QtCore import (
+    QObject,
+    QFileSystemWatcher,
+    QTimer,
+    pyqtSignal,
+    pyqtSlot
+)
+
+import dedupe
+import get_data
+import inventory
+
+logger = logging.getLogger(__name__)
+
+
+
+#]===========================================================================[#
+#] WORKER (DISCOVER INTERPRETERS) [#=========================================[#
+#]===========================================================================[#
+
+class DiscoveryWorker(QObject):
+    """
+    Worker that searches for Python installs and updates the registry.
+    Emits the `InterpreterChanges` and the paths to watch for
+    interpreters when finished.
+    """
+    started = pyqtSignal()
+    finished = pyqtSignal(object, object)
+
+    @pyqtSlot()
+    def run_discovery(self):
+        """
+        Rediscover the interpreters.
+        """
+        self.started.emit()
+        logger.debug("Searching for Python installs...")
+
+        changes = get_data.rediscover_pythons()
+        logger.debug(
+            f"Discovery done: {len(changes.added)} added, "
+            f"{len(changes.removed)} removed, {len(changes.changed)} changed"
+        )
+        self.finished.emit(changes, interpreter_watch_snapshot())
+
+    @pyqtSlot(object)
+    def run_update(self, paths):
+        """
+        Update the interpreters at the changed `paths` only.
+        """
+        self.started.emit()
+        changes = get_data.update_pythons(paths)
+        logger.debug(
+            f"Updated {len(paths)} path(s): {len(changes.added)} added, "
+            f"{len(changes.removed)} removed, {len(changes.changed)} changed"
+        )
+        self.finished.emit(changes, interpreter_watch_snapshot())
+
+
+
+#]===========================================================================[#
+#] WORKER (CHECK INTERPRETER HEALTH) [#=====================================[#
+#]===========================================================================[#
+
+class HealthWorker(QObject):
+    """
+    Worker that checks all registered interpreters. Emits a dict
+    mapping each path to its `HealthInfo` when finished.
+    """
+    started = pyqtSignal()
+    finished = pyqtSignal(object)
+
+    @pyqtSlot()
+    def run_health_check(self):
+        """
+        Check the interpreters.
+        """
+        self.started.emit()
+        logger.debug("Checking interpreter health...")
+
+        results = get_data.check_health()
+        broken = [h.py_path for h in results.values() if not h.ok]
+        logger.debug(f"Health check done: {len(broken)} broken")
+        self.finished.emit(results)
+
+
+#]===========================================================================[#
+#] WORKER (SCAN VENV DIRECTORY) [#==========================================[#
+#]===========================================================================[#
+
+class VenvScanWorker(QObject):
+    """
+    Worker that reads the venvs of a folder and emits them in batches,
+    tagged with the id of the scan. Set `latest_id` to the id of a new
+    scan to stop the running one early. Once done, emits the snapshot
+    the `VenvWatcher` needs, so it isn't taken on the GUI thread.
+    """
+    batch = pyqtSignal(int, object)
+    finished = pyqtSignal(int, object)
+
+    def __init__(self):
+        super().__init__()
+        self.latest_id = 0
+
+    @pyqtSlot(int, str)
+    def run_scan(self, scan_id, path):
+        """
+        Scan the folder `path` and the workspace roots for venvs.
+        """
+        if scan_id != self.latest_id:
+            return
+
+        count = 0
+        with closing(get_data.iter_all_venvs(path)) as batches:
+            for venv_infos in batches:
+                if scan_id != self.latest_id:
+                    logger.debug(f"Venv scan {scan_id} superseded")
+                    break
+                count += len(venv_infos)
+                self.batch.emit(scan_id, venv_infos)
+
+        logger.debug(f"Venv scan {scan_id} found {count} venv(s)")
+        snapshot = None
+        if scan_id == self.latest_id:
+            snapshot = venv_watch_snapshot(path)
+        self.finished.emit(scan_id, snapshot)
+
+
+
+#]===========================================================================[#
+#] WORKER (VENV DISK USAGE) [#==============================================[#
+#]===========================================================================[#
+
+class VenvSizeWorker(QObject):
+    """
+    Worker that computes the disk usage of venvs. Emits dicts mapping
+    venv paths to sizes as they come in, tagged with the id of the
+    scan. Set `latest_id` to the id of a new scan to stop early.
+    """
+    sizes = pyqtSignal(int, object)
+
+    def __init__(self):
+        super().__init__()
+        self.latest_id = 0
+
+    @pyqtSlot(int, object)
+    def run_sizes(self, scan_id, venv_paths):
+        """
+        Get the sizes of the venvs in `venv_paths`.
+        """
+        if scan_id != self.latest_id:
+            return
+
+        with closing(get_data.iter_venv_sizes(venv_paths)) as results:
+            for sizes in results:
+                if scan_id != self.latest_id:
+                    logger.debug(f"Size scan {scan_id} superseded")
+                    break
+                self.sizes.emit(scan_id, sizes)
+
+
+
+#]===========================================================================[#
+#] WORKER (PACKAGE INDEX) [#================================================[#
+#]===========================================================================[#
+
+class PackageIndexWorker(QObject):
+    """
+    Worker that brings the package index up to date with the venvs
+    listed. Emits the id of the scan when finished.
+    """
+    finished = pyqtSignal(int)
+
+    def __init__(self):
+        super().__init__()
+        self.latest_id = 0
+
+    @pyqtSlot(int, object)
+    def run_update(self, scan_id, venv_paths):
+        """
+        Index the packages of the venvs in `venv_paths` that changed.
+        """
+        if scan_id != self.latest_id:
+            return
+        get_data.PACKAGE_INDEX.update(venv_paths)
+        self.finished.emit(scan_id)
+
+
+
+#]===========================================================================[#
+#] WORKER (EXPORT REQUIREMENTS) [#==========================================[#
+#]===========================================================================[#
+
+class ExportWorker(QObject):
+    """
+    Worker that writes the requirements of many venvs at once. Emits
+    a dict mapping each venv path to an error message, `None` where
+    writing succeeded.
+    """
+    finished = pyqtSignal(object)
+
+    @pyqtSlot(object, bool, object)
+    def run_export(self, targets, include_all, exclude):
+        """
+        Write the requirements of the venvs in `targets`, a dict
+        mapping venv paths to files.
+        """
+        self.finished.emit(
+            inventory.export_requirements(targets, include_all, exclude)
+        )
+
+
+
+class DedupeWorker(QObject):
+    """
+    Worker that finds the duplicate files in the site-packages of many
+    venvs, and replaces them by links once the report is confirmed.
+    """
+    started = pyqtSignal()
+    scanned = pyqtSignal(object)
+    linked = pyqtSignal(object)
+
+    @pyqtSlot(object)
+    def run_scan(self, venv_paths):
+        """Emit the `DedupeReport` of the venvs in `venv_paths`.
+        """
+        self.started.emit()
+        self.scanned.emit(dedupe.find_duplicates(venv_paths))
+
+    @pyqtSlot(object)
+    def run_link(self, report):
+        """Link the duplicates of a report, emit what was done.
+        """
+        self.started.emit()
+        self.linked.emit(dedupe.link_duplicates(report))
+
+
+
+#]===========================================================================[#
+#] WATCHER (INTERPRETER DIRECTORIES) [#======================================[#
+#]===========================================================================[#
+
+def list_names(directory):
+    """Return the set of entry names in a directory.
+    """
+    try:
+        with os.scandir(directory) as it:
+            return {entry.name for entry in it}
+    except OSError:
+        return set()
+
+
+def interpreter_watch_snapshot():
+    """
+    Return the paths to watch for interpreters as a tuple of the
+    dict returned by `get_data.get_watch_paths()`, the set of
+    binaries and the entry names of every directory.
+    """
+    watch_dirs, watch_files = get_data.get_watch_paths()
+    names = {directory: list_names(directory) for directory in watch_dirs}
+    return watch_dirs, set(watch_files), names
+
+
+class InterpreterWatcher(QObject):
+    """
+    Watch `PATH`, the search roots and the provider roots. Emit
+    `changed` with the set of entries added, replaced or removed
+    once a burst of relevant changes has settled.
+    """
+    changed = pyqtSignal(object)
+
+    def __init__(self, parent=None, delay=1000):
+        super().__init__(parent)
+
+        self._dirs = {}
+        self._snapshots = {}
+        self._pending = set()
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self.on_directory_changed)
+        self._watcher.fileChanged.connect(self.on_file_changed)
+
+        # coalesce bursts of events, e.g. while an installer runs
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay)
+        self._timer.timeout.connect(self.emit_changed)
+
+    def watch(self, snapshot=None):
+        """
+        Watch the paths in `snapshot`, call again after the registry
+        has changed. Pass the snapshot emitted by the
+        `DiscoveryWorker` as `snapshot`. Only the paths that changed
+        are added to or removed from the watcher.
+        """
+        if snapshot is None:
+            snapshot = interpreter_watch_snapshot()
+        self._dirs, files, self._snapshots = snapshot
+
+        dirs = set(self._dirs)
+        watched_dirs = set(self._watcher.directories())
+        watched_files = set(self._watcher.files())
+
+        removed = (watched_dirs - dirs) | (watched_files - files)
+        added = (dirs - watched_dirs) | (files - watched_files)
+        if removed:
+            self._watcher.removePaths(list(removed))
+        if added:
+            self._watcher.addPaths(list(added))
+        logger.debug(
+            f"Watching {len(dirs) + len(files)} path(s) for interpreters, "
+            f"{len(added)} added, {len(removed)} removed"
+        )
+
+    @pyqtSlot()
+    def emit_changed(self):
+        """Emit `changed` with the entries collected so far.
+        """
+        paths, self._pending = self._pending, set()
+        if paths:
+            self.changed.emit(paths)
+
+    @pyqtSlot(str)
+    def on_directory_changed(self, directory):
+        """
+        Schedule an update if an entry that may be a Python binary
+        or install has been added or removed.
+        """
+        names = list_names(directory)
+        diff = names ^ self._snapshots.get(directory, set())
+        self._snapshots[directory] = names
+
+        any_entry = self._dirs.get(directory, False)
+        relevant = {
+            os.path.join(directory, name) for name in diff
+            if any_entry or get_data.is_interpreter_entry(name)
+        }
+        if relevant:
+            logger.debug(f"Interpreters changed in '{directory}'")
+            self._pending.update(relevant)
+            self._timer.start()
+
+    @pyqtSlot(str)
+    def on_file_changed(self, path):
+        """
+        Schedule an update if a registered binary has been
+        replaced or removed.
+        """
+        # binaries replaced are no longer watched, the update
+        # adds them again
+        self._watcher.removePath(path)
+        logger.debug(f"Interpreter changed: '{path}'")
+        self._pending.add(path)
+        self._timer.start()
+
+
+
+#]===========================================================================[#
+#] WATCHER (VENV DIRECTORY) [#================================================[#
+#]===========================================================================[#
+
+def venv_watch_snapshot(folder):
+    """
+    Return the entry names of `folder` and of the directories in it,
+    as a dict mapping a directory to a set of names. Empty if the
+    folder doesn't exist.
+    """
+    if not folder or not os.path.isdir(folder):
+        return {}
+    try:
+        with os.scandir(folder) as it:
+            entries = list(it)
+    except OSError:
+        return {}
+
+    snapshot = {folder: {entry.name for entry in entries}}
+    for entry in entries:
+        try:
+            if entry.is_dir():
+                snapshot[entry.path] = list_names(entry.path)
+        except OSError:
+            continue
+    return snapshot
+
+
+class VenvWatcher(QObject):
+    """
+    Watch the active folder, the directories in it and the config
+    files of the venvs. Emit `changed` once a burst of changes, or of
+    calls to `schedule()`, has settled.
+    """
+    changed = pyqtSignal()
+
+    def __init__(self, parent=None, delay=500):
+        super().__init__(parent)
+
+        self._folder = ""
+        self._snapshots = {}
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self.on_directory_changed)
+        self._watcher.fileChanged.connect(self.on_file_changed)
+
+        # coalesce bursts of events and refresh requests into one scan
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay)
+        self._timer.timeout.connect(self.changed)
+
+    def watch(self, folder, snapshot=None):
+        """
+        Watch `folder`, its sub directories and the config files in
+        them, call again after the folder has been scanned. Pass the
+        snapshot emitted by the `VenvScanWorker` as `snapshot`. Only
+        the paths that changed are added to or removed from the
+        watcher.
+        """
+        if snapshot is None:
+            snapshot = venv_watch_snapshot(folder)
+        self._folder = folder
+        self._snapshots = snapshot
+
+        dirs = set(snapshot)
+        files = {
+            os.path.join(directory, name)
+            for directory, names in snapshot.items()
+            if directory != folder
+            for name in get_data.VENV_FILES if name in names
+        }
+        watched_dirs = set(self._watcher.directories())
+        watched_files = set(self._watcher.files())
+
+        removed = (watched_dirs - dirs) | (watched_files - files)
+        added = (dirs - watched_dirs) | (files - watched_files)
+        if removed:
+            self._watcher.removePaths(list(removed))
+        if added:
+            self._watcher.addPaths(list(added))
+        logger.debug(
+            f"Watching {len(dirs) + len(files)} path(s) for venvs, "
+            f"{len(added)} added, {len(removed)} removed"
+        )
+
+    @pyqtSlot()
+    def schedule(self):
+        """Emit `changed` after the delay, unless called again.
+        """
+        self._timer.start()
+
+    @pyqtSlot(str)
+    def on_directory_changed(self, directory):
+        """
+        Schedule an update if an entry of the active folder, or the
+        config files of a venv, have been added or removed.
+        """
+        names = list_names(directory)
+        diff = names ^ self._snapshots.get(directory, set())
+        self._snapshots[directory] = names
+
+        if directory == self._folder:
+            relevant = bool(diff)
+        else:
+            relevant = bool(diff & set(get_data.VENV_FILES))
+        if relevant:
+            logger.debug(f"Venvs changed in '{directory}'")
+            self.schedule()
+
+    @pyqtSlot(str)
+    def on_file_changed(self, path):
+        """
+        Schedule an update if the config file of a venv has been
+        edited, replaced or removed.
+        """
+        # files replaced on save are no longer watched, the next
+        # scan adds them again
+        self._watcher.removePath(path)
+        logger.debug(f"Venv config changed: '{path}'")
+        self.schedule()